@@ -0,0 +1,36 @@
+# benchmarks/_common.py
+"""
+基准脚本的公共部分：插件内部使用相对导入，需要以包的形式导入插件模块
+"""
+
+import importlib
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+PLUGIN_ROOT = Path(__file__).resolve().parent.parent
+
+
+def import_plugin(module: str, root: Path = PLUGIN_ROOT):
+    """导入插件内的模块，如 import_plugin("data.row_mapper")
+
+    Args:
+        module: 相对插件根目录的模块名
+        root: 插件根目录，可指向另一份检出（如旧版本的 git worktree）以对比前后差异
+    """
+    root = Path(root).resolve()
+    parent = str(root.parent)
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+    return importlib.import_module(f"{root.name}.{module}")
+
+
+def best_of(func: Callable[[], object], repeat: int = 5) -> float:
+    """多次执行取最短耗时（秒），减少调度抖动的影响"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
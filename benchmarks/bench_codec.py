@@ -0,0 +1,49 @@
+# benchmarks/bench_codec.py
+"""
+JSON 编解码基准：在接近线上数据的样本上对比标准库 json 与 codec
+
+    python benchmarks/bench_codec.py [--rounds 2000] [--repeat 5]
+
+解码的加速取决于安装的后端（orjson / msgspec，未安装时与标准库相同）。
+"""
+
+import argparse
+import json
+
+from _common import best_of, import_plugin
+from codec_samples import realistic_documents
+
+codec = import_plugin("codec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 编解码基准")
+    parser.add_argument("--rounds", type=int, default=2000, help="每次计时编解码全部样本的轮数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数（取最短耗时）")
+    args = parser.parse_args()
+
+    print(f"解码后端: {codec.BACKEND}")
+    print(f"{'JSON 列':<22}{'文档数':>6}{'json.dumps':>12}{'codec.dumps':>13}{'json.loads':>12}{'codec.loads':>13}")
+    for column, docs in realistic_documents().items():
+        encoded = [json.dumps(doc, ensure_ascii=False) for doc in docs]
+
+        def run(func, values):
+            def timed():
+                for _ in range(args.rounds):
+                    for value in values:
+                        func(value)
+            return best_of(timed, args.repeat) * 1000
+
+        std_dumps = run(lambda doc: json.dumps(doc, ensure_ascii=False), docs)
+        fast_dumps = run(codec.dumps, docs)
+        std_loads = run(json.loads, encoded)
+        fast_loads = run(codec.loads, encoded)
+        print(
+            f"{column:<24}{len(docs):>6}{std_dumps:>10.1f}ms{fast_dumps:>11.1f}ms"
+            f"{std_loads:>10.1f}ms{fast_loads:>11.1f}ms"
+            f"   编码 {std_dumps / fast_dumps:.2f}x  解码 {std_loads / fast_loads:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# benchmarks/bench_player_memory.py
+"""
+Player 内存占用与 JSON 解码次数测量
+
+    python benchmarks/bench_player_memory.py [插件目录] [--players 10000]
+
+插件目录默认为当前检出。对比改动前后时，用 git worktree 检出旧版本后分别运行：
+
+    git worktree add /tmp/xiuxian_before <旧版本>
+    python benchmarks/bench_player_memory.py /tmp/xiuxian_before
+    python benchmarks/bench_player_memory.py
+"""
+
+import argparse
+import sys
+import tracemalloc
+from dataclasses import fields
+from pathlib import Path
+
+from _common import PLUGIN_ROOT, import_plugin
+
+# 接近线上数据的 JSON 字段（只使用目标版本 Player 中存在的字段）
+SAMPLE_FIELDS = {
+    "user_name": "青云子",
+    "techniques": '["基础剑诀", "太极心法", "九阴真经", "御风诀"]',
+    "permanent_pill_gains": (
+        '{"level_3": {"magic_damage": 12, "physical_damage": 8}, '
+        '"level_7": {"max_hp": 300, "death_protection_multiplier": 0.9}}'
+    ),
+    "active_pill_effects": '[{"pill_name": "九转金丹", "physical_damage": 1.25, "expiry_time": 1760000000}]',
+    "pills_inventory": '{"一品气血丹": 5, "筑基丹": 1}',
+    "storage_ring_items": '{"玄铁": 12, "灵草": 30}',
+}
+
+
+def _learn_technique(player):
+    techniques = player.get_techniques_list()
+    if "御剑术" not in techniques:
+        techniques.append("御剑术")
+        player.set_techniques_list(techniques)
+    return player.get_techniques_list()
+
+
+def _take_permanent_pill(player):
+    gains = player.get_permanent_pill_gains()
+    gains.setdefault("level_9", {})["magic_damage"] = 20
+    player.set_permanent_pill_gains(gains)
+    return player.get_total_attributes([])
+
+
+# 模拟一条指令中对玩家 JSON 字段的访问
+COMMANDS = {
+    "角色信息": lambda p: (p.get_total_attributes([]), p.get_techniques_list(), p.get_permanent_pill_gains()),
+    "查看功法": lambda p: [p.get_techniques_list() for _ in range(3)],
+    "学习功法": _learn_technique,
+    "服用永久丹药": _take_permanent_pill,
+}
+
+
+def make_player(player_cls, field_names, user_id: str):
+    """构造一个从数据库载入状态的玩家"""
+    # 从数据库读出的每一行都是独立的字符串对象，这里同样逐个复制，避免共享常量低估内存
+    values = {k: v.encode().decode() for k, v in SAMPLE_FIELDS.items() if k in field_names}
+    player = player_cls(user_id, **values)
+    mark_clean = getattr(player, "mark_clean", None)
+    if mark_clean is not None:
+        mark_clean()
+    return player
+
+
+def measure_memory(player_cls, field_names, count: int):
+    """返回 (载入后每个玩家字节数, 解码全部 JSON 字段后每个玩家字节数)"""
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    players = [make_player(player_cls, field_names, f"user_{i}") for i in range(count)]
+    loaded = tracemalloc.get_traced_memory()[0] - base
+    for player in players:
+        player.get_techniques_list()
+        player.get_permanent_pill_gains()
+    decoded = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return loaded / count, decoded / count
+
+
+def count_decodes(models, player_cls, field_names) -> dict:
+    """统计每条模拟指令中 JSON 解码的次数"""
+    # 旧版本直接调用 json.loads，新版本经由 codec.loads
+    target = models.codec if hasattr(models, "codec") else models.json
+    original = target.loads
+    calls = 0
+
+    def counting_loads(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        return original(*args, **kwargs)
+
+    target.loads = counting_loads
+    try:
+        counts = {}
+        for name, command in COMMANDS.items():
+            player = make_player(player_cls, field_names, "user_0")
+            calls = 0
+            command(player)
+            counts[name] = calls
+        return counts
+    finally:
+        target.loads = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Player 内存占用与 JSON 解码次数")
+    parser.add_argument("root", nargs="?", default=str(PLUGIN_ROOT), help="插件目录（默认当前检出）")
+    parser.add_argument("--players", type=int, default=10000, help="玩家数量")
+    args = parser.parse_args()
+
+    models = import_plugin("models", Path(args.root))
+    player_cls = models.Player
+    field_names = {f.name for f in fields(player_cls) if f.init}
+
+    loaded, decoded = measure_memory(player_cls, field_names, args.players)
+    print(f"插件目录: {Path(args.root).resolve()}")
+    print(f"Player: {len(field_names)} 个字段, __slots__: {'__slots__' in player_cls.__dict__}, "
+          f"实例 sys.getsizeof: {sys.getsizeof(make_player(player_cls, field_names, 'user_0'))} B")
+    print(f"每个玩家内存（{args.players} 个）: 载入后 {loaded:.0f} B, 解码 JSON 字段后 {decoded:.0f} B")
+    print("每条指令的 JSON 解码次数:")
+    for name, count in count_decodes(models, player_cls, field_names).items():
+        print(f"  {name}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_row_mapper.py
+"""
+玩家行映射基准：对比旧的 SELECT * + dict 过滤 + Player(**kwargs) 与 RowMapper 的按位置构造
+
+    python benchmarks/bench_row_mapper.py [--players 10000] [--repeat 5]
+
+使用内存数据库和同步 sqlite3，只衡量查询与对象构造本身，不含 aiosqlite 的线程切换。
+"""
+
+import argparse
+import sqlite3
+from dataclasses import fields
+
+from _common import best_of, import_plugin
+
+models = import_plugin("models")
+row_mapper = import_plugin("data.row_mapper")
+
+Player = models.Player
+PLAYER_MAPPER = row_mapper.PLAYER_MAPPER
+PLAYER_FIELDS = {f.name for f in fields(Player) if f.init}
+
+
+def build_database(count: int) -> sqlite3.Connection:
+    """建立含 count 个玩家的内存数据库（列与 Player 字段一致）"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"CREATE TABLE players ({PLAYER_MAPPER.columns}, PRIMARY KEY (user_id))")
+    template = Player("template")
+    rows = []
+    for i in range(count):
+        values = [getattr(template, name) for name in PLAYER_MAPPER.fields]
+        values[0] = f"user_{i}"
+        rows.append(values)
+    placeholders = ", ".join("?" * len(PLAYER_MAPPER.fields))
+    conn.executemany(f"INSERT INTO players ({PLAYER_MAPPER.columns}) VALUES ({placeholders})", rows)
+    conn.commit()
+    return conn
+
+
+def load_with_dicts(conn: sqlite3.Connection) -> list:
+    """旧路径：SELECT *，逐行转换为 dict 并按模型字段过滤后构造"""
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute("SELECT * FROM players").fetchall()
+    finally:
+        conn.row_factory = None
+    players = [Player(**{k: v for k, v in dict(row).items() if k in PLAYER_FIELDS}) for row in rows]
+    for player in players:
+        player.mark_clean()
+    return players
+
+
+def load_with_mapper(conn: sqlite3.Connection) -> list:
+    """新路径：显式列清单，按预先计算的位置直接构造"""
+    cursor = conn.execute(f"SELECT {PLAYER_MAPPER.columns} FROM players")
+    return PLAYER_MAPPER.map_rows(cursor.description, cursor.fetchall())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="玩家行映射基准")
+    parser.add_argument("--players", type=int, default=10000, help="玩家数量")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数（取最短耗时）")
+    args = parser.parse_args()
+
+    conn = build_database(args.players)
+    # 两条路径构造的对象必须一致
+    assert load_with_dicts(conn) == load_with_mapper(conn)
+
+    old = best_of(lambda: load_with_dicts(conn), args.repeat)
+    new = best_of(lambda: load_with_mapper(conn), args.repeat)
+    print(f"物化 {args.players} 个玩家（{len(PLAYER_MAPPER.fields)} 列）")
+    print(f"  dict 过滤 + Player(**kwargs): {old * 1000:8.1f} ms")
+    print(f"  RowMapper 按位置构造:         {new * 1000:8.1f} ms")
+    print(f"  加速比: {old / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/check_codec_compat.py
+"""
+检查 codec.dumps 的输出与 json.dumps(..., ensure_ascii=False) 逐字节一致，
+codec.loads 的解码结果与 json.loads 一致（历史数据与新写入的数据必须可以混用）
+
+    python benchmarks/check_codec_compat.py
+
+有不一致时逐条列出并以非零状态退出。
+"""
+
+import json
+import math
+import sys
+
+from _common import import_plugin
+from codec_samples import EDGE_CASE_DOCUMENTS, realistic_documents
+
+codec = import_plugin("codec")
+
+
+def _same(a, b) -> bool:
+    """比较解码结果（NaN 视为相等，同时区分 int 与 float）"""
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def main():
+    documents = [("edge_cases", doc) for doc in EDGE_CASE_DOCUMENTS]
+    for column, docs in realistic_documents().items():
+        documents.extend((column, doc) for doc in docs)
+
+    failures = []
+    for column, doc in documents:
+        expected = json.dumps(doc, ensure_ascii=False)
+        encoded = codec.dumps(doc)
+        if encoded.encode("utf-8") != expected.encode("utf-8"):
+            failures.append(f"[{column}] dumps 不一致:\n  json : {expected}\n  codec: {encoded}")
+            continue
+        if not _same(codec.loads(expected), json.loads(expected)):
+            failures.append(f"[{column}] loads 不一致: {expected}")
+
+    # 非法输入仍以 json.JSONDecodeError 抛出
+    for bad in ("{bad", "", "[1, 2"):
+        try:
+            codec.loads(bad)
+        except json.JSONDecodeError:
+            pass
+        else:
+            failures.append(f"非法输入未抛出 JSONDecodeError: {bad!r}")
+
+    print(f"解码后端: {codec.BACKEND}，检查 {len(documents)} 个文档，不一致 {len(failures)} 个")
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/codec_samples.py
+"""
+codec 基准与兼容性检查共用的样本：按配置文件中的物品构造接近线上数据的 JSON 列值
+"""
+
+import json
+import random
+from typing import Any, Dict, List
+
+from _common import PLUGIN_ROOT
+
+CONFIG_DIR = PLUGIN_ROOT / "config"
+
+
+def _load_config(name: str):
+    with open(CONFIG_DIR / name, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def realistic_documents(seed: int = 1) -> Dict[str, List[Any]]:
+    """按数据库 JSON 列分类的样本文档"""
+    rng = random.Random(seed)
+    weapons = _load_config("weapons.json")
+    pills = _load_config("pills.json")
+    items = list(_load_config("items.json").values())
+
+    # shop_items.data：商店物品的完整配置
+    shop_items = [dict(item) for item in weapons[:20] + pills[:10] + items[:10]]
+
+    # pill_effects.data：临时丹药效果
+    pill_effects = []
+    for pill in rng.sample(pills, 8):
+        effect = {
+            "pill_name": pill["name"],
+            "pill_id": pill.get("id", ""),
+            "subtype": pill.get("subtype", ""),
+            "start_time": 1760000000,
+            "expiry_time": 1760000000 + rng.randint(600, 7200),
+            "duration_minutes": rng.choice([10, 30, 60, 120]),
+            "last_tick_time": 1760000000,
+        }
+        for key in ("physical_damage", "magic_damage", "breakthrough_bonus", "max_success_rate"):
+            if key in pill:
+                effect[key] = pill[key]
+        pill_effects.append(effect)
+
+    # players.techniques / players.permanent_pill_gains
+    techniques = [["基础剑诀", "太极心法", "九阴真经", "御风诀"][: rng.randint(1, 4)] for _ in range(5)]
+    gains = [
+        {f"level_{i}": {"magic_damage": rng.randint(1, 50), "physical_damage": round(rng.random() * 3, 4),
+                        "death_protection_multiplier": 0.9} for i in range(rng.randint(1, 20))}
+        for _ in range(5)
+    ]
+
+    # bounty_tasks.rewards / user_cd.extra_data
+    bounty_rewards = [
+        {"stone": rng.randint(100, 50000), "exp": rng.randint(100, 200000), "difficulty": "hard",
+         "difficulty_name": "D级", "item_table": None, "description": "清剿妖兽，护佑一方",
+         "progress_tags": ["战斗", "秘境"]}
+        for _ in range(5)
+    ]
+    extra_data = [
+        {"rift_id": 3, "rift_name": "幽冥秘境",
+         "events": [{"t": i, "name": "遭遇妖兽", "reward": {"gold": 120, "exp": 300}} for i in range(10)]},
+        {},
+        {"adventure_type": "历练", "location": "青云山"},
+    ]
+
+    return {
+        "shop_items": shop_items,
+        "pill_effects": pill_effects,
+        "techniques": techniques,
+        "permanent_pill_gains": gains,
+        "bounty_rewards": bounty_rewards,
+        "user_cd_extra_data": extra_data,
+    }
+
+
+# 编码器行为的边界情况：浮点表示、特殊值、非字符串键、转义字符、大整数
+EDGE_CASE_DOCUMENTS = [
+    {"float": 0.1 + 0.2, "tiny": 1e-7, "huge": 1e20, "neg_zero": -0.0, "rate": 1.0},
+    [float("nan"), float("inf"), float("-inf")],
+    {1: "int", 2.5: "float", None: "none"},
+    {True: "bool", False: "bool"},
+    {"escape": "引号\"反斜杠\\换行\n制表\t控制\x01\x1f", "separators": "  ", "emoji": "🗡️"},
+    {"big": 123456789012345678901234567890, "neg": -(2 ** 63), "bool": [True, False, None]},
+    {"nested": {"empty_list": [], "empty_dict": {}, "tuple": (1, 2, 3)}},
+    "纯字符串",
+    42,
+    [],
+    {},
+]
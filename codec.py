@@ -0,0 +1,86 @@
+# codec.py
+"""
+数据库 JSON 列的统一编解码
+
+- 解码：安装了 orjson 或 msgspec 时优先使用，解析失败（如 NaN、超出 64 位的整数）时退回标准库，
+  因此结果与 json.loads 一致，错误仍以 json.JSONDecodeError 抛出。部分 orjson 版本会把超出 64 位的
+  整数静默解码为浮点数，此时含 19 位以上连续数字的文档直接交给标准库
+- 编码：输出必须与历史数据 json.dumps(ensure_ascii=False) 逐字节一致（分隔符带空格），
+  orjson/msgspec 只能输出紧凑格式，因此编码复用一个预先构造的标准库 C 编码器，
+  省去 json.dumps(ensure_ascii=False) 每次调用都重新构造 JSONEncoder 和 C 编码器的开销
+"""
+
+import json
+import re
+from json.encoder import c_make_encoder, encode_basestring
+from typing import Any, Union
+
+_std_loads = json.loads
+# 19 位及以上的连续数字（可能超出 64 位整数范围）；首字符单独写出，re 可按字符集快速定位起点
+_LONG_DIGITS = re.compile(r"[0-9][0-9]{18}")
+_LONG_DIGITS_BYTES = re.compile(rb"[0-9][0-9]{18}")
+
+if c_make_encoder is not None:
+    # 参数与 JSONEncoder(ensure_ascii=False).iterencode 构造的 C 编码器相同，
+    # 但不做循环引用检查（数据库 JSON 列不会出现循环引用）
+    _c_encoder = c_make_encoder(
+        None, json.JSONEncoder().default, encode_basestring, None, ": ", ", ", False, False, True
+    )
+
+    def _encode(obj: Any) -> str:
+        return "".join(_c_encoder(obj, 0))
+else:
+    _encode = json.JSONEncoder(ensure_ascii=False).encode
+
+try:
+    import orjson
+
+    _fast_loads = orjson.loads
+    BACKEND = "orjson"
+except ImportError:
+    try:
+        import msgspec
+
+        _fast_loads = msgspec.json.Decoder().decode
+        BACKEND = "msgspec"
+    except ImportError:
+        _fast_loads = None
+        BACKEND = "json"
+
+
+def _keeps_big_ints(decode) -> bool:
+    """快速解码器遇到超出 64 位的整数时是否报错或保持精确（而不是静默转为浮点数）"""
+    try:
+        return type(decode("18446744073709551616")) is int
+    except Exception:
+        return True
+
+
+def dumps(obj: Any) -> str:
+    """编码为 JSON 字符串，与 json.dumps(obj, ensure_ascii=False) 输出一致"""
+    return _encode(obj)
+
+
+if _fast_loads is None:
+    def loads(data: Union[str, bytes]) -> Any:
+        """解码 JSON 字符串"""
+        return _std_loads(data)
+elif _keeps_big_ints(_fast_loads):
+    def loads(data: Union[str, bytes]) -> Any:
+        """解码 JSON 字符串"""
+        try:
+            return _fast_loads(data)
+        except Exception:
+            # 快速解码器不支持的输入由标准库处理（同时得到标准的异常类型和信息）
+            return _std_loads(data)
+else:
+    def loads(data: Union[str, bytes]) -> Any:
+        """解码 JSON 字符串"""
+        long_digits = _LONG_DIGITS if isinstance(data, str) else _LONG_DIGITS_BYTES
+        if long_digits.search(data) is not None:
+            # 可能含超出 64 位的整数，快速解码器会丢失精度
+            return _std_loads(data)
+        try:
+            return _fast_loads(data)
+        except Exception:
+            return _std_loads(data)
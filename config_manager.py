@@ -1,3 +1,4 @@
+import hashlib
 import json
 from pathlib import Path
 from typing import List, Dict, Any
@@ -163,6 +164,11 @@ class ConfigManager:
         self._pill_names_cache = pill_names
         return pill_names
     
+    def get_equipment_signature(self) -> str:
+        """物品与武器配置的签名，配置变化时玩家保存的战力需要重算"""
+        content = json.dumps([self.items_data, self.weapons_data], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
     def invalidate_cache(self):
         """清除缓存，在配置重载时调用"""
         self._pill_names_cache = None
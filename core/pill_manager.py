@@ -73,31 +73,57 @@ class PillManager:
 
         return None
 
-    async def update_temporary_effects(self, player: Player):
-        """更新临时丹药效果，移除过期效果
+    async def update_temporary_effects(self, player: Player) -> List[dict]:
+        """结算临时丹药的持续效果，移除过期效果
 
         Args:
             player: 玩家对象
+
+        Returns:
+            仍然生效的临时效果列表
         """
-        effects = player.get_active_pill_effects()
+        effects = await self.db.ext.get_pill_effects(player.user_id)
+        if not effects:
+            return []
+
         current_time = int(time.time())
-        updated_effects = []
-        has_changes = False
+        active_effects = []
+        ticked_effects = []
+        has_expired = False
 
-        for effect in effects:
-            if self._apply_periodic_effects(player, effect, current_time):
-                has_changes = True
+        for effect_id, effect in effects:
+            ticked = self._apply_periodic_effects(player, effect, current_time)
 
             expiry_time = effect.get("expiry_time", 0)
             if expiry_time <= 0 or current_time < expiry_time:
-                updated_effects.append(effect)
+                active_effects.append(effect)
+                if ticked:
+                    ticked_effects.append((effect_id, effect))
             else:
-                has_changes = True
+                has_expired = True
                 logger.info(f"玩家 {player.user_id} 的丹药效果 {effect.get('pill_name')} 已过期")
 
-        if has_changes or len(updated_effects) != len(effects):
-            player.set_active_pill_effects(updated_effects)
-            await self.db.update_player(player)
+        if ticked_effects or has_expired:
+            async with self.db.transaction():
+                await self.db.update_player(player)
+                if ticked_effects:
+                    await self.db.ext.update_pill_effects(ticked_effects)
+                if has_expired:
+                    await self.db.ext.delete_expired_pill_effects(player.user_id, current_time)
+
+        return active_effects
+
+    async def get_active_effects(self, player: Player) -> List[dict]:
+        """获取当前生效（未过期）的临时丹药效果"""
+        current_time = int(time.time())
+        return [
+            effect for _, effect in await self.db.ext.get_pill_effects(player.user_id)
+            if effect.get("expiry_time", 0) <= 0 or current_time < effect["expiry_time"]
+        ]
+
+    async def _consume_pill(self, player: Player, pill_name: str):
+        """从丹药背包扣除一颗丹药"""
+        await self.db.ext.remove_player_pill(player.user_id, pill_name)
 
     async def use_pill(
         self,
@@ -113,11 +139,14 @@ class PillManager:
         Returns:
             (是否成功, 消息)
         """
-        # 检查背包是否有该丹药
-        inventory = player.get_pills_inventory()
-        if pill_name not in inventory or inventory[pill_name] <= 0:
-            return False, f"你的背包中没有【{pill_name}】！"
-
+        async with self.db.transaction():
+            # 检查背包是否有该丹药
+            if await self.db.ext.get_player_pill_count(player.user_id, pill_name) <= 0:
+                return False, f"你的背包中没有【{pill_name}】！"
+            return await self._use_pill(player, pill_name)
+
+    async def _use_pill(self, player: Player, pill_name: str) -> Tuple[bool, str]:
+        """使用丹药（已确认背包中有该丹药，在事务中执行）"""
         # 获取丹药配置
         pill_data = self.get_pill_by_name(pill_name)
         if not pill_data:
@@ -167,11 +196,7 @@ class PillManager:
         player.experience += exp_gain
 
         # 扣除丹药
-        inventory = player.get_pills_inventory()
-        inventory[pill_name] -= 1
-        if inventory[pill_name] <= 0:
-            del inventory[pill_name]
-        player.set_pills_inventory(inventory)
+        await self._consume_pill(player, pill_name)
 
         await self.db.update_player(player)
 
@@ -191,11 +216,7 @@ class PillManager:
         player.has_resurrection_pill = True
 
         # 扣除丹药
-        inventory = player.get_pills_inventory()
-        inventory[pill_name] -= 1
-        if inventory[pill_name] <= 0:
-            del inventory[pill_name]
-        player.set_pills_inventory(inventory)
+        await self._consume_pill(player, pill_name)
 
         await self.db.update_player(player)
 
@@ -238,16 +259,10 @@ class PillManager:
                 effect[key] = pill_data[key]
 
         # 添加到活跃效果
-        effects = player.get_active_pill_effects()
-        effects.append(effect)
-        player.set_active_pill_effects(effects)
+        await self.db.ext.add_pill_effect(player.user_id, effect)
 
         # 扣除丹药
-        inventory = player.get_pills_inventory()
-        inventory[pill_name] -= 1
-        if inventory[pill_name] <= 0:
-            del inventory[pill_name]
-        player.set_pills_inventory(inventory)
+        await self._consume_pill(player, pill_name)
 
         await self.db.update_player(player)
 
@@ -420,11 +435,7 @@ class PillManager:
         player.set_permanent_pill_gains(permanent_gains)
 
         # 扣除丹药
-        inventory = player.get_pills_inventory()
-        inventory[pill_name] -= 1
-        if inventory[pill_name] <= 0:
-            del inventory[pill_name]
-        player.set_pills_inventory(inventory)
+        await self._consume_pill(player, pill_name)
 
         await self.db.update_player(player)
 
@@ -517,11 +528,7 @@ class PillManager:
                 msg_parts.append("🛡️ 获得定魂护盾：下一次负面效果将被抵消")
 
         # 扣除丹药
-        inventory = player.get_pills_inventory()
-        inventory[pill_name] -= 1
-        if inventory[pill_name] <= 0:
-            del inventory[pill_name]
-        player.set_pills_inventory(inventory)
+        await self._consume_pill(player, pill_name)
 
         await self.db.update_player(player)
 
@@ -596,7 +603,7 @@ class PillManager:
         await self.db.update_player(player)
         return True
 
-    def calculate_pill_attribute_effects(self, player: Player) -> dict:
+    async def calculate_pill_attribute_effects(self, player: Player) -> dict:
         """计算丹药对属性的影响（乘法加成）
 
         Args:
@@ -605,8 +612,7 @@ class PillManager:
         Returns:
             属性乘法倍率字典
         """
-        effects = player.get_active_pill_effects()
-        current_time = int(time.time())
+        effects = await self.get_active_effects(player)
         multipliers = {
             "physical_damage": 1.0,
             "magic_damage": 1.0,
@@ -617,9 +623,6 @@ class PillManager:
 
         # 累加临时效果
         for effect in effects:
-            expiry_time = effect.get("expiry_time", 0)
-            if expiry_time > 0 and current_time >= expiry_time:
-                continue
             if "physical_damage_multiplier" in effect:
                 multipliers["physical_damage"] += effect["physical_damage_multiplier"]
             if "magic_damage_multiplier" in effect:
@@ -645,20 +648,15 @@ class PillManager:
 
         return multipliers
 
-    def get_breakthrough_modifiers(self, player: Player) -> dict:
+    async def get_breakthrough_modifiers(self, player: Player) -> dict:
         """获取突破时的临时与永久加成信息"""
-        effects = player.get_active_pill_effects()
-        current_time = int(time.time())
+        effects = await self.get_active_effects(player)
         temp_bonus = 0.0
         has_temp_effects = False
 
         # 按丹药类型分组计算加成，同类型只取最高值
         bonus_groups = {}
         for effect in effects:
-            expiry_time = effect.get("expiry_time", 0)
-            if expiry_time > 0 and current_time >= expiry_time:
-                continue
-
             subtype = effect.get("subtype", "")
             if subtype in {"breakthrough_boost", "breakthrough_debuff"}:
                 pill_name = effect.get("pill_name", "")
@@ -698,15 +696,14 @@ class PillManager:
 
     async def consume_breakthrough_effects(self, player: Player):
         """突破完成后移除相关临时丹药效果"""
-        effects = player.get_active_pill_effects()
-        remaining_effects = [
-            effect for effect in effects
-            if effect.get("subtype", "") not in {"breakthrough_boost", "breakthrough_debuff"}
+        effects = await self.db.ext.get_pill_effects(player.user_id)
+        consumed_ids = [
+            effect_id for effect_id, effect in effects
+            if effect.get("subtype", "") in {"breakthrough_boost", "breakthrough_debuff"}
         ]
 
-        if len(remaining_effects) != len(effects):
-            player.set_active_pill_effects(remaining_effects)
-            await self.db.update_player(player)
+        if consumed_ids:
+            await self.db.ext.delete_pill_effects(consumed_ids)
 
     async def add_pill_to_inventory(self, player: Player, pill_name: str, count: int = 1):
         """添加丹药到背包
@@ -716,15 +713,9 @@ class PillManager:
             pill_name: 丹药名称
             count: 数量
         """
-        inventory = player.get_pills_inventory()
-        if pill_name in inventory:
-            inventory[pill_name] += count
-        else:
-            inventory[pill_name] = count
-        player.set_pills_inventory(inventory)
-        await self.db.update_player(player)
+        await self.db.ext.add_player_pill(player.user_id, pill_name, count)
 
-    def get_pill_inventory_display(self, player: Player) -> str:
+    async def get_pill_inventory_display(self, player: Player) -> str:
         """获取丹药背包显示文本
 
         Args:
@@ -733,7 +724,7 @@ class PillManager:
         Returns:
             丹药背包的格式化文本
         """
-        inventory = player.get_pills_inventory()
+        inventory = await self.db.ext.get_player_pills(player.user_id)
         if not inventory:
             return "你的丹药背包是空的！"
 
@@ -2,6 +2,7 @@
 
 from typing import TYPE_CHECKING, Optional, Tuple, List, Dict
 from ..models import Player
+from ..data import TransactionRollback
 
 if TYPE_CHECKING:
     from ..data import DataBase
@@ -29,32 +30,37 @@ class StorageRingManager:
             return config.get("capacity", 20)
         return 20
 
-    def get_used_slots(self, player: Player) -> int:
+    async def get_items(self, player: Player) -> Dict[str, int]:
+        """获取储物戒中的所有物品 {item_name: count}"""
+        return await self.db.ext.get_player_items(player.user_id)
+
+    async def get_used_slots(self, player: Player) -> int:
         """获取已使用的格子数（每种物品占1格，不管数量多少）"""
-        items = player.get_storage_ring_items()
-        return len(items)  # 物品种类数 = 已用格子数
+        return await self.db.ext.count_player_item_slots(player.user_id)
 
-    def get_available_slots(self, player: Player) -> int:
+    async def get_available_slots(self, player: Player) -> int:
         """获取可用的格子数"""
         capacity = self.get_ring_capacity(player.storage_ring)
-        used = self.get_used_slots(player)
+        used = await self.get_used_slots(player)
         return capacity - used
 
-    def get_space_warning(self, player: Player) -> Optional[str]:
+    def format_space_warning(self, used: int, capacity: int) -> Optional[str]:
+        """根据已用/总格子数生成空间警告（已满或剩余2格以下），不需要警告时返回None"""
+        available = capacity - used
+        if available <= 0:
+            return f"⚠️ 储物戒已满！({used}/{capacity}格)"
+        elif available <= 2:
+            return f"⚠️ 储物戒空间不足！仅剩{available}格({used}/{capacity}格)"
+        return None
+
+    async def get_space_warning(self, player: Player) -> Optional[str]:
         """获取储物戒空间警告（已满或剩余2格以下）
 
         Returns:
             警告消息，如果不需要警告则返回None
         """
-        available = self.get_available_slots(player)
-        capacity = self.get_ring_capacity(player.storage_ring)
-        used = self.get_used_slots(player)
-
-        if available == 0:
-            return f"⚠️ 储物戒已满！({used}/{capacity}格)"
-        elif available <= 2:
-            return f"⚠️ 储物戒空间不足！仅剩{available}格({used}/{capacity}格)"
-        return None
+        used = await self.get_used_slots(player)
+        return self.format_space_warning(used, self.get_ring_capacity(player.storage_ring))
 
     def is_pill(self, item_name: str) -> bool:
         """检查物品是否为丹药类型"""
@@ -72,126 +78,69 @@ class StorageRingManager:
 
         return True, ""
 
-    async def store_item(self, player: Player, item_name: str, count: int = 1, silent: bool = False, external_transaction: bool = False) -> Tuple[bool, str]:
-        """将物品存入储物戒（带事务保护）
-        
-        Args:
-            external_transaction: 如果为True，表示外部已有事务，跳过内部事务管理
+    async def store_item(self, player: Player, item_name: str, count: int = 1, silent: bool = False) -> Tuple[bool, str]:
+        """将物品存入储物戒（带事务保护，可在调用方的事务中嵌套调用）
+
+        新物品需要占用一格，已有的物品直接累加数量。
         """
         can_store, reason = self.can_store_item(item_name)
         if not can_store:
             return False, reason
 
-        if not external_transaction:
-            await self.db.conn.execute("BEGIN IMMEDIATE")
-        try:
-            # 当外部事务存在时，直接使用传递的player对象，避免多次获取导致的覆盖问题
-            if not external_transaction:
-                fresh_player = await self.db.get_player_by_id(player.user_id)
-                if not fresh_player:
-                    if not external_transaction:
-                        await self.db.conn.rollback()
-                    return False, "玩家不存在或已被删除"
-                player = fresh_player
-            items = player.get_storage_ring_items()
-
-            if item_name not in items:
-                available = self.get_available_slots(player)
-                if available <= 0:
-                    if not external_transaction:
-                        await self.db.conn.rollback()
-                    capacity = self.get_ring_capacity(player.storage_ring)
-                    return False, f"储物戒已满！({capacity}/{capacity}格)"
-
-            items[item_name] = items.get(item_name, 0) + count
-            player.set_storage_ring_items(items)
-            # 当外部事务存在时，不直接更新数据库，而是让外部事务统一处理
-            if not external_transaction:
-                await self.db.update_player(player)
-                await self.db.conn.commit()
+        async with self.db.transaction():
+            fresh_player = await self.db.get_player_by_id(player.user_id)
+            if not fresh_player:
+                return False, "玩家不存在或已被删除"
+            capacity = self.get_ring_capacity(fresh_player.storage_ring)
+            used = await self.db.ext.count_player_item_slots(player.user_id)
 
-            capacity = self.get_ring_capacity(player.storage_ring)
-            used = self.get_used_slots(player)
+            if await self.db.ext.get_player_item_count(player.user_id, item_name) == 0:
+                if used >= capacity:
+                    return False, f"储物戒已满！({capacity}/{capacity}格)"
+                used += 1
 
-            if silent:
-                return True, ""
+            await self.db.ext.add_player_item(player.user_id, item_name, count)
 
-            warning = self.get_space_warning(player)
-            msg = f"已将【{item_name}】x{count} 存入储物戒（{used}/{capacity}格）"
-            if warning:
-                msg += f"\n{warning}"
+        if silent:
+            return True, ""
 
-            return True, msg
-        except Exception:
-            if not external_transaction:
-                await self.db.conn.rollback()
-            raise
+        warning = self.format_space_warning(used, capacity)
+        msg = f"已将【{item_name}】x{count} 存入储物戒（{used}/{capacity}格）"
+        if warning:
+            msg += f"\n{warning}"
 
-    async def retrieve_item(self, player: Player, item_name: str, count: int = 1) -> Tuple[bool, str]:
-        """从储物戒取出物品（带事务保护）"""
-        await self.db.conn.execute("BEGIN IMMEDIATE")
-        try:
-            player = await self.db.get_player_by_id(player.user_id)
-            items = player.get_storage_ring_items()
+        return True, msg
 
-            if item_name not in items:
-                await self.db.conn.rollback()
+    async def _take_item(self, player: Player, item_name: str, count: int) -> Tuple[bool, str]:
+        """从储物戒扣除物品，返回 (是否成功, 失败原因)"""
+        async with self.db.transaction():
+            current_count = await self.db.ext.get_player_item_count(player.user_id, item_name)
+            if current_count == 0:
                 return False, f"储物戒中没有【{item_name}】"
-
-            current_count = items[item_name]
             if count > current_count:
-                await self.db.conn.rollback()
                 return False, f"储物戒中【{item_name}】数量不足（当前：{current_count}个）"
+            await self.db.ext.remove_player_item(player.user_id, item_name, count)
+        return True, ""
 
-            if count >= current_count:
-                del items[item_name]
-            else:
-                items[item_name] = current_count - count
-
-            player.set_storage_ring_items(items)
-            await self.db.update_player(player)
-            await self.db.conn.commit()
+    async def retrieve_item(self, player: Player, item_name: str, count: int = 1) -> Tuple[bool, str]:
+        """从储物戒取出物品（带事务保护）"""
+        success, reason = await self._take_item(player, item_name, count)
+        if not success:
+            return False, reason
 
-            capacity = self.get_ring_capacity(player.storage_ring)
-            used = self.get_used_slots(player)
-            return True, f"已从储物戒取出【{item_name}】x{count}（{used}/{capacity}格）"
-        except Exception:
-            await self.db.conn.rollback()
-            raise
+        capacity = self.get_ring_capacity(player.storage_ring)
+        used = await self.get_used_slots(player)
+        return True, f"已从储物戒取出【{item_name}】x{count}（{used}/{capacity}格）"
 
     async def discard_item(self, player: Player, item_name: str, count: int = 1) -> Tuple[bool, str]:
         """丢弃储物戒中的物品（带事务保护）"""
-        await self.db.conn.execute("BEGIN IMMEDIATE")
-        try:
-            player = await self.db.get_player_by_id(player.user_id)
-            items = player.get_storage_ring_items()
-
-            if item_name not in items:
-                await self.db.conn.rollback()
-                return False, f"储物戒中没有【{item_name}】"
-
-            current_count = items[item_name]
-            if count > current_count:
-                await self.db.conn.rollback()
-                return False, f"储物戒中【{item_name}】数量不足（当前：{current_count}个）"
-
-            if count >= current_count:
-                del items[item_name]
-                discard_count = current_count
-            else:
-                items[item_name] = current_count - count
-                discard_count = count
-
-            player.set_storage_ring_items(items)
-            await self.db.update_player(player)
-            await self.db.conn.commit()
+        success, reason = await self._take_item(player, item_name, count)
+        if not success:
+            return False, reason
 
-            capacity = self.get_ring_capacity(player.storage_ring)
-            used = self.get_used_slots(player)
-            return True, f"已丢弃【{item_name}】x{discard_count}（{used}/{capacity}格）"
-        except Exception:
-            await self.db.conn.rollback()
-            raise
+        capacity = self.get_ring_capacity(player.storage_ring)
+        used = await self.get_used_slots(player)
+        return True, f"已丢弃【{item_name}】x{count}（{used}/{capacity}格）"
 
     def check_upgrade_requirement(self, player: Player, new_ring_name: str) -> Tuple[bool, str]:
         """检查玩家是否满足储物戒升级要求"""
@@ -265,12 +214,12 @@ class StorageRingManager:
             f"品级：{ring_config.get('rank', '未知')}{cost_msg}"
         )
 
-    def get_storage_ring_info(self, player: Player) -> dict:
+    async def get_storage_ring_info(self, player: Player) -> dict:
         """获取储物戒完整信息"""
         ring_config = self.get_storage_ring_config(player.storage_ring) or {}
-        items = player.get_storage_ring_items()
+        items = await self.get_items(player)
         capacity = self.get_ring_capacity(player.storage_ring)
-        used = self.get_used_slots(player)
+        used = len(items)
 
         return {
             "name": player.storage_ring,
@@ -297,11 +246,24 @@ class StorageRingManager:
         rings.sort(key=lambda x: x["capacity"])
         return rings
 
-    def get_item_count(self, player: Player, item_name: str) -> int:
+    async def get_item_count(self, player: Player, item_name: str) -> int:
         """获取储物戒中某物品的数量"""
-        items = player.get_storage_ring_items()
-        return items.get(item_name, 0)
+        return await self.db.ext.get_player_item_count(player.user_id, item_name)
 
-    def has_item(self, player: Player, item_name: str, count: int = 1) -> bool:
+    async def has_item(self, player: Player, item_name: str, count: int = 1) -> bool:
         """检查储物戒中是否有足够数量的物品"""
-        return self.get_item_count(player, item_name) >= count
+        return await self.get_item_count(player, item_name) >= count
+
+    async def consume_items(self, player: Player, materials: Dict[str, int]) -> bool:
+        """原子地扣除多种物品，任一数量不足时全部不扣除
+
+        Returns:
+            是否扣除成功
+        """
+        enough = True
+        async with self.db.transaction():
+            for item_name, count in materials.items():
+                if not await self.db.ext.remove_player_item(player.user_id, item_name, count):
+                    enough = False
+                    raise TransactionRollback()
+        return enough
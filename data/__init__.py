@@ -1,6 +1,7 @@
 # data/__init__.py
 
-from .data_manager import DataBase
+from .data_manager import DataBase, PlayerVersionConflict
 from .migration import MigrationManager
+from .transaction import TransactionRollback
 
-__all__ = ["DataBase", "MigrationManager"]
\ No newline at end of file
+__all__ = ["DataBase", "MigrationManager", "PlayerVersionConflict", "TransactionRollback"]
\ No newline at end of file
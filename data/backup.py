@@ -0,0 +1,172 @@
+# data/backup.py
+"""
+数据库在线备份：使用 SQLite 在线备份 API 分步复制页面，插件运行期间直接备份，无需停机或复制 .db 文件
+
+- 备份在独立线程中用独立的只读连接执行，不占用事件循环和写连接；每步复制若干页后短暂停顿
+- 备份开始时在源连接上开启读事务固定快照（WAL 模式下不阻塞写入），
+  其他连接的写入不会导致备份 API 从头重新开始，得到的是开始时刻的一致快照
+- 先写入临时文件，完成后（可选 zlib 压缩）再改名，目录中不会出现不完整的备份
+- 按数量与天数轮换清理旧备份
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from astrbot.api import logger
+
+# 备份默认配置
+DEFAULT_BACKUP_ENABLED = True
+DEFAULT_BACKUP_INTERVAL_HOURS = 24.0
+DEFAULT_BACKUP_KEEP = 7  # 最多保留的备份数量
+DEFAULT_BACKUP_MAX_AGE_DAYS = 30  # 超过天数的备份删除，0 表示不按天数清理
+DEFAULT_BACKUP_COMPRESS = False
+DEFAULT_BACKUP_STEP_PAGES = 256  # 每步复制的页数
+DEFAULT_BACKUP_STEP_SLEEP_MS = 5  # 每步之间的停顿（毫秒）
+
+COMPRESSED_SUFFIX = ".db.zlib"
+_COMPRESS_CHUNK = 1 << 20
+
+
+class BackupCancelled(Exception):
+    """备份被取消（插件卸载）"""
+
+
+@dataclass
+class BackupResult:
+    """一次备份的结果"""
+    path: Path
+    size: int  # 备份文件字节数
+    duration: float  # 耗时（秒）
+    pages: int  # 复制的页数
+    removed: int  # 轮换删除的旧备份数量
+
+
+class DatabaseBackup:
+    """数据库在线备份"""
+
+    def __init__(self, db, backup_dir: Path, config: Optional[dict] = None):
+        config = config or {}
+        self.db = db
+        self.backup_dir = Path(backup_dir)
+        self.enabled = bool(config.get("ENABLED", DEFAULT_BACKUP_ENABLED))
+        self.compress = bool(config.get("COMPRESS", DEFAULT_BACKUP_COMPRESS))
+        self.interval = self._number(config, "INTERVAL_HOURS", DEFAULT_BACKUP_INTERVAL_HOURS, float) * 3600
+        self.keep = max(1, self._number(config, "KEEP", DEFAULT_BACKUP_KEEP, int))
+        self.max_age_days = max(0, self._number(config, "MAX_AGE_DAYS", DEFAULT_BACKUP_MAX_AGE_DAYS, int))
+        self.step_pages = max(1, self._number(config, "STEP_PAGES", DEFAULT_BACKUP_STEP_PAGES, int))
+        self.step_sleep = max(0, self._number(config, "STEP_SLEEP_MS", DEFAULT_BACKUP_STEP_SLEEP_MS, int)) / 1000
+        self._lock = asyncio.Lock()
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _number(config: dict, key: str, default, cast):
+        try:
+            return cast(config.get(key, default))
+        except (TypeError, ValueError):
+            logger.warning(f"[backup] 无效的 {key} 配置，使用默认值")
+            return default
+
+    @property
+    def running(self) -> bool:
+        """是否有备份正在进行"""
+        return self._lock.locked()
+
+    def cancel(self):
+        """取消正在进行的备份（插件卸载时调用）"""
+        self._stop.set()
+
+    def list_backups(self) -> List[Path]:
+        """已有的备份文件，按时间从新到旧"""
+        if not self.backup_dir.exists():
+            return []
+        stem = Path(self.db.db_path).stem
+        files = [
+            path for path in self.backup_dir.iterdir()
+            if path.name.startswith(f"{stem}-") and path.name.endswith((".db", COMPRESSED_SUFFIX))
+        ]
+        return sorted(files, key=lambda path: path.name, reverse=True)
+
+    async def run(self) -> BackupResult:
+        """执行一次备份并轮换旧备份"""
+        async with self._lock:
+            self._stop.clear()
+            # 缓存中尚未落盘的玩家修改先写入数据库
+            await self.db.flush_players()
+            started = time.perf_counter()
+            path, pages = await asyncio.to_thread(self._backup_to_file)
+            removed = await asyncio.to_thread(self._rotate)
+            result = BackupResult(path, path.stat().st_size, time.perf_counter() - started, pages, removed)
+            logger.info(
+                f"[backup] 备份完成：{path.name}，{result.size / 1048576:.1f} MB，"
+                f"{result.pages} 页，耗时 {result.duration:.1f} 秒"
+            )
+            return result
+
+    def _backup_to_file(self):
+        """在工作线程中执行：分步备份到临时文件，可选压缩后改名为正式文件"""
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{Path(self.db.db_path).stem}-{datetime.now():%Y%m%d-%H%M%S}"
+        final = self.backup_dir / (name + (COMPRESSED_SUFFIX if self.compress else ".db"))
+        partial = self.backup_dir / f"{name}.db.partial"
+
+        source = sqlite3.connect(f"file:{Path(self.db.db_path).as_posix()}?mode=ro", uri=True, isolation_level=None)
+        target = sqlite3.connect(partial)
+        pages = 0
+        try:
+            # 固定读快照：备份期间其他连接的写入不会使备份重新开始
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+            def progress(status, remaining, total):
+                nonlocal pages
+                pages = total
+                if self._stop.wait(self.step_sleep):
+                    raise BackupCancelled()
+
+            source.backup(target, pages=self.step_pages, progress=progress)
+            source.execute("COMMIT")
+        except BaseException:
+            target.close()
+            partial.unlink(missing_ok=True)
+            raise
+        finally:
+            source.close()
+        target.close()
+
+        if self.compress:
+            compressed = partial.with_name(partial.name + ".zlib")
+            compressor = zlib.compressobj()
+            with open(partial, "rb") as src, open(compressed, "wb") as dst:
+                while chunk := src.read(_COMPRESS_CHUNK):
+                    dst.write(compressor.compress(chunk))
+                dst.write(compressor.flush())
+            partial.unlink()
+            partial = compressed
+        partial.replace(final)
+        return final, pages
+
+    def _rotate(self) -> int:
+        """删除超出保留数量或超过保留天数的旧备份，返回删除数量"""
+        removed = 0
+        cutoff = time.time() - self.max_age_days * 86400 if self.max_age_days else None
+        for index, path in enumerate(self.list_backups()):
+            if index >= self.keep or (cutoff is not None and index > 0 and path.stat().st_mtime < cutoff):
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+def restore_compressed(source: Path, target: Path):
+    """把 zlib 压缩的备份解压为可直接使用的 .db 文件"""
+    decompressor = zlib.decompressobj()
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        while chunk := src.read(_COMPRESS_CHUNK):
+            dst.write(decompressor.decompress(chunk))
+        dst.write(decompressor.flush())
@@ -1,39 +1,130 @@
 # data/data_manager.py
 
+import asyncio
 import aiosqlite
+import inspect
 import json
-from dataclasses import fields
 from pathlib import Path
-from typing import Tuple, List, Optional
+from typing import Any, Callable, Dict, Iterable, Tuple, List, Optional
 from astrbot.api import logger
-from ..models import Player
+from .. import codec
+from ..models import COMBAT_STAT_COLUMNS, Item, Player
 from .database_extended import DatabaseExtended
+from .leaderboard import PLAYER_RANK_COLUMNS, Leaderboards
+from .player_cache import PlayerCache, build_player_cas_sql, build_player_update_sql, player_changed_columns
+from .read_pool import ReadPool, apply_pragmas, build_sqlite_pragmas, read_connection
+from .row_mapper import PLAYER_MAPPER
+from .transaction import SerializedConnection
+
+# 玩家缓存默认配置
+DEFAULT_PLAYER_CACHE_ENABLED = True
+DEFAULT_PLAYER_CACHE_SIZE = 1000
+DEFAULT_PLAYER_FLUSH_INTERVAL = 1.0  # 写回间隔（秒）
+DEFAULT_READ_POOL_SIZE = 2
+DEFAULT_WRITE_QUEUE_SIZE = 256
+DEFAULT_GROUP_COMMIT_WINDOW_MS = 0  # 组提交窗口（毫秒），0 表示关闭
+PLAYER_CAS_RETRIES = 5  # mutate_player 版本冲突时的最多尝试次数
+DELETE_BATCH_SIZE = 500  # 批量删除/批量查询时每条语句的参数个数（低于 SQLite 旧版本 999 个参数的上限）
+# 排行榜可用的分数列，每列都有 (分数 DESC, user_id) 索引（见 migration.RANKING_INDEXES），
+# 排行查询按键集分页，任何一页都只读取 limit 行
+RANKING_COLUMNS = ("experience", "gold", "combat_power")
+COMBAT_STATS_BACKFILL_CHUNK = 500  # 回填战力时每个事务处理的玩家数
+
+
+class PlayerVersionConflict(Exception):
+    """比较并交换更新玩家时多次重试仍然发生版本冲突"""
+
+    def __init__(self, user_id: str):
+        super().__init__(f"玩家 {user_id} 的数据被并发修改，重试后仍然冲突")
+        self.user_id = user_id
+
+
+# 商店物品表的列（与 _shop_item_params 的参数顺序一致）
+SHOP_ITEM_COLUMNS = "shop_id, item_name, position, item_type, rank, price, original_price, discount, stock, data"
+
+
+def _shop_item_from_row(row) -> dict:
+    """将 shop_items 查询结果行转换为商店物品字典"""
+    try:
+        data = codec.loads(row["data"])
+    except json.JSONDecodeError:
+        data = {}
+    return {
+        'name': row["item_name"], 'type': row["item_type"], 'rank': row["rank"],
+        'original_price': row["original_price"], 'discount': row["discount"],
+        'price': row["price"], 'stock': row["stock"], 'data': data,
+    }
+
+
+def _shop_item_params(shop_id: str, position: int, item: dict) -> tuple:
+    """将商店物品字典转换为 shop_items 的插入参数"""
+    return (
+        shop_id, item['name'], position, item.get('type', ''), item.get('rank', ''),
+        item.get('price', 0), item.get('original_price', item.get('price', 0)),
+        item.get('discount', 1.0), max(0, item.get('stock') or 0),
+        codec.dumps(item.get('data', {})),
+    )
 
-# 获取 Player 模型的所有字段名（用于过滤数据库中的多余字段，作为迁移未完成时的兼容）
-PLAYER_FIELDS = {f.name for f in fields(Player)}
 
 class DataBase:
     """数据库管理类，提供基础玩家操作"""
 
-    def __init__(self, db_file: str = "xiuxian_data_lite.db"):
+    def __init__(self, db_file: str = "xiuxian_data_lite.db", config: dict = None):
         self.db_path = Path(db_file)
-        self.conn: aiosqlite.Connection = None
+        self.conn: Optional[SerializedConnection] = None  # 写连接
         self.ext: Optional[DatabaseExtended] = None  # 扩展操作类
 
+        db_config = config or {}
+        self.flush_interval = float(db_config.get("PLAYER_FLUSH_INTERVAL", DEFAULT_PLAYER_FLUSH_INTERVAL))
+        self.player_cache: Optional[PlayerCache] = None  # 玩家写回缓存
+        if db_config.get("PLAYER_CACHE_ENABLED", DEFAULT_PLAYER_CACHE_ENABLED):
+            self.player_cache = PlayerCache(db_config.get("PLAYER_CACHE_SIZE", DEFAULT_PLAYER_CACHE_SIZE))
+        self._flush_task: Optional[asyncio.Task] = None
+        # 解析玩家已装备物品的函数及物品配置签名，由插件在载入物品配置后设置（见 set_equipment_resolver）
+        self.equipment_resolver: Optional[Callable[[Player], List[Item]]] = None
+        self.equipment_signature = ""
+        self.leaderboards = Leaderboards()  # 内存排行索引（我的排名），启动时由 load_leaderboards 重建
+
+        self.pragmas = build_sqlite_pragmas(db_config)
+        self.read_pool_size = int(db_config.get("READ_POOL_SIZE", DEFAULT_READ_POOL_SIZE))
+        self.read_pool: Optional[ReadPool] = None  # 只读连接池
+        self.write_queue_size = int(db_config.get("WRITE_QUEUE_SIZE", DEFAULT_WRITE_QUEUE_SIZE))
+        self.group_commit_window = max(
+            0.0, float(db_config.get("GROUP_COMMIT_WINDOW_MS", DEFAULT_GROUP_COMMIT_WINDOW_MS)) / 1000
+        )
+
     async def connect(self):
-        """连接数据库"""
-        self.conn = await aiosqlite.connect(self.db_path)
-        self.conn.row_factory = aiosqlite.Row
-        self.ext = DatabaseExtended(self.conn)  # 初始化扩展操作
+        """连接数据库（一个写连接 + 只读连接池，使用 WAL 模式）"""
+        conn = await aiosqlite.connect(self.db_path)
+        conn.row_factory = aiosqlite.Row
+        self.conn = SerializedConnection(conn, self.write_queue_size, self.group_commit_window)
+        await self.conn.execute("PRAGMA journal_mode = WAL")
+        await apply_pragmas(self.conn, self.pragmas)
+        if self.read_pool_size > 0:
+            self.read_pool = ReadPool(self.db_path, self.read_pool_size, self.pragmas)
+            await self.read_pool.open()
+        self.ext = DatabaseExtended(self.conn, self.player_cache, self.read_pool, self.leaderboards)  # 初始化扩展操作
+        if self.player_cache is not None and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
 
     async def close(self):
-        """关闭数据库连接"""
+        """关闭数据库连接（关闭前会将缓存中的修改落盘）"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
         if self.conn:
             try:
+                await self.flush_players()
+            except Exception as e:
+                logger.error(f"[database] 关闭前玩家数据落盘失败: {e}")
+            try:
+                if self.read_pool:
+                    await self.read_pool.close()
                 await self.conn.close()
             finally:
                 self.conn = None
                 self.ext = None
+                self.read_pool = None
 
     async def reconnect(self):
         """重连数据库（用于连接意外断开时）"""
@@ -54,8 +145,171 @@ class DataBase:
         logger.warning("[database] 检测到数据库连接断开，正在自动重连...")
         await self.reconnect()
 
+    # ===== 玩家缓存 =====
+
+    async def _flush_loop(self):
+        """定时将缓存中的玩家修改批量落盘"""
+        while True:
+            try:
+                await asyncio.sleep(self.flush_interval)
+                if self._connection_alive():
+                    await self.flush_players(background=True)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.warning(f"[database] 玩家数据定时落盘失败，将在下次重试: {e}")
+
+    async def flush_players(self, user_ids: Optional[List[str]] = None, background: bool = False) -> int:
+        """立即将缓存中的玩家修改落盘
+
+        Args:
+            user_ids: 只落盘指定玩家，默认全部
+            background: 是否走写队列的低优先级通道
+
+        Returns:
+            写入的玩家数量
+        """
+        if self.player_cache is None or not self.conn:
+            return 0
+        return await self.player_cache.flush(self.conn, user_ids, background)
+
+    async def load_leaderboards(self):
+        """从数据库重建内存排行索引（插件启动、数据库迁移完成后调用）"""
+        await self.flush_players()
+        async with self.reader() as conn:
+            await self.leaderboards.load(conn)
+
+    def _sync_leaderboards(self, player: Player, columns):
+        """事务提交后把影响排行的字段同步到内存排行索引"""
+        changes = {column: getattr(player, column) for column in columns if column in PLAYER_RANK_COLUMNS}
+        if changes:
+            user_id = player.user_id
+            self.conn.after_commit(lambda: self.leaderboards.observe_player(user_id, changes))
+
+    def transaction(self, background: bool = False):
+        """开启事务（async with），正常退出时提交、抛出异常时回滚
+
+        不同协程的事务经由单写者队列按先后顺序执行；同一协程内嵌套使用时以 SAVEPOINT 实现，
+        内层异常只回滚内层的修改。
+
+        Args:
+            background: 是否走低优先级通道（定时任务使用），交互指令优先
+        """
+        return self.conn.transaction(background)
+
+    async def submit(self, work, background: bool = False):
+        """提交写工作单元，由写任务在事务中执行
+
+        Args:
+            work: 接收写连接的异步函数，例如 ``lambda conn: conn.execute(sql, params)``
+            background: 是否走低优先级通道
+
+        Returns:
+            work 的返回值
+        """
+        return await self.conn.submit(work, background)
+
+    async def submit_grouped(self, work):
+        """提交非关键写操作，开启组提交时与窗口内的其他写操作共用一次 COMMIT
+
+        Args:
+            work: 接收写连接的异步函数
+
+        Returns:
+            (work 的返回值, durable future)；需要确认已提交时 ``await durable``
+        """
+        return await self.conn.submit_grouped(work)
+
+    def write_queue_stats(self) -> dict:
+        """写队列统计（队列深度、处理数量、平均等待时间等）"""
+        return self.conn.transactions.queue.stats()
+
+    def reader(self):
+        """获取只读查询使用的连接（async with），当前协程持有写连接上的事务时回退到写连接"""
+        return read_connection(self.conn, self.read_pool)
+
+    def set_equipment_resolver(self, resolver: Callable[[Player], List[Item]], signature: str = ""):
+        """设置解析已装备物品的函数，写入玩家时据此重算战力与总属性
+
+        Args:
+            resolver: 接收玩家、返回其已装备物品列表
+            signature: 物品配置签名，变化时 backfill_combat_stats 会为全部玩家重算
+        """
+        self.equipment_resolver = resolver
+        self.equipment_signature = signature
+
+    def refresh_combat_stats(self, player: Player, force: bool = False):
+        """影响战力的字段被修改（或没有数据库基线）时重算战力与总属性
+
+        Args:
+            player: 玩家对象
+            force: 不检查脏字段，总是重算（物品配置变化后的回填）
+        """
+        if self.equipment_resolver is None:
+            return
+        dirty = player.get_dirty_fields()
+        if force or dirty is None or not dirty.isdisjoint(COMBAT_STAT_COLUMNS):
+            player.refresh_combat_stats(self.equipment_resolver(player))
+
+    async def backfill_combat_stats(self, chunk_size: int = COMBAT_STATS_BACKFILL_CHUNK) -> int:
+        """为全部玩家重算战力与总属性（新增字段后首次启动，或物品配置变化后）
+
+        物品配置签名与上次回填时相同则直接返回。按 user_id 分批，每批在一个低优先级事务内
+        读取、计算并写回，期间其他写操作排队，不会与回填交错覆盖。
+
+        Returns:
+            重算的玩家数量
+        """
+        if self.equipment_resolver is None:
+            return 0
+        signature = self.equipment_signature
+        if await self.ext.system_config.get("combat_stats_signature") == signature:
+            return 0
+
+        updated = 0
+        last_id = ""
+        while True:
+            async with self.transaction(background=True):
+                # 缓存中尚未落盘的修改并入本事务，保证按最新数据计算
+                await self.flush_players()
+                players = await PLAYER_MAPPER.fetch_all(
+                    self.conn,
+                    f"SELECT {PLAYER_MAPPER.columns} FROM players WHERE user_id > ? ORDER BY user_id LIMIT ?",
+                    (last_id, chunk_size)
+                )
+                if not players:
+                    break
+                rows = []
+                for player in players:
+                    player.refresh_combat_stats(self.equipment_resolver(player))
+                    rows.append((player.combat_power, player.total_attributes, player.user_id))
+                # 派生数据，不增加行版本号
+                await self.conn.executemany(
+                    "UPDATE players SET combat_power = ?, total_attributes = ? WHERE user_id = ?", rows
+                )
+                def sync(rows=rows):
+                    for combat_power, total_attributes, user_id in rows:
+                        if self.player_cache is not None:
+                            self.player_cache.apply(
+                                user_id, combat_power=combat_power, total_attributes=total_attributes
+                            )
+                        self.leaderboards.observe_player(user_id, {"combat_power": combat_power})
+                self.conn.after_commit(sync)
+            updated += len(players)
+            last_id = players[-1].user_id
+
+        await self.ext.system_config.set("combat_stats_signature", signature)
+        logger.info(f"[database] 已为 {updated} 名玩家重算战力")
+        return updated
+
+    def _cache_player(self, player: Player):
+        """在没有未提交事务时，把与数据库一致的玩家放入缓存"""
+        if self.player_cache is not None and not self.conn.in_transaction:
+            self.player_cache.put(player)
+
     async def create_player(self, player: Player):
         """创建新玩家"""
+        self.refresh_combat_stats(player)
         await self.conn.execute(
             """
             INSERT INTO players (
@@ -69,8 +323,9 @@ class DataBase:
                 blessed_spot_flag, blessed_spot_name,
                 active_pill_effects, permanent_pill_gains, has_resurrection_pill, has_debuff_shield, pills_inventory,
                 storage_ring, storage_ring_items,
-                daily_pill_usage, last_daily_reset
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                daily_pill_usage, last_daily_reset,
+                combat_power, total_attributes
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 player.user_id,
@@ -117,136 +372,219 @@ class DataBase:
                 player.storage_ring,
                 player.storage_ring_items,
                 player.daily_pill_usage,
-                player.last_daily_reset
+                player.last_daily_reset,
+                player.combat_power,
+                player.total_attributes
             )
         )
         await self.conn.commit()
+        player.mark_clean()
+        if self.player_cache is not None:
+            self.conn.after_commit(lambda: self.player_cache.discard(player.user_id))
+        self._sync_leaderboards(player, PLAYER_RANK_COLUMNS)
 
     async def get_player_by_id(self, user_id: str) -> Player:
-        """根据用户ID获取玩家信息"""
-        async with self.conn.execute(
-            "SELECT * FROM players WHERE user_id = ?",
-            (user_id,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                # 过滤掉 Player 模型中不存在的字段（兼容旧数据库/迁移未完成的情况）
-                filtered_data = {k: v for k, v in dict(row).items() if k in PLAYER_FIELDS}
-                return Player(**filtered_data)
-            return None
+        """根据用户ID获取玩家信息（优先读取缓存）"""
+        if self.player_cache is not None:
+            if self.conn.owns_transaction:
+                # 事务中以数据库为准（事务内的修改在提交后才同步到缓存）
+                await self.player_cache.flush(self.conn, [user_id])
+            else:
+                cached = self.player_cache.get(user_id)
+                if cached is not None:
+                    return cached
+
+        async with self.reader() as conn:
+            player = await PLAYER_MAPPER.fetch_one(
+                conn,
+                f"SELECT {PLAYER_MAPPER.columns} FROM players WHERE user_id = ?",
+                (user_id,)
+            )
+        if player:
+            self._cache_player(player)
+        return player
+
+    async def get_players_by_ids(self, user_ids: Iterable[str]) -> Dict[str, Player]:
+        """批量获取玩家信息（优先读取缓存），未缓存的玩家分批用一条 IN 查询读取
+
+        Returns:
+            user_id -> 玩家，不存在的玩家不出现在结果中
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        players: Dict[str, Player] = {}
+        missing = user_ids
+        if self.player_cache is not None:
+            if self.conn.owns_transaction:
+                # 事务中以数据库为准（事务内的修改在提交后才同步到缓存）
+                await self.player_cache.flush(self.conn, user_ids)
+            else:
+                missing = []
+                for user_id in user_ids:
+                    cached = self.player_cache.get(user_id)
+                    if cached is None:
+                        missing.append(user_id)
+                    else:
+                        players[user_id] = cached
+
+        async with self.reader() as conn:
+            for start in range(0, len(missing), DELETE_BATCH_SIZE):
+                batch = missing[start:start + DELETE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                for player in await PLAYER_MAPPER.fetch_all(
+                    conn,
+                    f"SELECT {PLAYER_MAPPER.columns} FROM players WHERE user_id IN ({placeholders})",
+                    batch
+                ):
+                    self._cache_player(player)
+                    players[player.user_id] = player
+        return players
 
     async def get_player_by_name(self, user_name: str) -> Player:
-        """根据道号获取玩家信息"""
-        async with self.conn.execute(
-            "SELECT * FROM players WHERE user_name = ?",
-            (user_name,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                filtered_data = {k: v for k, v in dict(row).items() if k in PLAYER_FIELDS}
-                return Player(**filtered_data)
-            return None
-
-    async def update_player(self, player: Player):
-        """更新玩家信息"""
-        await self.conn.execute(
-            """
-            UPDATE players SET
-                level_index = ?,
-                spiritual_root = ?,
-                cultivation_type = ?,
-                user_name = ?,
-                lifespan = ?,
-                experience = ?,
-                gold = ?,
-                state = ?,
-                cultivation_start_time = ?,
-                last_check_in_date = ?,
-                level_up_rate = ?,
-                weapon = ?,
-                armor = ?,
-                main_technique = ?,
-                techniques = ?,
-                hp = ?,
-                mp = ?,
-                atk = ?,
-                atkpractice = ?,
-                spiritual_qi = ?,
-                max_spiritual_qi = ?,
-                blood_qi = ?,
-                max_blood_qi = ?,
-                magic_damage = ?,
-                physical_damage = ?,
-                magic_defense = ?,
-                physical_defense = ?,
-                mental_power = ?,
-                sect_id = ?,
-                sect_position = ?,
-                sect_contribution = ?,
-                sect_task = ?,
-                sect_elixir_get = ?,
-                blessed_spot_flag = ?,
-                blessed_spot_name = ?,
-                active_pill_effects = ?,
-                permanent_pill_gains = ?,
-                has_resurrection_pill = ?,
-                has_debuff_shield = ?,
-                pills_inventory = ?,
-                storage_ring = ?,
-                storage_ring_items = ?,
-                daily_pill_usage = ?,
-                last_daily_reset = ?
-            WHERE user_id = ?
-            """,
-            (
-                player.level_index,
-                player.spiritual_root,
-                player.cultivation_type,
-                player.user_name,
-                player.lifespan,
-                player.experience,
-                player.gold,
-                player.state,
-                player.cultivation_start_time,
-                player.last_check_in_date,
-                player.level_up_rate,
-                player.weapon,
-                player.armor,
-                player.main_technique,
-                player.techniques,
-                player.hp,
-                player.mp,
-                player.atk,
-                player.atkpractice,
-                player.spiritual_qi,
-                player.max_spiritual_qi,
-                player.blood_qi,
-                player.max_blood_qi,
-                player.magic_damage,
-                player.physical_damage,
-                player.magic_defense,
-                player.physical_defense,
-                player.mental_power,
-                player.sect_id,
-                player.sect_position,
-                player.sect_contribution,
-                player.sect_task,
-                player.sect_elixir_get,
-                player.blessed_spot_flag,
-                player.blessed_spot_name,
-                player.active_pill_effects,
-                player.permanent_pill_gains,
-                player.has_resurrection_pill,
-                int(player.has_debuff_shield),
-                player.pills_inventory,
-                player.storage_ring,
-                player.storage_ring_items,
-                player.daily_pill_usage,
-                player.last_daily_reset,
-                player.user_id
+        """根据道号获取玩家信息（空道号表示未设置，不匹配任何玩家）"""
+        await self.flush_players()
+        async with self.reader() as conn:
+            return await PLAYER_MAPPER.fetch_one(
+                conn,
+                f"SELECT {PLAYER_MAPPER.columns} FROM players WHERE user_name = ? AND user_name != ''",
+                (user_name,)
             )
+
+    async def update_player(self, player: Player, durable: bool = False):
+        """更新玩家信息
+
+        只写入自加载以来被修改过的字段；没有数据库基线的对象（如新建的 Player）写入全部字段。
+        启用缓存时，已缓存玩家的修改会先合并到缓存，由定时任务批量落盘。
+
+        Args:
+            player: 玩家对象
+            durable: 是否立即落盘（灵石交易等关键路径使用），会连同该玩家缓存中未落盘的修改一起写入
+        """
+        self.refresh_combat_stats(player)
+        columns = player_changed_columns(player)
+
+        if self.player_cache is not None and self.conn.owns_transaction:
+            # 事务中直接写入，提交后再同步到缓存，回滚时缓存保持不变
+            if columns:
+                values = {column: getattr(player, column) for column in columns}
+                await self.conn.execute(
+                    build_player_update_sql(columns), [*values.values(), player.user_id]
+                )
+                object.__setattr__(player, "version", player.version + 1)
+
+                def sync():
+                    self.player_cache.apply(player.user_id, **values)
+                    self.player_cache.bump_version(player.user_id)
+                self.conn.after_commit(sync)
+                self._sync_leaderboards(player, columns)
+            player.mark_clean()
+            return
+
+        snapshot = self.player_cache.merge(player, columns) if self.player_cache is not None else None
+
+        if snapshot is not None:
+            object.__setattr__(player, "version", snapshot.version)
+            self._sync_leaderboards(player, columns)
+            if not durable:
+                player.mark_clean()
+                await self.conn.commit()
+                return
+            # 直写时以快照为准，带上此前未落盘的修改
+            await self.player_cache.flush(self.conn, [player.user_id])
+        elif columns:
+            params = [getattr(player, column) for column in columns]
+            params.append(player.user_id)
+            await self.conn.execute(build_player_update_sql(columns), params)
+            object.__setattr__(player, "version", player.version + 1)
+            self._sync_leaderboards(player, columns)
+        await self.conn.commit()
+        player.mark_clean()
+        if snapshot is None:
+            self._cache_player(player)
+
+    async def update_player_cas(self, player: Player, durable: bool = False) -> bool:
+        """比较并交换地更新玩家：仅当玩家自读取以来未被其他写入修改（行版本号相同）时写入
+
+        与 update_player 一样只写入被修改过的字段，成功后 player.version 更新为新版本号。
+        已缓存的玩家在内存快照上比较并合并（单线程事件循环中不会被打断），否则在库内用
+        WHERE user_id = ? AND version = ? 比较。
+
+        Returns:
+            是否写入成功；返回 False 表示版本冲突，player 未被写入，应重新读取后重试（见 mutate_player）
+        """
+        self.refresh_combat_stats(player)
+        columns = player_changed_columns(player)
+
+        if self.player_cache is not None and not self.conn.owns_transaction:
+            snapshot = self.player_cache.peek(player.user_id)
+            if snapshot is not None:
+                if snapshot.version != player.version:
+                    return False
+                self.player_cache.merge(player, columns)
+                object.__setattr__(player, "version", snapshot.version)
+                self._sync_leaderboards(player, columns)
+                player.mark_clean()
+                if durable:
+                    await self.player_cache.flush(self.conn, [player.user_id])
+                return True
+
+        if self.player_cache is not None:
+            # 库内比较前先落盘该玩家在缓存中的修改（事务中会并入当前事务）
+            await self.player_cache.flush(self.conn, [player.user_id])
+
+        values = {column: getattr(player, column) for column in columns}
+        cursor = await self.conn.execute(
+            build_player_cas_sql(columns), [*values.values(), player.user_id, player.version]
         )
+        if cursor.rowcount == 0:
+            return False
+        self._sync_leaderboards(player, columns)
         await self.conn.commit()
+        object.__setattr__(player, "version", player.version + 1)
+        player.mark_clean()
+
+        if self.player_cache is not None:
+            if self.conn.owns_transaction:
+                version = player.version
+                self.conn.after_commit(
+                    lambda: self.player_cache.apply(player.user_id, version=version, **values)
+                )
+            else:
+                self._cache_player(player)
+        return True
+
+    async def mutate_player(
+        self,
+        user_id: str,
+        mutation: Callable[[Player], Any],
+        retries: int = PLAYER_CAS_RETRIES,
+        durable: bool = False,
+    ):
+        """读取玩家、执行修改函数并以比较并交换方式写回，版本冲突时重新读取并重试
+
+        修改函数可以是普通函数或协程函数，应只依赖传入的玩家对象计算修改（重试时会以最新数据再次调用）。
+
+        Args:
+            user_id: 玩家ID
+            mutation: 修改函数，接收玩家对象，其返回值作为本方法的返回值
+            retries: 最多尝试次数
+            durable: 是否立即落盘
+
+        Returns:
+            修改函数的返回值；玩家不存在时返回 None
+
+        Raises:
+            PlayerVersionConflict: 重试次数用尽仍然冲突
+        """
+        for _ in range(max(1, retries)):
+            player = await self.get_player_by_id(user_id)
+            if player is None:
+                return None
+            result = mutation(player)
+            if inspect.isawaitable(result):
+                result = await result
+            if await self.update_player_cas(player, durable):
+                return result
+        raise PlayerVersionConflict(user_id)
 
     async def delete_player(self, user_id: str):
         """删除玩家"""
@@ -255,44 +593,87 @@ class DataBase:
             (user_id,)
         )
         await self.conn.commit()
+        if self.player_cache is not None:
+            self.conn.after_commit(lambda: self.player_cache.discard(user_id))
+        self.conn.after_commit(lambda: self.leaderboards.remove_player(user_id))
 
     async def delete_player_cascade(self, user_id: str):
-        """级联删除玩家及所有关联数据"""
-        async def safe_execute(sql: str, params: tuple):
-            try:
-                await self.conn.execute(sql, params)
-            except Exception as e:
-                sql_preview = sql.strip().split(" ")[0]
-                logger.warning(f"[delete_player_cascade] 忽略执行 {sql_preview}: {e}")
-
-        statements = [
-            ("UPDATE spirit_eyes SET owner_id = NULL, owner_name = NULL, claim_time = NULL WHERE owner_id = ?", (user_id,)),
-            ("DELETE FROM blessed_lands WHERE user_id = ?", (user_id,)),
-            ("DELETE FROM spirit_farms WHERE user_id = ?", (user_id,)),
-            ("DELETE FROM bank_accounts WHERE user_id = ?", (user_id,)),
-            ("UPDATE bank_loans SET status = 'bad_debt' WHERE user_id = ? AND status = 'active'", (user_id,)),
-            ("DELETE FROM bounty_tasks WHERE user_id = ?", (user_id,)),
-            ("DELETE FROM dual_cultivation WHERE user_id = ?", (user_id,)),
-            ("DELETE FROM dual_cultivation_requests WHERE from_id = ? OR target_id = ?", (user_id, user_id)),
-            ("DELETE FROM user_cd WHERE user_id = ?", (user_id,)),
-            ("DELETE FROM buff_info WHERE user_id = ?", (user_id,)),
-            ("DELETE FROM impart_info WHERE user_id = ?", (user_id,)),
-            ("DELETE FROM combat_cooldowns WHERE attacker_id = ? OR defender_id = ?", (user_id, user_id)),
-            ("DELETE FROM pending_gifts WHERE sender_id = ? OR receiver_id = ?", (user_id, user_id)),
-        ]
-
-        for sql, params in statements:
-            await safe_execute(sql, params)
-
-        await self.conn.execute("DELETE FROM players WHERE user_id = ?", (user_id,))
-        await self.conn.commit()
+        """级联删除玩家及所有关联数据（由外键 ON DELETE CASCADE 与删除触发器完成）"""
+        await self.delete_players_cascade([user_id])
+
+    async def delete_players_cascade(self, user_ids: List[str]) -> int:
+        """在一个事务内级联删除多个玩家，返回实际删除的玩家数"""
+        user_ids = list(dict.fromkeys(user_ids))
+        deleted = 0
+        async with self.transaction():
+            for start in range(0, len(user_ids), DELETE_BATCH_SIZE):
+                batch = user_ids[start:start + DELETE_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                cursor = await self.conn.execute(f"DELETE FROM players WHERE user_id IN ({placeholders})", batch)
+                deleted += cursor.rowcount
+            if user_ids:
+                def discard_cached():
+                    for user_id in user_ids:
+                        if self.player_cache is not None:
+                            self.player_cache.discard(user_id)
+                        self.leaderboards.remove_player(user_id)
+
+                self.conn.after_commit(discard_cached)
+        return deleted
 
     async def get_all_players(self):
         """获取所有玩家"""
-        async with self.conn.execute("SELECT * FROM players") as cursor:
-            rows = await cursor.fetchall()
-            # 过滤掉 Player 模型中不存在的字段（兼容旧数据库/迁移未完成的情况）
-            return [Player(**{k: v for k, v in dict(row).items() if k in PLAYER_FIELDS}) for row in rows]
+        await self.flush_players()
+        async with self.reader() as conn:
+            return await PLAYER_MAPPER.fetch_all(conn, f"SELECT {PLAYER_MAPPER.columns} FROM players")
+
+    async def get_top_players(
+        self, column: str, limit: int = 10, after: Optional[Tuple[Any, str]] = None
+    ) -> List[Player]:
+        """按排行分数列降序（同分按 user_id）获取 limit 名玩家
+
+        Args:
+            column: 分数列，取值见 RANKING_COLUMNS
+            limit: 数量
+            after: 上一页最后一名的 (分数, user_id)；给出时返回排在其后的玩家（键集分页）
+        """
+        if column not in RANKING_COLUMNS:
+            raise ValueError(f"不支持的排行列: {column}")
+        # 缓存中尚未落盘的修改会影响名次
+        await self.flush_players()
+        async with self.reader() as conn:
+            if after is None:
+                return await PLAYER_MAPPER.fetch_all(
+                    conn,
+                    f"SELECT {PLAYER_MAPPER.columns} FROM players ORDER BY {column} DESC, user_id LIMIT ?",
+                    (limit,)
+                )
+            score, user_id = after
+            return await PLAYER_MAPPER.fetch_all(
+                conn,
+                f"""
+                SELECT {PLAYER_MAPPER.columns} FROM players
+                WHERE {column} <= ? AND ({column} < ? OR user_id > ?)
+                ORDER BY {column} DESC, user_id LIMIT ?
+                """,
+                (score, score, user_id, limit)
+            )
+
+    async def get_ranking_key(self, column: str, offset: int) -> Optional[Tuple[Any, str]]:
+        """排在第 offset + 1 名的玩家的 (分数, user_id)，不存在时返回 None
+
+        只扫描索引、不读取行数据；用于跳页且内存排行索引不可用时定位分页起点。
+        """
+        if column not in RANKING_COLUMNS:
+            raise ValueError(f"不支持的排行列: {column}")
+        await self.flush_players()
+        async with self.reader() as conn:
+            async with conn.execute(
+                f"SELECT {column}, user_id FROM players ORDER BY {column} DESC, user_id LIMIT 1 OFFSET ?",
+                (offset,)
+            ) as cursor:
+                row = await cursor.fetchone()
+        return (row[0], row[1]) if row else None
 
     # ===== 商店数据操作 =====
 
@@ -305,142 +686,99 @@ class DataBase:
         Returns:
             (last_refresh_time, current_items) 元组
         """
-        async with self.conn.execute(
-            "SELECT last_refresh_time, current_items FROM shop WHERE shop_id = ?",
-            (shop_id,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            if row:
+        async with self.reader() as conn:
+            async with conn.execute(
+                "SELECT last_refresh_time FROM shop WHERE shop_id = ?",
+                (shop_id,)
+            ) as cursor:
+                row = await cursor.fetchone()
+                if not row:
+                    return 0, []
                 last_refresh_time = row[0]
-                try:
-                    current_items = json.loads(row[1])
-                except json.JSONDecodeError:
-                    current_items = []
-                return last_refresh_time, current_items
-            return 0, []
+
+            async with conn.execute(
+                f"SELECT {SHOP_ITEM_COLUMNS} FROM shop_items WHERE shop_id = ? ORDER BY position",
+                (shop_id,)
+            ) as cursor:
+                current_items = [_shop_item_from_row(row) async for row in cursor]
+        return last_refresh_time, current_items
 
     async def update_shop_data(self, shop_id: str, last_refresh_time: int, current_items: List[dict]):
-        """更新商店数据
+        """更新商店数据（整体替换商店的物品列表）
 
         Args:
             shop_id: 商店ID
             last_refresh_time: 最后刷新时间戳
             current_items: 当前商店物品列表
         """
-        items_json = json.dumps(current_items, ensure_ascii=False)
-        await self.conn.execute(
-            """
-            INSERT OR REPLACE INTO shop (shop_id, last_refresh_time, current_items)
-            VALUES (?, ?, ?)
-            """,
-            (shop_id, last_refresh_time, items_json)
-        )
-        await self.conn.commit()
+        async with self.transaction():
+            await self.conn.execute(
+                """
+                INSERT INTO shop (shop_id, last_refresh_time, current_items) VALUES (?, ?, '[]')
+                ON CONFLICT(shop_id) DO UPDATE SET last_refresh_time = excluded.last_refresh_time
+                """,
+                (shop_id, last_refresh_time)
+            )
+            await self.conn.execute("DELETE FROM shop_items WHERE shop_id = ?", (shop_id,))
+            await self.conn.executemany(
+                f"""
+                INSERT INTO shop_items ({SHOP_ITEM_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(shop_id, item_name) DO UPDATE SET stock = stock + excluded.stock
+                """,
+                [_shop_item_params(shop_id, position, item) for position, item in enumerate(current_items)]
+            )
 
-    async def decrement_shop_item_stock(self, shop_id: str, item_name: str, quantity: int = 1, external_transaction: bool = False) -> tuple[bool, int, int]:
-        """尝试扣减指定商店物品的库存（原子操作，可批量）
+    async def find_shop_item(self, item_name: str, shop_ids: List[str]) -> Optional[dict]:
+        """在多个商店中查找有库存的物品，按 shop_ids 的顺序优先
+
+        Returns:
+            物品字典（包含 shop_id），找不到时返回 None
+        """
+        async with self.reader() as conn:
+            async with conn.execute(
+                f"SELECT {SHOP_ITEM_COLUMNS} FROM shop_items WHERE item_name = ? AND stock > 0",
+                (item_name,)
+            ) as cursor:
+                found = {row["shop_id"]: row async for row in cursor}
+        for shop_id in shop_ids:
+            if shop_id in found:
+                item = _shop_item_from_row(found[shop_id])
+                item["shop_id"] = shop_id
+                return item
+        return None
+
+    async def decrement_shop_item_stock(self, shop_id: str, item_name: str, quantity: int = 1) -> Tuple[bool, int]:
+        """尝试扣减指定商店物品的库存（单条条件 UPDATE，可批量）
+
+        在调用方的事务中调用时并入该事务（SAVEPOINT）。
 
         Args:
             shop_id: 商店ID
             item_name: 物品名称
             quantity: 扣减数量（默认1，最小1）
-            external_transaction: 是否由外部管理事务（True时不执行内部BEGIN/COMMIT/ROLLBACK）
 
         Returns:
-            (是否成功, last_refresh_time, 扣减后的库存数量)
+            (是否成功, 扣减后的库存数量)
         """
         quantity = max(1, int(quantity))
-        if not external_transaction:
-            await self.conn.execute("BEGIN IMMEDIATE")
-        try:
+        async with self.transaction():
+            cursor = await self.conn.execute(
+                "UPDATE shop_items SET stock = stock - ? WHERE shop_id = ? AND item_name = ? AND stock >= ?",
+                (quantity, shop_id, item_name, quantity)
+            )
+            reserved = cursor.rowcount > 0
             async with self.conn.execute(
-                "SELECT last_refresh_time, current_items FROM shop WHERE shop_id = ?",
-                (shop_id,)
+                "SELECT stock FROM shop_items WHERE shop_id = ? AND item_name = ?",
+                (shop_id, item_name)
             ) as cursor:
                 row = await cursor.fetchone()
-
-            if not row:
-                if not external_transaction:
-                    await self.conn.rollback()
-                return False, 0, 0
-
-            last_refresh_time = row[0]
-            try:
-                current_items = json.loads(row[1])
-            except json.JSONDecodeError:
-                current_items = []
-
-            target_index = -1
-            for idx, item in enumerate(current_items):
-                if item.get('name') == item_name:
-                    target_index = idx
-                    break
-
-            if target_index == -1:
-                if not external_transaction:
-                    await self.conn.rollback()
-                return False, last_refresh_time, 0
-
-            stock = current_items[target_index].get('stock', 0)
-            if stock is None or stock <= 0:
-                if not external_transaction:
-                    await self.conn.rollback()
-                return False, last_refresh_time, max(stock or 0, 0)
-
-            if stock < quantity:
-                if not external_transaction:
-                    await self.conn.rollback()
-                return False, last_refresh_time, stock
-
-            new_stock = stock - quantity
-            current_items[target_index]['stock'] = new_stock
-
-            items_json = json.dumps(current_items, ensure_ascii=False)
-            await self.conn.execute(
-                "UPDATE shop SET current_items = ?, last_refresh_time = ? WHERE shop_id = ?",
-                (items_json, last_refresh_time, shop_id)
-            )
-            if not external_transaction:
-                await self.conn.commit()
-            return True, last_refresh_time, new_stock
-        except Exception:
-            if not external_transaction:
-                await self.conn.rollback()
-            raise
+        return reserved, row[0] if row else 0
 
     async def increment_shop_item_stock(self, shop_id: str, item_name: str, quantity: int = 1):
         """回滚库存（在购买失败时恢复库存），支持批量"""
         quantity = max(1, int(quantity))
-        await self.conn.execute("BEGIN IMMEDIATE")
-        try:
-            async with self.conn.execute(
-                "SELECT last_refresh_time, current_items FROM shop WHERE shop_id = ?",
-                (shop_id,)
-            ) as cursor:
-                row = await cursor.fetchone()
-
-            if not row:
-                await self.conn.rollback()
-                return
-
-            last_refresh_time = row[0]
-            try:
-                current_items = json.loads(row[1])
-            except json.JSONDecodeError:
-                current_items = []
-
-            for item in current_items:
-                if item.get('name') == item_name:
-                    current_stock = item.get('stock', 0) or 0
-                    item['stock'] = current_stock + quantity
-                    break
-
-            items_json = json.dumps(current_items, ensure_ascii=False)
-            await self.conn.execute(
-                "UPDATE shop SET current_items = ?, last_refresh_time = ? WHERE shop_id = ?",
-                (items_json, last_refresh_time, shop_id)
-            )
-            await self.conn.commit()
-        except Exception:
-            await self.conn.rollback()
-            raise
+        await self.conn.execute(
+            "UPDATE shop_items SET stock = stock + ? WHERE shop_id = ? AND item_name = ?",
+            (quantity, shop_id, item_name)
+        )
+        await self.conn.commit()
@@ -3,19 +3,63 @@
 扩展数据库操作类，包含宗门、Boss、秘境等新系统的CRUD方法
 """
 
+import asyncio
 import aiosqlite
-import json
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+from .. import codec
+from ..models import Player
 from ..models_extended import (
     Sect, BuffInfo, Boss, Rift, ImpartInfo, UserCd
 )
+from .leaderboard import PLAYER_RANK_COLUMNS
+from .read_pool import read_connection
+from .system_config import SystemConfigStore
+from .row_mapper import (
+    PLAYER_MAPPER, SECT_MAPPER, BUFF_INFO_MAPPER, BOSS_MAPPER, RIFT_MAPPER,
+    IMPART_INFO_MAPPER, USER_CD_MAPPER
+)
 
 
 class DatabaseExtended:
     """数据库扩展操作类"""
     
-    def __init__(self, conn: aiosqlite.Connection):
+    def __init__(self, conn: aiosqlite.Connection, player_cache=None, read_pool=None, leaderboards=None):
         self.conn = conn
+        self.player_cache = player_cache  # 玩家写回缓存（可选），直接写 players 表时需同步
+        self.read_pool = read_pool  # 只读连接池（可选），用于排行榜等只读查询
+        self.leaderboards = leaderboards  # 内存排行索引（可选），分数变化时需同步
+        self.system_config = SystemConfigStore(conn)  # system_config 键值表的直写缓存
+
+    def transaction(self, background: bool = False):
+        """开启事务（async with），与 DataBase.transaction 共用同一个事务管理器"""
+        return self.conn.transaction(background)
+
+    def reader(self):
+        """获取只读查询使用的连接（async with）"""
+        return read_connection(self.conn, self.read_pool)
+
+    def _sync_player_cache(self, user_id: Optional[str], **changes):
+        """事务提交后，把直接写入 players 表的字段同步到玩家缓存和内存排行索引（user_id 为 None 表示全表）
+
+        直接写入 players 的语句都会把行版本号加一，这里同时同步缓存中的版本号。
+        全表写入的字段（宗门任务次数等）不影响排行。
+        """
+        leaderboards = self.leaderboards
+        if user_id is None or PLAYER_RANK_COLUMNS.isdisjoint(changes):
+            leaderboards = None
+        if self.player_cache is None and leaderboards is None:
+            return
+
+        def sync():
+            if self.player_cache is not None:
+                if user_id is None:
+                    self.player_cache.apply_all(**changes)
+                else:
+                    self.player_cache.apply(user_id, **changes)
+                self.player_cache.bump_version(user_id)
+            if leaderboards is not None:
+                leaderboards.observe_player(user_id, changes)
+        self.conn.after_commit(sync)
     
     # ===== 宗门系统 CRUD =====
     
@@ -43,36 +87,27 @@ class DatabaseExtended:
     
     async def get_sect_by_id(self, sect_id: int) -> Optional[Sect]:
         """根据ID获取宗门信息"""
-        async with self.conn.execute(
-            "SELECT * FROM sects WHERE sect_id = ?",
+        return await SECT_MAPPER.fetch_one(
+            self.conn,
+            f"SELECT {SECT_MAPPER.columns} FROM sects WHERE sect_id = ?",
             (sect_id,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return Sect(**dict(row))
-            return None
+        )
     
     async def get_sect_by_owner(self, owner_id: str) -> Optional[Sect]:
         """根据宗主ID获取宗门信息"""
-        async with self.conn.execute(
-            "SELECT * FROM sects WHERE sect_owner = ?",
+        return await SECT_MAPPER.fetch_one(
+            self.conn,
+            f"SELECT {SECT_MAPPER.columns} FROM sects WHERE sect_owner = ?",
             (owner_id,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return Sect(**dict(row))
-            return None
+        )
     
     async def get_sect_by_name(self, sect_name: str) -> Optional[Sect]:
         """根据宗门名称获取宗门信息"""
-        async with self.conn.execute(
-            "SELECT * FROM sects WHERE sect_name = ?",
+        return await SECT_MAPPER.fetch_one(
+            self.conn,
+            f"SELECT {SECT_MAPPER.columns} FROM sects WHERE sect_name = ?",
             (sect_name,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return Sect(**dict(row))
-            return None
+        )
     
     async def update_sect(self, sect: Sect):
         """更新宗门信息"""
@@ -100,9 +135,60 @@ class DatabaseExtended:
     
     async def get_all_sects(self) -> List[Sect]:
         """获取所有宗门"""
-        async with self.conn.execute("SELECT * FROM sects ORDER BY sect_scale DESC") as cursor:
-            rows = await cursor.fetchall()
-            return [Sect(**dict(row)) for row in rows]
+        async with self.reader() as conn:
+            return await SECT_MAPPER.fetch_all(conn, f"SELECT {SECT_MAPPER.columns} FROM sects ORDER BY sect_scale DESC")
+
+    async def get_sect_ranking(self, limit: int = 10, after: Optional[Tuple[int, int]] = None) -> List[dict]:
+        """获取宗门排行（建设度降序、同分按宗门ID），宗主道号与成员数随同一条查询返回
+
+        成员数用相关子查询在 idx_player_sect 上计数，只对返回的 limit 个宗门计算。
+
+        Args:
+            limit: 数量
+            after: 上一页最后一个宗门的 (建设度, 宗门ID)；给出时返回排在其后的宗门（键集分页）
+        """
+        if after is None:
+            sql = """
+                SELECT s.sect_id, s.sect_name, s.sect_owner, s.sect_scale, o.user_name,
+                       (SELECT COUNT(*) FROM players m WHERE m.sect_id = s.sect_id)
+                FROM sects s
+                LEFT JOIN players o ON o.user_id = s.sect_owner
+                ORDER BY s.sect_scale DESC, s.sect_id LIMIT ?
+            """
+            params = (limit,)
+        else:
+            sql = """
+                SELECT s.sect_id, s.sect_name, s.sect_owner, s.sect_scale, o.user_name,
+                       (SELECT COUNT(*) FROM players m WHERE m.sect_id = s.sect_id)
+                FROM sects s
+                LEFT JOIN players o ON o.user_id = s.sect_owner
+                WHERE s.sect_scale <= ? AND (s.sect_scale < ? OR s.sect_id > ?)
+                ORDER BY s.sect_scale DESC, s.sect_id LIMIT ?
+            """
+            params = (after[0], after[0], after[1], limit)
+        rankings = []
+        async with self.reader() as conn:
+            async with conn.execute(sql, params) as cursor:
+                async for row in cursor:
+                    rankings.append({
+                        "sect_id": row[0],
+                        "sect_name": row[1],
+                        "sect_owner": row[2],
+                        "sect_scale": row[3],
+                        "owner_name": row[4] or "",
+                        "member_count": row[5]
+                    })
+        return rankings
+
+    async def get_sect_ranking_key(self, offset: int) -> Optional[Tuple[int, int]]:
+        """宗门排行第 offset + 1 名的 (建设度, 宗门ID)，不存在时返回 None（只扫描索引）"""
+        async with self.reader() as conn:
+            async with conn.execute(
+                "SELECT sect_scale, sect_id FROM sects ORDER BY sect_scale DESC, sect_id LIMIT 1 OFFSET ?",
+                (offset,)
+            ) as cursor:
+                row = await cursor.fetchone()
+        return (row[0], row[1]) if row else None
     
     async def update_sect_materials(self, sect_id: int, materials: int, operation: int = 1):
         """更新宗门资材
@@ -154,14 +240,11 @@ class DatabaseExtended:
     
     async def get_buff_info(self, user_id: str) -> Optional[BuffInfo]:
         """获取用户buff信息"""
-        async with self.conn.execute(
-            "SELECT * FROM buff_info WHERE user_id = ?",
+        return await BUFF_INFO_MAPPER.fetch_one(
+            self.conn,
+            f"SELECT {BUFF_INFO_MAPPER.columns} FROM buff_info WHERE user_id = ?",
             (user_id,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return BuffInfo(**dict(row))
-            return None
+        )
     
     async def update_buff_info(self, buff_info: BuffInfo):
         """更新用户buff信息"""
@@ -221,24 +304,18 @@ class DatabaseExtended:
     
     async def get_active_boss(self) -> Optional[Boss]:
         """获取当前存活的Boss"""
-        async with self.conn.execute(
-            "SELECT * FROM boss WHERE status = 1 ORDER BY create_time DESC LIMIT 1"
-        ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return Boss(**dict(row))
-            return None
+        return await BOSS_MAPPER.fetch_one(
+            self.conn,
+            f"SELECT {BOSS_MAPPER.columns} FROM boss WHERE status = 1 ORDER BY create_time DESC LIMIT 1"
+        )
     
     async def get_boss_by_id(self, boss_id: int) -> Optional[Boss]:
         """根据ID获取Boss信息"""
-        async with self.conn.execute(
-            "SELECT * FROM boss WHERE boss_id = ?",
+        return await BOSS_MAPPER.fetch_one(
+            self.conn,
+            f"SELECT {BOSS_MAPPER.columns} FROM boss WHERE boss_id = ?",
             (boss_id,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return Boss(**dict(row))
-            return None
+        )
     
     async def update_boss(self, boss: Boss):
         """更新Boss信息"""
@@ -285,22 +362,18 @@ class DatabaseExtended:
     
     async def get_rift_by_id(self, rift_id: int) -> Optional[Rift]:
         """根据ID获取秘境信息"""
-        async with self.conn.execute(
-            "SELECT * FROM rifts WHERE rift_id = ?",
+        return await RIFT_MAPPER.fetch_one(
+            self.conn,
+            f"SELECT {RIFT_MAPPER.columns} FROM rifts WHERE rift_id = ?",
             (rift_id,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return Rift(**dict(row))
-            return None
+        )
     
     async def get_all_rifts(self) -> List[Rift]:
         """获取所有秘境"""
-        async with self.conn.execute(
-            "SELECT * FROM rifts ORDER BY rift_level ASC"
-        ) as cursor:
-            rows = await cursor.fetchall()
-            return [Rift(**dict(row)) for row in rows]
+        return await RIFT_MAPPER.fetch_all(
+            self.conn,
+            f"SELECT {RIFT_MAPPER.columns} FROM rifts ORDER BY rift_level ASC"
+        )
     
     # ===== 传承系统 CRUD =====
     
@@ -316,17 +389,16 @@ class DatabaseExtended:
             (user_id,)
         )
         await self.conn.commit()
+        if self.leaderboards is not None:
+            self.conn.after_commit(lambda: self.leaderboards.set_impart(user_id, 0.0))
     
     async def get_impart_info(self, user_id: str) -> Optional[ImpartInfo]:
         """获取用户传承信息"""
-        async with self.conn.execute(
-            "SELECT * FROM impart_info WHERE user_id = ?",
+        return await IMPART_INFO_MAPPER.fetch_one(
+            self.conn,
+            f"SELECT {IMPART_INFO_MAPPER.columns} FROM impart_info WHERE user_id = ?",
             (user_id,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return ImpartInfo(**dict(row))
-            return None
+        )
     
     async def update_impart_info(self, impart: ImpartInfo):
         """更新用户传承信息"""
@@ -343,6 +415,9 @@ class DatabaseExtended:
             )
         )
         await self.conn.commit()
+        if self.leaderboards is not None:
+            user_id, atk_per = impart.user_id, impart.impart_atk_per
+            self.conn.after_commit(lambda: self.leaderboards.set_impart(user_id, atk_per))
     
     # ===== 用户CD系统 CRUD =====
     
@@ -359,109 +434,382 @@ class DatabaseExtended:
     
     async def get_user_cd(self, user_id: str) -> Optional[UserCd]:
         """获取用户CD信息"""
-        async with self.conn.execute(
-            "SELECT * FROM user_cd WHERE user_id = ?",
+        return await USER_CD_MAPPER.fetch_one(
+            self.conn,
+            f"SELECT {USER_CD_MAPPER.columns} FROM user_cd WHERE user_id = ?",
             (user_id,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return UserCd(**dict(row))
-            return None
-    
-    async def update_user_cd(self, user_cd: UserCd):
-        """更新用户CD信息"""
-        await self.conn.execute(
-            """
-            UPDATE user_cd SET
-                type = ?, create_time = ?, scheduled_time = ?, extra_data = ?
-            WHERE user_id = ?
-            """,
-            (user_cd.type, user_cd.create_time, user_cd.scheduled_time, user_cd.extra_data, user_cd.user_id)
         )
-        await self.conn.commit()
     
-    async def set_user_busy(self, user_id: str, busy_type: int, scheduled_time: int = 0, extra_data: dict = None):
-        """设置用户忙碌状态
+    async def update_user_cd(self, user_cd: UserCd) -> asyncio.Future:
+        """更新用户CD信息（非关键写操作，开启组提交时与其他写操作共用一次 COMMIT）
+
+        Returns:
+            durable future，需要确认已提交时 ``await``
+        """
+        async def work(conn):
+            await conn.execute(
+                """
+                UPDATE user_cd SET
+                    type = ?, create_time = ?, scheduled_time = ?, extra_data = ?
+                WHERE user_id = ?
+                """,
+                (user_cd.type, user_cd.create_time, user_cd.scheduled_time, user_cd.extra_data, user_cd.user_id)
+            )
+
+        _, durable = await self.conn.submit_grouped(work)
+        return durable
+    
+    async def set_user_busy(self, user_id: str, busy_type: int, scheduled_time: int = 0,
+                            extra_data: dict = None) -> asyncio.Future:
+        """设置用户忙碌状态（非关键写操作，参与组提交）
         
         Args:
             user_id: 用户ID
             busy_type: 0=空闲, 1=闭关, 2=历练, 3=探索秘境
             scheduled_time: 计划完成时间戳
             extra_data: 额外数据（如秘境ID等）
+
+        Returns:
+            durable future，需要确认已提交时 ``await``
         """
         import time
-        import json
-        extra_json = json.dumps(extra_data or {}, ensure_ascii=False)
-        await self.conn.execute(
-            """
-            UPDATE user_cd SET type = ?, create_time = ?, scheduled_time = ?, extra_data = ?
-            WHERE user_id = ?
-            """,
-            (busy_type, int(time.time()), scheduled_time, extra_json, user_id)
-        )
-        await self.conn.commit()
+        extra_json = codec.dumps(extra_data or {})
+        create_time = int(time.time())
+
+        async def work(conn):
+            await conn.execute(
+                """
+                UPDATE user_cd SET type = ?, create_time = ?, scheduled_time = ?, extra_data = ?
+                WHERE user_id = ?
+                """,
+                (busy_type, create_time, scheduled_time, extra_json, user_id)
+            )
+
+        _, durable = await self.conn.submit_grouped(work)
+        return durable
     
-    async def set_user_free(self, user_id: str):
+    async def set_user_free(self, user_id: str) -> asyncio.Future:
         """设置用户为空闲状态"""
-        await self.set_user_busy(user_id, 0, 0)
-    
+        return await self.set_user_busy(user_id, 0, 0)
+
+    # ===== JSON 列库内修改（JSON1） =====
+    # 不把整个 JSON 读到 Python 中解码、修改、再编码写回，而是一条 UPDATE 在库内完成。
+    # 注意 JSON1 函数输出紧凑格式（无空格），读取时按 JSON 解码，不影响结果。
+
+    # 允许在库内修改的 JSON 列：(表, 列) -> 行主键列。表名和列名只取自这里，不拼接外部输入
+    JSON_COLUMNS = {
+        ("user_cd", "extra_data"): "user_id",
+    }
+
+    @staticmethod
+    def _json_path(field: str) -> str:
+        """对象键对应的 JSON 路径"""
+        if '"' in field:
+            raise ValueError(f"JSON 键不能包含双引号: {field}")
+        return f'$."{field}"'
+
+    async def _json_update(self, table: str, column: str, row_key, expr: str, params: tuple) -> bool:
+        """执行单条 JSON 修改语句，expr 中的 {doc} 替换为当前列值（非法或空值按空对象/数组处理）"""
+        key_column = self.JSON_COLUMNS.get((table, column))
+        if key_column is None:
+            raise ValueError(f"不支持库内修改的 JSON 列: {table}.{column}")
+        empty = "'[]'" if "[#]" in expr else "'{}'"
+        doc = f"(CASE WHEN json_valid({column}) THEN {column} ELSE {empty} END)"
+        cursor = await self.conn.execute(
+            f"UPDATE {table} SET {column} = {expr.format(doc=doc)} WHERE {key_column} = ?",
+            params + (row_key,)
+        )
+        await self.conn.commit()
+        return cursor.rowcount > 0
+
+    async def json_set_field(self, table: str, column: str, row_key, field: str, value) -> bool:
+        """设置 JSON 对象的一个键（json_set），返回是否找到该行"""
+        return await self._json_update(
+            table, column, row_key, "json_set({doc}, ?, json(?))",
+            (self._json_path(field), codec.dumps(value))
+        )
+
+    async def json_insert_field(self, table: str, column: str, row_key, field: str, value) -> bool:
+        """仅当键不存在时设置 JSON 对象的一个键（json_insert），返回是否找到该行"""
+        return await self._json_update(
+            table, column, row_key, "json_insert({doc}, ?, json(?))",
+            (self._json_path(field), codec.dumps(value))
+        )
+
+    async def json_increment_field(self, table: str, column: str, row_key, field: str, delta: int = 1) -> bool:
+        """把 JSON 对象中的一个数值键加上 delta（不存在时视为0），返回是否找到该行"""
+        path = self._json_path(field)
+        return await self._json_update(
+            table, column, row_key, "json_set({doc}, ?, COALESCE(json_extract({doc}, ?), 0) + ?)",
+            (path, path, delta)
+        )
+
+    async def json_remove_field(self, table: str, column: str, row_key, field: str) -> bool:
+        """删除 JSON 对象的一个键（json_remove），返回是否找到该行"""
+        return await self._json_update(
+            table, column, row_key, "json_remove({doc}, ?)", (self._json_path(field),)
+        )
+
+    async def json_append(self, table: str, column: str, row_key, value) -> bool:
+        """向 JSON 数组末尾追加一个元素，返回是否找到该行"""
+        return await self._json_update(
+            table, column, row_key, "json_insert({doc}, '$[#]', json(?))", (codec.dumps(value),)
+        )
+
     # ===== Player扩展字段更新方法 =====
     
     async def update_player_hp_mp(self, user_id: str, hp: int, mp: int):
         """更新玩家HP和MP"""
         await self.conn.execute(
-            "UPDATE players SET hp = ?, mp = ? WHERE user_id = ?",
+            "UPDATE players SET hp = ?, mp = ?, version = version + 1 WHERE user_id = ?",
             (hp, mp, user_id)
         )
         await self.conn.commit()
+        self._sync_player_cache(user_id, hp=hp, mp=mp)
+    
+    async def update_player_name(self, user_id: str, user_name: str) -> bool:
+        """修改道号；道号已被其他玩家使用（违反唯一索引）时返回 False"""
+        try:
+            async with self.conn.transaction():
+                await self.conn.execute(
+                    "UPDATE players SET user_name = ?, version = version + 1 WHERE user_id = ?",
+                    (user_name, user_id)
+                )
+                self._sync_player_cache(user_id, user_name=user_name)
+        except aiosqlite.IntegrityError:
+            return False
+        return True
     
     async def update_player_sect_info(self, user_id: str, sect_id: int, sect_position: int):
         """更新玩家宗门信息"""
         await self.conn.execute(
-            "UPDATE players SET sect_id = ?, sect_position = ? WHERE user_id = ?",
+            "UPDATE players SET sect_id = ?, sect_position = ?, version = version + 1 WHERE user_id = ?",
             (sect_id, sect_position, user_id)
         )
         await self.conn.commit()
+        self._sync_player_cache(user_id, sect_id=sect_id, sect_position=sect_position)
     
     async def update_player_sect_contribution(self, user_id: str, contribution: int):
         """更新玩家宗门贡献度"""
         await self.conn.execute(
-            "UPDATE players SET sect_contribution = ? WHERE user_id = ?",
+            "UPDATE players SET sect_contribution = ?, version = version + 1 WHERE user_id = ?",
             (contribution, user_id)
         )
         await self.conn.commit()
+        self._sync_player_cache(user_id, sect_contribution=contribution)
     
     async def increment_sect_task_count(self, user_id: str, count: int = 1):
         """增加宗门任务完成次数"""
+        if self.player_cache is not None:
+            # 先落盘该玩家未写入的修改，保证自增基于最新值
+            await self.player_cache.flush(self.conn, [user_id])
         await self.conn.execute(
-            "UPDATE players SET sect_task = sect_task + ? WHERE user_id = ?",
+            "UPDATE players SET sect_task = sect_task + ?, version = version + 1 WHERE user_id = ?",
             (count, user_id)
         )
         await self.conn.commit()
+        if self.player_cache is not None:
+            def sync():
+                snapshot = self.player_cache.peek(user_id)
+                if snapshot is not None:
+                    self.player_cache.apply(user_id, sect_task=snapshot.sect_task + count)
+                    self.player_cache.bump_version(user_id)
+            self.conn.after_commit(sync)
     
     async def reset_sect_tasks(self):
         """重置所有用户的宗门任务次数（定时任务）"""
-        await self.conn.execute("UPDATE players SET sect_task = 0")
-        await self.conn.commit()
+        # 全表更新走写队列的低优先级通道，不阻塞交互指令
+        await self.conn.submit(lambda conn: conn.execute("UPDATE players SET sect_task = 0, version = version + 1"), background=True)
+        self._sync_player_cache(None, sect_task=0)
     
     async def reset_sect_elixir_get(self):
         """重置所有用户的宗门丹药领取标记（定时任务）"""
-        await self.conn.execute("UPDATE players SET sect_elixir_get = 0")
-        await self.conn.commit()
+        await self.conn.submit(lambda conn: conn.execute("UPDATE players SET sect_elixir_get = 0, version = version + 1"), background=True)
+        self._sync_player_cache(None, sect_elixir_get=0)
     
-    async def get_sect_members(self, sect_id: int) -> List:
+    async def get_sect_members(self, sect_id: int) -> List[Player]:
         """获取宗门所有成员"""
-        from ..models import Player
+        if self.player_cache is not None:
+            await self.player_cache.flush(self.conn)
+        async with self.reader() as conn:
+            return await PLAYER_MAPPER.fetch_all(
+                conn,
+                f"""SELECT {PLAYER_MAPPER.columns} FROM players
+                    WHERE sect_id = ? ORDER BY sect_position ASC, level_index DESC""",
+                (sect_id,)
+            )
+    
+    # ===== 储物戒物品 CRUD =====
+
+    async def get_player_items(self, user_id: str) -> Dict[str, int]:
+        """获取玩家储物戒中的所有物品 {item_name: count}"""
+        async with self.reader() as conn:
+            async with conn.execute(
+                "SELECT item_name, count FROM player_items WHERE user_id = ? ORDER BY item_name",
+                (user_id,)
+            ) as cursor:
+                return {row[0]: row[1] async for row in cursor}
+
+    async def get_player_item_count(self, user_id: str, item_name: str) -> int:
+        """获取玩家储物戒中某物品的数量"""
         async with self.conn.execute(
-            "SELECT * FROM players WHERE sect_id = ? ORDER BY sect_position ASC, level_index DESC",
-            (sect_id,)
+            "SELECT count FROM player_items WHERE user_id = ? AND item_name = ?",
+            (user_id, item_name)
         ) as cursor:
-            rows = await cursor.fetchall()
-            # 简化返回，只返回部分字段
-            from dataclasses import fields
-            PLAYER_FIELDS = {f.name for f in fields(Player)}
-            return [Player(**{k: v for k, v in dict(row).items() if k in PLAYER_FIELDS}) for row in rows]
-    
+            row = await cursor.fetchone()
+            return row[0] if row else 0
+
+    async def count_player_item_slots(self, user_id: str) -> int:
+        """获取玩家储物戒已占用的格子数（物品种类数）"""
+        async with self.conn.execute(
+            "SELECT COUNT(*) FROM player_items WHERE user_id = ?",
+            (user_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0]
+
+    async def add_player_item(self, user_id: str, item_name: str, count: int, bound: bool = False):
+        """向玩家储物戒增加物品（不存在时插入，存在时累加数量）"""
+        await self.conn.execute(
+            """
+            INSERT INTO player_items (user_id, item_name, count, bound) VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, item_name) DO UPDATE SET count = count + excluded.count
+            """,
+            (user_id, item_name, count, int(bound))
+        )
+        await self.conn.commit()
+
+    async def remove_player_item(self, user_id: str, item_name: str, count: int) -> bool:
+        """从玩家储物戒扣除物品，数量不足时不做修改
+
+        Returns:
+            是否扣除成功
+        """
+        async with self.transaction():
+            cursor = await self.conn.execute(
+                "UPDATE player_items SET count = count - ? WHERE user_id = ? AND item_name = ? AND count >= ?",
+                (count, user_id, item_name, count)
+            )
+            if cursor.rowcount == 0:
+                return False
+            await self.conn.execute(
+                "DELETE FROM player_items WHERE user_id = ? AND item_name = ? AND count <= 0",
+                (user_id, item_name)
+            )
+        return True
+
+    async def get_item_owners(self, item_name: str, limit: int = 50) -> List[dict]:
+        """查询持有某物品的玩家（按数量降序）"""
+        owners = []
+        async with self.reader() as conn:
+            async with conn.execute(
+                """SELECT user_id, count FROM player_items
+                   WHERE item_name = ?
+                   ORDER BY count DESC LIMIT ?""",
+                (item_name, limit)
+            ) as cursor:
+                async for row in cursor:
+                    owners.append({"user_id": row[0], "count": row[1]})
+        return owners
+
+    # ===== 丹药背包与丹药效果 CRUD =====
+
+    async def get_player_pills(self, user_id: str) -> Dict[str, int]:
+        """获取玩家丹药背包 {pill_name: count}"""
+        async with self.reader() as conn:
+            async with conn.execute(
+                "SELECT pill_name, count FROM player_pills WHERE user_id = ? ORDER BY pill_name",
+                (user_id,)
+            ) as cursor:
+                return {row[0]: row[1] async for row in cursor}
+
+    async def get_player_pill_count(self, user_id: str, pill_name: str) -> int:
+        """获取玩家丹药背包中某丹药的数量"""
+        async with self.conn.execute(
+            "SELECT count FROM player_pills WHERE user_id = ? AND pill_name = ?",
+            (user_id, pill_name)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else 0
+
+    async def add_player_pill(self, user_id: str, pill_name: str, count: int = 1):
+        """向玩家丹药背包增加丹药"""
+        await self.conn.execute(
+            """
+            INSERT INTO player_pills (user_id, pill_name, count) VALUES (?, ?, ?)
+            ON CONFLICT(user_id, pill_name) DO UPDATE SET count = count + excluded.count
+            """,
+            (user_id, pill_name, count)
+        )
+        await self.conn.commit()
+
+    async def remove_player_pill(self, user_id: str, pill_name: str, count: int = 1) -> bool:
+        """从玩家丹药背包扣除丹药，数量不足时不做修改
+
+        Returns:
+            是否扣除成功
+        """
+        async with self.transaction():
+            cursor = await self.conn.execute(
+                "UPDATE player_pills SET count = count - ? WHERE user_id = ? AND pill_name = ? AND count >= ?",
+                (count, user_id, pill_name, count)
+            )
+            if cursor.rowcount == 0:
+                return False
+            await self.conn.execute(
+                "DELETE FROM player_pills WHERE user_id = ? AND pill_name = ? AND count <= 0",
+                (user_id, pill_name)
+            )
+        return True
+
+    async def get_pill_effects(self, user_id: str) -> List[Tuple[int, dict]]:
+        """获取玩家的临时丹药效果 [(effect_id, effect)]，包含尚未清理的过期效果"""
+        effects = []
+        async with self.conn.execute(
+            "SELECT id, effect_json, expiry_time FROM pill_effects WHERE user_id = ? ORDER BY id",
+            (user_id,)
+        ) as cursor:
+            async for row in cursor:
+                effect = codec.loads(row[1])
+                effect["expiry_time"] = row[2]  # 以索引列为准
+                effects.append((row[0], effect))
+        return effects
+
+    async def add_pill_effect(self, user_id: str, effect: dict) -> int:
+        """添加临时丹药效果，返回效果ID"""
+        cursor = await self.conn.execute(
+            "INSERT INTO pill_effects (user_id, pill_name, effect_json, expiry_time) VALUES (?, ?, ?, ?)",
+            (user_id, effect.get("pill_name", ""), codec.dumps(effect),
+             int(effect.get("expiry_time", 0)))
+        )
+        await self.conn.commit()
+        return cursor.lastrowid
+
+    async def update_pill_effects(self, effects: List[Tuple[int, dict]]):
+        """批量更新临时丹药效果（如结算后的 last_tick_time）"""
+        await self.conn.executemany(
+            "UPDATE pill_effects SET effect_json = ? WHERE id = ?",
+            [(codec.dumps(effect), effect_id) for effect_id, effect in effects]
+        )
+        await self.conn.commit()
+
+    async def delete_pill_effects(self, effect_ids: List[int]):
+        """按ID删除临时丹药效果"""
+        await self.conn.executemany(
+            "DELETE FROM pill_effects WHERE id = ?",
+            [(effect_id,) for effect_id in effect_ids]
+        )
+        await self.conn.commit()
+
+    async def delete_expired_pill_effects(self, user_id: str, current_time: int) -> int:
+        """删除玩家已过期的临时丹药效果（expiry_time 为 0 表示永不过期），返回删除数量"""
+        cursor = await self.conn.execute(
+            "DELETE FROM pill_effects WHERE user_id = ? AND expiry_time BETWEEN 1 AND ?",
+            (user_id, current_time)
+        )
+        await self.conn.commit()
+        return cursor.rowcount
+
     # ===== Phase 2: 灵石银行 CRUD =====
     
     async def get_bank_account(self, user_id: str) -> Optional[dict]:
@@ -488,6 +836,8 @@ class DatabaseExtended:
             (user_id, balance, last_interest_time)
         )
         await self.conn.commit()
+        if self.leaderboards is not None:
+            self.conn.after_commit(lambda: self.leaderboards.set_deposit(user_id, balance))
     
     # ===== Phase 2: 悬赏令系统 CRUD =====
     
@@ -541,13 +891,20 @@ class DatabaseExtended:
         )
         await self.conn.commit()
     
-    async def update_bounty_progress(self, user_id: str, progress: int):
-        """更新悬赏任务进度"""
-        await self.conn.execute(
-            "UPDATE bounty_tasks SET current_progress = ? WHERE user_id = ? AND status = 1",
-            (progress, user_id)
-        )
-        await self.conn.commit()
+    async def update_bounty_progress(self, user_id: str, progress: int) -> asyncio.Future:
+        """更新悬赏任务进度（非关键写操作，参与组提交）
+
+        Returns:
+            durable future，需要确认已提交时 ``await``
+        """
+        async def work(conn):
+            await conn.execute(
+                "UPDATE bounty_tasks SET current_progress = ? WHERE user_id = ? AND status = 1",
+                (progress, user_id)
+            )
+
+        _, durable = await self.conn.submit_grouped(work)
+        return durable
     
     async def complete_bounty(self, user_id: str) -> bool:
         """完成悬赏任务"""
@@ -568,39 +925,13 @@ class DatabaseExtended:
     
     # ===== 系统配置 CRUD =====
     
-    async def ensure_system_config_table(self):
-        """确保系统配置表存在"""
-        await self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS system_config (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                updated_at INTEGER DEFAULT 0
-            )
-        """)
-        await self.conn.commit()
-    
     async def get_system_config(self, key: str) -> Optional[str]:
-        """获取系统配置"""
-        await self.ensure_system_config_table()
-        async with self.conn.execute(
-            "SELECT value FROM system_config WHERE key = ?",
-            (key,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            return row[0] if row else None
+        """获取系统配置（读缓存，见 SystemConfigStore）"""
+        return await self.system_config.get(key)
     
     async def set_system_config(self, key: str, value: str):
         """设置系统配置"""
-        import time
-        await self.ensure_system_config_table()
-        await self.conn.execute(
-            """
-            INSERT INTO system_config (key, value, updated_at) VALUES (?, ?, ?)
-            ON CONFLICT(key) DO UPDATE SET value = ?, updated_at = ?
-            """,
-            (key, value, int(time.time()), value, int(time.time()))
-        )
-        await self.conn.commit()
+        await self.system_config.set(key, value)
     
     # ===== 赠予请求系统 CRUD =====
     
@@ -799,47 +1130,81 @@ class DatabaseExtended:
     # ===== Phase 3: 银行交易流水 CRUD =====
     
     async def add_bank_transaction(self, user_id: str, trans_type: str, amount: int, 
-                                    balance_after: int, description: str, created_at: int):
-        """添加银行交易流水"""
-        await self.conn.execute(
-            """INSERT INTO bank_transactions (user_id, trans_type, amount, balance_after, description, created_at)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (user_id, trans_type, amount, balance_after, description, created_at)
-        )
-        await self.conn.commit()
+                                    balance_after: int, description: str, created_at: int) -> asyncio.Future:
+        """添加银行交易流水（非关键写操作，参与组提交）
+
+        Returns:
+            durable future，需要确认已提交时 ``await``
+        """
+        async def work(conn):
+            await conn.execute(
+                """INSERT INTO bank_transactions (user_id, trans_type, amount, balance_after, description, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (user_id, trans_type, amount, balance_after, description, created_at)
+            )
+
+        _, durable = await self.conn.submit_grouped(work)
+        return durable
     
     async def get_bank_transactions(self, user_id: str, limit: int = 20) -> List[dict]:
         """获取用户银行交易流水"""
         transactions = []
-        async with self.conn.execute(
-            """SELECT id, trans_type, amount, balance_after, description, created_at
-               FROM bank_transactions WHERE user_id = ?
-               ORDER BY created_at DESC LIMIT ?""",
-            (user_id, limit)
-        ) as cursor:
-            async for row in cursor:
-                transactions.append({
-                    "id": row[0],
-                    "trans_type": row[1],
-                    "amount": row[2],
-                    "balance_after": row[3],
-                    "description": row[4],
-                    "created_at": row[5]
-                })
+        async with self.reader() as conn:
+            async with conn.execute(
+                """SELECT id, trans_type, amount, balance_after, description, created_at
+                   FROM bank_transactions WHERE user_id = ?
+                   ORDER BY created_at DESC LIMIT ?""",
+                (user_id, limit)
+            ) as cursor:
+                async for row in cursor:
+                    transactions.append({
+                        "id": row[0],
+                        "trans_type": row[1],
+                        "amount": row[2],
+                        "balance_after": row[3],
+                        "description": row[4],
+                        "created_at": row[5]
+                    })
         return transactions
     
-    async def get_deposit_ranking(self, limit: int = 10) -> List[dict]:
-        """获取存款排行榜"""
+    async def get_deposit_ranking(self, limit: int = 10, after: Optional[Tuple[int, str]] = None) -> List[dict]:
+        """获取存款排行榜（存款降序、同额按 user_id），玩家道号随同一条查询返回
+
+        Args:
+            limit: 数量
+            after: 上一页最后一名的 (存款, user_id)；给出时返回排在其后的记录（键集分页）
+        """
         rankings = []
-        async with self.conn.execute(
-            """SELECT user_id, balance FROM bank_accounts
-               WHERE balance > 0
-               ORDER BY balance DESC LIMIT ?""",
-            (limit,)
-        ) as cursor:
-            async for row in cursor:
-                rankings.append({
-                    "user_id": row[0],
-                    "balance": row[1]
-                })
+        if after is None:
+            sql = """SELECT b.user_id, b.balance, p.user_name FROM bank_accounts b
+                     LEFT JOIN players p ON p.user_id = b.user_id
+                     WHERE b.balance > 0
+                     ORDER BY b.balance DESC, b.user_id LIMIT ?"""
+            params = (limit,)
+        else:
+            sql = """SELECT b.user_id, b.balance, p.user_name FROM bank_accounts b
+                     LEFT JOIN players p ON p.user_id = b.user_id
+                     WHERE b.balance > 0 AND b.balance <= ? AND (b.balance < ? OR b.user_id > ?)
+                     ORDER BY b.balance DESC, b.user_id LIMIT ?"""
+            params = (after[0], after[0], after[1], limit)
+        async with self.reader() as conn:
+            async with conn.execute(sql, params) as cursor:
+                async for row in cursor:
+                    rankings.append({
+                        "user_id": row[0],
+                        "balance": row[1],
+                        "user_name": row[2] or ""
+                    })
         return rankings
+
+    async def get_deposit_ranking_key(self, offset: int) -> Optional[Tuple[int, str]]:
+        """存款排行第 offset + 1 名的 (存款, user_id)，不存在时返回 None（只扫描索引）"""
+        async with self.reader() as conn:
+            async with conn.execute(
+                """SELECT balance, user_id FROM bank_accounts
+                   WHERE balance > 0
+                   ORDER BY balance DESC, user_id LIMIT 1 OFFSET ?""",
+                (offset,)
+            ) as cursor:
+                row = await cursor.fetchone()
+        return (row[0], row[1]) if row else None
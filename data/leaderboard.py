@@ -0,0 +1,200 @@
+# data/leaderboard.py
+"""
+内存排行索引：每个排行榜一个按分数降序的有序集合，O(log n) 查询任意玩家的名次和前后邻居
+
+- 启动时从数据库的分数列整体重建，之后由数据层在写入提交后同步（玩家字段、存款、传承）
+- 重建期间到达的修改先暂存，重建完成后按顺序重放，不会被较旧的查询结果覆盖
+- 名次按分数计算，同分并列（前面有 k 名分数更高的玩家则为第 k+1 名）
+"""
+
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+# 排行榜名称
+BOARD_LEVEL = "level"  # 境界（修为）
+BOARD_POWER = "power"  # 战力
+BOARD_WEALTH = "wealth"  # 灵石
+BOARD_DEPOSIT = "deposit"  # 存款
+BOARD_IMPART = "impart"  # 传承（攻击加成）
+BOARD_CONTRIBUTION = "contribution"  # 宗门贡献（每个宗门一个排行榜）
+
+# 以 players 表的列为分数的全服排行榜
+PLAYER_BOARD_COLUMNS: Dict[str, str] = {
+    "experience": BOARD_LEVEL,
+    "combat_power": BOARD_POWER,
+    "gold": BOARD_WEALTH,
+}
+# 影响排行索引的 players 列
+PLAYER_RANK_COLUMNS = frozenset({*PLAYER_BOARD_COLUMNS, "sect_id", "sect_contribution"})
+
+RankEntry = Tuple[int, str, float]  # (名次, user_id, 分数)
+
+
+class Leaderboard:
+    """单个排行榜"""
+
+    __slots__ = ("_scores", "_order")
+
+    def __init__(self, scores: Optional[Mapping[str, float]] = None):
+        self._scores: Dict[str, float] = dict(scores or {})
+        # 键为 (-分数, user_id)，分数降序、同分按 user_id 排列
+        self._order = SortedList((-score, user_id) for user_id, score in self._scores.items())
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._scores
+
+    def score(self, user_id: str) -> Optional[float]:
+        return self._scores.get(user_id)
+
+    def update(self, user_id: str, score: float):
+        """设置玩家分数"""
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self._order.remove((-old, user_id))
+        self._scores[user_id] = score
+        self._order.add((-score, user_id))
+
+    def remove(self, user_id: str):
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            self._order.remove((-old, user_id))
+
+    def key_at(self, index: int) -> Optional[Tuple[float, str]]:
+        """排在第 index + 1 位的 (分数, user_id)，超出范围时返回 None"""
+        if 0 <= index < len(self._order):
+            neg_score, user_id = self._order[index]
+            return -neg_score, user_id
+        return None
+
+    def rank_of_score(self, score: float) -> int:
+        """该分数的名次（分数更高的玩家数 + 1）"""
+        return self._order.bisect_left((-score, "")) + 1
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """玩家的名次，不在榜上时返回 None"""
+        score = self._scores.get(user_id)
+        return None if score is None else self.rank_of_score(score)
+
+    def around(self, user_id: str, radius: int = 2) -> List[RankEntry]:
+        """玩家及其前后各 radius 名（按排行顺序），不在榜上时返回空列表"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return []
+        position = self._order.index((-score, user_id))
+        start = max(0, position - radius)
+        return [
+            (self.rank_of_score(-neg_score), uid, -neg_score)
+            for neg_score, uid in self._order.islice(start, position + radius + 1)
+        ]
+
+
+class Leaderboards:
+    """全部排行榜的内存索引"""
+
+    def __init__(self):
+        self.boards: Dict[str, Leaderboard] = {
+            name: Leaderboard() for name in (BOARD_LEVEL, BOARD_POWER, BOARD_WEALTH, BOARD_DEPOSIT, BOARD_IMPART)
+        }
+        self.sect_boards: Dict[int, Leaderboard] = {}  # 宗门ID -> 宗门贡献排行
+        self._sects: Dict[str, int] = {}  # user_id -> 宗门ID
+        self._contributions: Dict[str, int] = {}  # user_id -> 宗门贡献
+        self.loaded = False
+        self._pending: Optional[List[Tuple[Callable, tuple]]] = None  # 重建期间暂存的修改
+
+    def board(self, name: str, sect_id: int = 0) -> Optional[Leaderboard]:
+        """获取排行榜，宗门贡献排行需给出宗门ID"""
+        if name == BOARD_CONTRIBUTION:
+            return self.sect_boards.get(sect_id)
+        return self.boards.get(name)
+
+    async def load(self, conn):
+        """从数据库重建全部排行榜（调用方应先把玩家缓存落盘）"""
+        self._pending = []
+        try:
+            async with conn.execute(
+                "SELECT user_id, experience, combat_power, gold, sect_id, sect_contribution FROM players"
+            ) as cursor:
+                players = await cursor.fetchall()
+            async with conn.execute("SELECT user_id, balance FROM bank_accounts WHERE balance > 0") as cursor:
+                deposits = await cursor.fetchall()
+            async with conn.execute("SELECT user_id, impart_atk_per FROM impart_info") as cursor:
+                imparts = await cursor.fetchall()
+
+            self.boards[BOARD_LEVEL] = Leaderboard({row[0]: row[1] for row in players})
+            self.boards[BOARD_POWER] = Leaderboard({row[0]: row[2] for row in players})
+            self.boards[BOARD_WEALTH] = Leaderboard({row[0]: row[3] for row in players})
+            self.boards[BOARD_DEPOSIT] = Leaderboard({row[0]: row[1] for row in deposits})
+            self.boards[BOARD_IMPART] = Leaderboard({row[0]: row[1] for row in imparts})
+            self._sects = {row[0]: row[4] for row in players if row[4]}
+            self._contributions = {row[0]: row[5] for row in players}
+            members: Dict[int, Dict[str, int]] = {}
+            for user_id, sect_id in self._sects.items():
+                members.setdefault(sect_id, {})[user_id] = self._contributions[user_id]
+            self.sect_boards = {sect_id: Leaderboard(scores) for sect_id, scores in members.items()}
+            self.loaded = True
+        finally:
+            pending, self._pending = self._pending, None
+        for method, args in pending:
+            method(*args)
+
+    def _defer(self, method: Callable, *args) -> bool:
+        """未载入时忽略修改，重建期间暂存修改；返回是否需要立即应用"""
+        if self._pending is not None:
+            self._pending.append((method, args))
+            return False
+        return self.loaded
+
+    def observe_player(self, user_id: str, changes: Mapping[str, object]):
+        """同步已提交的玩家字段修改（只处理影响排行的列）"""
+        if not self._defer(self.observe_player, user_id, dict(changes)):
+            return
+        for column, board in PLAYER_BOARD_COLUMNS.items():
+            if column in changes:
+                self.boards[board].update(user_id, changes[column])
+        if "sect_contribution" in changes:
+            self._contributions[user_id] = changes["sect_contribution"]
+        if "sect_id" in changes or "sect_contribution" in changes:
+            self._move_sect(user_id, changes.get("sect_id", self._sects.get(user_id, 0)))
+
+    def _move_sect(self, user_id: str, sect_id: int):
+        old = self._sects.get(user_id, 0)
+        if old and old != sect_id:
+            board = self.sect_boards.get(old)
+            if board is not None:
+                board.remove(user_id)
+                if not len(board):
+                    del self.sect_boards[old]
+        if not sect_id:
+            self._sects.pop(user_id, None)
+            return
+        self._sects[user_id] = sect_id
+        self.sect_boards.setdefault(sect_id, Leaderboard()).update(user_id, self._contributions.get(user_id, 0))
+
+    def remove_player(self, user_id: str):
+        """玩家被删除（关联的存款、传承数据随之级联删除）"""
+        if not self._defer(self.remove_player, user_id):
+            return
+        for board in self.boards.values():
+            board.remove(user_id)
+        self._move_sect(user_id, 0)
+        self._contributions.pop(user_id, None)
+
+    def set_deposit(self, user_id: str, balance: int):
+        """同步存款余额（余额为 0 不上榜）"""
+        if not self._defer(self.set_deposit, user_id, balance):
+            return
+        if balance > 0:
+            self.boards[BOARD_DEPOSIT].update(user_id, balance)
+        else:
+            self.boards[BOARD_DEPOSIT].remove(user_id)
+
+    def set_impart(self, user_id: str, atk_per: float):
+        """同步传承攻击加成"""
+        if self._defer(self.set_impart, user_id, atk_per):
+            self.boards[BOARD_IMPART].update(user_id, atk_per)
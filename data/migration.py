@@ -1,11 +1,14 @@
 # data/migration.py
 
+import json
+import re
+import time
 import aiosqlite
-from typing import Dict, Callable, Awaitable
+from typing import Dict, Callable, Awaitable, List, Optional, Tuple
 from astrbot.api import logger
 from ..config_manager import ConfigManager
 
-LATEST_DB_VERSION = 20  # v20: 用户CD表添加额外数据字段
+LATEST_DB_VERSION = 29  # v29: 排行索引加入 user_id，支持键集分页
 
 MIGRATION_TASKS: Dict[int, Callable[[aiosqlite.Connection, ConfigManager], Awaitable[None]]] = {}
 
@@ -24,42 +27,153 @@ class MigrationManager:
         self.config_manager = config_manager
 
     async def migrate(self):
+        # 快速路径：已是最新版本时只读一次 db_info，不做其他任何检查
+        current_version = await self._read_version()
+        if current_version == LATEST_DB_VERSION:
+            logger.info(f"数据库已是最新版本 v{LATEST_DB_VERSION}，无需升级。")
+            return
+
         await self.conn.execute("PRAGMA foreign_keys = ON")
-        async with self.conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='db_info'") as cursor:
-            if await cursor.fetchone() is None:
-                logger.info("未检测到数据库版本，将进行全新安装...")
-                await self.conn.execute("BEGIN")
-                # 使用最新的建表函数
-                await _create_all_tables_v2(self.conn)
-                await self.conn.execute("INSERT INTO db_info (version) VALUES (?)", (LATEST_DB_VERSION,))
-                await self.conn.commit()
-                logger.info(f"数据库已初始化到最新版本: v{LATEST_DB_VERSION}")
-                return
-
-        async with self.conn.execute("SELECT version FROM db_info") as cursor:
-            row = await cursor.fetchone()
-            current_version = row[0] if row else 0
+        if current_version is None:
+            logger.info("未检测到数据库版本，将进行全新安装...")
+            started = time.perf_counter()
+            await self.conn.execute("BEGIN")
+            # 使用最新的建表函数
+            await _create_all_tables_v2(self.conn)
+            await _add_player_foreign_keys(self.conn)
+            await _create_hot_path_indexes(self.conn)
+            await _add_player_combat_stats(self.conn)
+            await self.conn.execute("INSERT INTO db_info (version) VALUES (?)", (LATEST_DB_VERSION,))
+            await _create_migration_log_table(self.conn)
+            await self._record_timing(LATEST_DB_VERSION, started)
+            await self.conn.commit()
+            logger.info(f"数据库已初始化到最新版本: v{LATEST_DB_VERSION}")
+            return
 
         logger.info(f"当前数据库版本: v{current_version}, 最新版本: v{LATEST_DB_VERSION}")
         if current_version < LATEST_DB_VERSION:
             logger.info("检测到数据库需要升级...")
+            upgrade_started = time.perf_counter()
             for version in sorted(MIGRATION_TASKS.keys()):
                 if current_version < version:
                     logger.info(f"正在执行数据库升级: v{current_version} -> v{version} ...")
+                    started = time.perf_counter()
                     await self.conn.execute("BEGIN")
                     try:
                         await MIGRATION_TASKS[version](self.conn, self.config_manager)
                         await self.conn.execute("UPDATE db_info SET version = ?", (version,))
+                        await _create_migration_log_table(self.conn)
+                        elapsed_ms = await self._record_timing(version, started)
                         await self.conn.commit()
                         current_version = version
-                        logger.info(f"数据库升级成功: v{version}")
+                        logger.info(f"数据库升级成功: v{version}（耗时 {elapsed_ms} ms）")
                     except Exception as e:
                         await self.conn.rollback()
                         logger.error(f"数据库升级失败: v{version}. 错误: {str(e)}")
                         raise
-            logger.info(f"数据库已升级到最新版本: v{LATEST_DB_VERSION}")
+            total_ms = int((time.perf_counter() - upgrade_started) * 1000)
+            logger.info(f"数据库已升级到最新版本: v{LATEST_DB_VERSION}（共耗时 {total_ms} ms）")
         else:
-            logger.info("数据库已是最新版本，无需升级。")
+            logger.warning(f"数据库版本 v{current_version} 高于插件支持的 v{LATEST_DB_VERSION}，跳过升级。")
+
+    async def _read_version(self) -> Optional[int]:
+        """读取数据库版本；尚未创建 db_info 表（全新安装）时返回 None"""
+        try:
+            async with self.conn.execute("SELECT version FROM db_info") as cursor:
+                row = await cursor.fetchone()
+        except aiosqlite.OperationalError:
+            return None
+        return row[0] if row else 0
+
+    async def _record_timing(self, version: int, started: float) -> int:
+        """在 db_migrations 中记录迁移耗时（毫秒），供大库运维预估升级停机时间"""
+        elapsed_ms = int((time.perf_counter() - started) * 1000)
+        await self.conn.execute(
+            """
+            INSERT INTO db_migrations (version, applied_at, duration_ms) VALUES (?, ?, ?)
+            ON CONFLICT(version) DO UPDATE SET applied_at = excluded.applied_at, duration_ms = excluded.duration_ms
+            """,
+            (version, int(time.time()), elapsed_ms)
+        )
+        return elapsed_ms
+
+
+async def _create_migration_log_table(conn: aiosqlite.Connection):
+    """创建迁移记录表（db_info 只保存一行版本号，每个版本的执行时间和耗时记录在这里）"""
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS db_migrations (
+            version INTEGER PRIMARY KEY,
+            applied_at INTEGER NOT NULL,
+            duration_ms INTEGER NOT NULL
+        )
+    """)
+
+
+MIGRATION_CHUNK_SIZE = 5000  # 重建表时每个事务复制的行数
+
+
+async def _table_exists(conn: aiosqlite.Connection, table: str) -> bool:
+    async with conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)) as cursor:
+        return await cursor.fetchone() is not None
+
+
+async def _copy_rows_chunked(
+    conn: aiosqlite.Connection,
+    source: str,
+    target: str,
+    columns: List[str],
+    select_exprs: Optional[List[str]] = None,
+    where: str = "",
+    chunk_size: int = MIGRATION_CHUNK_SIZE,
+) -> int:
+    """按主键顺序分批把 source 的行复制到 target（表重建用），返回本次复制的行数
+
+    每批复制后提交并开启新事务，避免一次 INSERT ... SELECT 长时间占用写锁和 WAL。
+    target 中已有的行视为上次中断前已复制完成，从其最大主键之后继续，
+    因此迁移中途崩溃后重新执行同一迁移即可续传（调用方需保留未完成的 target 表）。
+
+    Args:
+        columns: target 的列（也是主键列所在的列清单）
+        select_exprs: 与 columns 一一对应的取值表达式，默认按同名列复制；主键列必须原样复制
+        where: 额外的过滤条件（如丢弃孤儿行）
+    """
+    select_exprs = select_exprs or list(columns)
+    async with conn.execute(f"PRAGMA table_info({source})") as cursor:
+        keys = [row[1] for row in sorted(await cursor.fetchall(), key=lambda row: row[5]) if row[5] > 0]
+    if not keys:
+        raise ValueError(f"{source} 没有主键，无法分批复制")
+
+    key_list = ", ".join(keys)
+    key_row = f"({key_list})" if len(keys) > 1 else key_list
+    key_desc = ", ".join(f"{key} DESC" for key in keys)
+    filters = [f"({where})"] if where else []
+    insert_sql = f"INSERT INTO {target} ({', '.join(columns)}) SELECT {', '.join(select_exprs)} FROM {source}"
+
+    async with conn.execute(f"SELECT COUNT(*) FROM {source}") as cursor:
+        total = (await cursor.fetchone())[0]
+    async with conn.execute(f"SELECT COUNT(*) FROM {target}") as cursor:
+        done = (await cursor.fetchone())[0]
+    if done:
+        logger.info(f"{target}: 续传上次中断的复制，已有 {done} 行")
+
+    copied = 0
+    while True:
+        async with conn.execute(f"SELECT {key_list} FROM {target} ORDER BY {key_desc} LIMIT 1") as cursor:
+            last = await cursor.fetchone()
+        conditions = filters + ([f"{key_row} > ({', '.join('?' * len(keys))})"] if last else [])
+        where_sql = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = await conn.execute(
+            f"{insert_sql}{where_sql} ORDER BY {key_list} LIMIT ?", (*(last or ()), chunk_size)
+        )
+        copied += cursor.rowcount
+        if cursor.rowcount < chunk_size:
+            break
+        logger.info(f"{target}: 已复制 {done + copied}/{total} 行")
+        # 提交已复制的一批，之后仍在迁移管理器开启的事务中继续
+        await conn.commit()
+        await conn.execute("BEGIN")
+    return copied
+
 
 async def _create_all_tables_v1(conn: aiosqlite.Connection):
     """创建所有表 - v1，只保留玩家基础信息"""
@@ -222,11 +336,10 @@ async def _migrate_to_v10(conn: aiosqlite.Connection, config_manager: ConfigMana
 
         # 使用正确的表重建方式（保留约束）
         columns_to_keep = columns & valid_columns
-        columns_str = ', '.join(columns_to_keep)
 
-        # 1. 创建新表（带完整约束）
+        # 1. 创建新表（带完整约束；已存在说明上次复制中断，继续复制）
         await conn.execute("""
-            CREATE TABLE players_new (
+            CREATE TABLE IF NOT EXISTS players_new (
                 user_id TEXT PRIMARY KEY,
                 level_index INTEGER NOT NULL DEFAULT 0,
                 spiritual_root TEXT NOT NULL DEFAULT '未知',
@@ -260,11 +373,8 @@ async def _migrate_to_v10(conn: aiosqlite.Connection, config_manager: ConfigMana
             )
         """)
 
-        # 2. 复制数据
-        await conn.execute(f"""
-            INSERT INTO players_new ({columns_str})
-            SELECT {columns_str} FROM players
-        """)
+        # 2. 分批复制数据
+        await _copy_rows_chunked(conn, "players", "players_new", sorted(columns_to_keep))
 
         # 3. 删除旧表
         await conn.execute("DROP TABLE players")
@@ -355,7 +465,12 @@ async def _create_all_tables_v2(conn: aiosqlite.Connection):
             storage_ring_items TEXT NOT NULL DEFAULT '{}',
             
             daily_pill_usage TEXT NOT NULL DEFAULT '{}',
-            last_daily_reset TEXT NOT NULL DEFAULT ''
+            last_daily_reset TEXT NOT NULL DEFAULT '',
+
+            version INTEGER NOT NULL DEFAULT 0,
+
+            combat_power INTEGER NOT NULL DEFAULT 0,
+            total_attributes TEXT NOT NULL DEFAULT '{}'
         )
     """)
 
@@ -375,6 +490,7 @@ async def _create_all_tables_v2(conn: aiosqlite.Connection):
         INSERT OR IGNORE INTO shop (shop_id, last_refresh_time, current_items)
         VALUES ('global', 0, '[]')
     """)
+    await _create_shop_items_table(conn)
     
     # 创建宗门表
     await conn.execute("""
@@ -613,6 +729,15 @@ async def _create_all_tables_v2(conn: aiosqlite.Connection):
     """)
     await conn.execute("CREATE INDEX IF NOT EXISTS idx_bounty_user ON bounty_tasks(user_id)")
 
+    # 储物戒物品表
+    await _create_player_items_table(conn)
+
+    # 丹药背包与临时丹药效果表
+    await _create_pill_tables(conn)
+
+    # 系统配置键值表
+    await _create_system_config_table(conn)
+
     # 插入初始秘境数据
     import json
     import time
@@ -1100,3 +1225,490 @@ async def _migrate_to_v20(conn: aiosqlite.Connection, config_manager: ConfigMana
     
     await conn.commit()
     logger.info("v20迁移完成：用户CD表添加额外数据字段")
+
+
+async def _create_player_items_table(conn: aiosqlite.Connection):
+    """创建储物戒物品表（每种物品一行，占一格）"""
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS player_items (
+            user_id TEXT NOT NULL,
+            item_name TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            bound INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, item_name)
+        ) WITHOUT ROWID
+    """)
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_player_items_item ON player_items(item_name)")
+
+
+def _parse_storage_ring_items(raw: str) -> List[Tuple[str, int, int]]:
+    """解析旧版储物戒 JSON，兼容 {name: count} 与 {name: {count, bound}} 两种格式"""
+    items = json.loads(raw or "{}")
+    parsed = []
+    for item_name, value in items.items():
+        if isinstance(value, dict):
+            count, bound = int(value.get("count", 0)), int(bool(value.get("bound", False)))
+        else:
+            count, bound = int(value), 0
+        if count > 0:
+            parsed.append((item_name, count, bound))
+    return parsed
+
+
+@migration(21)
+async def _migrate_to_v21(conn: aiosqlite.Connection, config_manager: ConfigManager):
+    """迁移到v21 - 储物戒物品从 players.storage_ring_items 拆分到 player_items 表"""
+    logger.info("开始迁移到v21：储物戒物品拆分为独立表")
+
+    await _create_player_items_table(conn)
+
+    batch_size = 500
+    item_rows = []
+    migrated_users = []
+    async with conn.execute(
+        "SELECT user_id, storage_ring_items FROM players WHERE storage_ring_items NOT IN ('', '{}')"
+    ) as cursor:
+        async for user_id, raw in cursor:
+            try:
+                parsed = _parse_storage_ring_items(raw)
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.warning(f"玩家 {user_id} 的储物戒数据无法解析，已跳过: {e}")
+                continue
+            item_rows.extend((user_id, name, count, bound) for name, count, bound in parsed)
+            migrated_users.append((user_id,))
+            if len(item_rows) >= batch_size:
+                await _insert_player_items(conn, item_rows)
+                item_rows = []
+    if item_rows:
+        await _insert_player_items(conn, item_rows)
+
+    # 旧字段不再使用，清空已迁移的数据，避免与新表不一致
+    await conn.executemany("UPDATE players SET storage_ring_items = '{}' WHERE user_id = ?", migrated_users)
+    logger.info(f"v21迁移完成：{len(migrated_users)} 名玩家的储物戒物品已迁移到 player_items 表")
+
+
+async def _insert_player_items(conn: aiosqlite.Connection, rows: List[Tuple[str, str, int, int]]):
+    await conn.executemany(
+        """
+        INSERT INTO player_items (user_id, item_name, count, bound) VALUES (?, ?, ?, ?)
+        ON CONFLICT(user_id, item_name) DO UPDATE SET count = count + excluded.count
+        """,
+        rows
+    )
+
+
+async def _create_pill_tables(conn: aiosqlite.Connection):
+    """创建丹药背包表与临时丹药效果表"""
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS player_pills (
+            user_id TEXT NOT NULL,
+            pill_name TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, pill_name)
+        ) WITHOUT ROWID
+    """)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS pill_effects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            pill_name TEXT NOT NULL,
+            effect_json TEXT NOT NULL DEFAULT '{}',
+            expiry_time INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # 过期效果按 (user_id, expiry_time) 范围删除
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_pill_effects_expiry ON pill_effects(user_id, expiry_time)")
+    # 玩家的效果按服用顺序（id）读取，避免临时排序
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_pill_effects_user ON pill_effects(user_id, id)")
+
+
+@migration(22)
+async def _migrate_to_v22(conn: aiosqlite.Connection, config_manager: ConfigManager):
+    """迁移到v22 - 丹药背包与临时丹药效果从 players 表拆分到独立表"""
+    logger.info("开始迁移到v22：丹药背包与临时丹药效果拆分为独立表")
+
+    await _create_pill_tables(conn)
+
+    batch_size = 500
+    pill_rows = []
+    effect_rows = []
+    migrated_users = []
+    async with conn.execute(
+        """SELECT user_id, pills_inventory, active_pill_effects FROM players
+           WHERE pills_inventory NOT IN ('', '{}') OR active_pill_effects NOT IN ('', '[]')"""
+    ) as cursor:
+        async for user_id, raw_inventory, raw_effects in cursor:
+            try:
+                inventory = json.loads(raw_inventory or "{}")
+                effects = json.loads(raw_effects or "[]")
+                rows = [(user_id, name, int(count)) for name, count in inventory.items() if int(count) > 0]
+                effects = [
+                    (user_id, effect.get("pill_name", ""), json.dumps(effect, ensure_ascii=False),
+                     int(effect.get("expiry_time", 0)))
+                    for effect in effects
+                ]
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.warning(f"玩家 {user_id} 的丹药数据无法解析，已跳过: {e}")
+                continue
+            pill_rows.extend(rows)
+            effect_rows.extend(effects)
+            migrated_users.append((user_id,))
+            if len(pill_rows) + len(effect_rows) >= batch_size:
+                await _insert_pill_rows(conn, pill_rows, effect_rows)
+                pill_rows, effect_rows = [], []
+    await _insert_pill_rows(conn, pill_rows, effect_rows)
+
+    # 旧字段不再使用，清空已迁移的数据，避免与新表不一致
+    await conn.executemany(
+        "UPDATE players SET pills_inventory = '{}', active_pill_effects = '[]' WHERE user_id = ?",
+        migrated_users
+    )
+    logger.info(f"v22迁移完成：{len(migrated_users)} 名玩家的丹药数据已迁移")
+
+
+async def _insert_pill_rows(conn: aiosqlite.Connection, pill_rows: list, effect_rows: list):
+    if pill_rows:
+        await conn.executemany(
+            """
+            INSERT INTO player_pills (user_id, pill_name, count) VALUES (?, ?, ?)
+            ON CONFLICT(user_id, pill_name) DO UPDATE SET count = count + excluded.count
+            """,
+            pill_rows
+        )
+    if effect_rows:
+        await conn.executemany(
+            "INSERT INTO pill_effects (user_id, pill_name, effect_json, expiry_time) VALUES (?, ?, ?, ?)",
+            effect_rows
+        )
+
+
+async def _create_shop_items_table(conn: aiosqlite.Connection):
+    """创建商店物品表（每个商店每种物品一行，库存按行原子扣减）"""
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS shop_items (
+            shop_id TEXT NOT NULL,
+            item_name TEXT NOT NULL,
+            position INTEGER NOT NULL DEFAULT 0,
+            item_type TEXT NOT NULL DEFAULT '',
+            rank TEXT NOT NULL DEFAULT '',
+            price INTEGER NOT NULL DEFAULT 0,
+            original_price INTEGER NOT NULL DEFAULT 0,
+            discount REAL NOT NULL DEFAULT 1.0,
+            stock INTEGER NOT NULL DEFAULT 0,
+            data TEXT NOT NULL DEFAULT '{}',
+            PRIMARY KEY (shop_id, item_name)
+        ) WITHOUT ROWID
+    """)
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_shop_items_name ON shop_items(item_name)")
+    # 商店列表按上架顺序读取，避免每次查询都做临时排序
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_shop_items_position ON shop_items(shop_id, position)")
+
+
+@migration(23)
+async def _migrate_to_v23(conn: aiosqlite.Connection, config_manager: ConfigManager):
+    """迁移到v23 - 商店物品从 shop.current_items 拆分到 shop_items 表"""
+    logger.info("开始迁移到v23：商店物品拆分为独立表")
+
+    await _create_shop_items_table(conn)
+
+    async with conn.execute("SELECT shop_id, current_items FROM shop") as cursor:
+        shops = await cursor.fetchall()
+
+    for shop_id, raw_items in shops:
+        try:
+            items = json.loads(raw_items or "[]")
+        except json.JSONDecodeError:
+            logger.warning(f"商店 {shop_id} 的物品数据无法解析，已清空，等待下次刷新")
+            items = []
+        # 缺少库存字段的旧数据视为售罄，下次刷新时重新生成
+        rows = [
+            (shop_id, item["name"], position, item.get("type", ""), item.get("rank", ""),
+             item.get("price", 0), item.get("original_price", item.get("price", 0)),
+             item.get("discount", 1.0), max(0, item.get("stock") or 0),
+             json.dumps(item.get("data", {}), ensure_ascii=False))
+            for position, item in enumerate(items)
+            if isinstance(item, dict) and item.get("name")
+        ]
+        await conn.executemany(
+            """
+            INSERT INTO shop_items (shop_id, item_name, position, item_type, rank, price,
+                                    original_price, discount, stock, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(shop_id, item_name) DO UPDATE SET stock = stock + excluded.stock
+            """,
+            rows
+        )
+
+    await conn.execute("UPDATE shop SET current_items = '[]'")
+    logger.info(f"v23迁移完成：{len(shops)} 个商店的物品已迁移到 shop_items 表")
+
+
+@migration(24)
+async def _migrate_to_v24(conn: aiosqlite.Connection, config_manager: ConfigManager):
+    """迁移到v24 - players 增加行版本号，用于乐观并发控制（比较并交换更新）"""
+    logger.info("开始迁移到v24：玩家行版本号")
+    async with conn.execute("PRAGMA table_info(players)") as cursor:
+        columns = {row[1] for row in await cursor.fetchall()}
+    if "version" not in columns:
+        await conn.execute("ALTER TABLE players ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    logger.info("v24迁移完成")
+
+
+# 引用 players(user_id) 的子表列及删除玩家时的动作
+# 注意：外键开启时 DROP TABLE players 会级联删除所有子表数据，今后如需重建 players 表必须先关闭 foreign_keys
+PLAYER_FOREIGN_KEYS: Dict[str, List[Tuple[str, str]]] = {
+    "buff_info": [("user_id", "CASCADE")],
+    "impart_info": [("user_id", "CASCADE")],
+    "user_cd": [("user_id", "CASCADE")],
+    "bank_accounts": [("user_id", "CASCADE")],
+    "blessed_lands": [("user_id", "CASCADE")],
+    "spirit_farms": [("user_id", "CASCADE")],
+    "dual_cultivation": [("user_id", "CASCADE")],
+    "dual_cultivation_requests": [("from_id", "CASCADE"), ("target_id", "CASCADE")],
+    "combat_cooldowns": [("user_id", "CASCADE")],
+    "pending_gifts": [("sender_id", "CASCADE"), ("receiver_id", "CASCADE")],
+    "bounty_tasks": [("user_id", "CASCADE")],
+    "player_items": [("user_id", "CASCADE")],
+    "player_pills": [("user_id", "CASCADE")],
+    "pill_effects": [("user_id", "CASCADE")],
+    # 灵眼不随玩家删除，只释放占据者
+    "spirit_eyes": [("owner_id", "SET NULL")],
+}
+
+
+async def _rebuild_with_player_foreign_keys(conn: aiosqlite.Connection, table: str, keys: List[Tuple[str, str]]) -> int:
+    """按 SQLite 推荐的建新表-复制-改名方式为子表加上外键，返回丢弃的孤儿行数（表不存在或已有外键时返回 0）"""
+    async with conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)) as cursor:
+        row = await cursor.fetchone()
+    if row is None:
+        return 0
+    async with conn.execute(f"PRAGMA foreign_key_list({table})") as cursor:
+        existing = {(fk[3], fk[2]) for fk in await cursor.fetchall()}
+    if all((column, "players") in existing for column, _ in keys):
+        return 0
+
+    # 保留原有列定义（含 ALTER TABLE 追加的列）与表选项（如 WITHOUT ROWID），只在末尾追加外键约束
+    create_sql = row[0]
+    body_end = create_sql.rindex(")")
+    constraints = "".join(
+        f",\n    FOREIGN KEY ({column}) REFERENCES players(user_id) ON DELETE {action}"
+        for column, action in keys
+    )
+    create_sql = create_sql[:body_end].rstrip() + constraints + "\n" + create_sql[body_end:]
+    new_table = f"{table}_fk_new"
+    create_sql = re.sub(
+        rf"^CREATE TABLE\s+(IF NOT EXISTS\s+)?[\"'`\[]?{table}[\"'`\]]?",
+        f"CREATE TABLE {new_table}", create_sql, count=1, flags=re.IGNORECASE,
+    )
+
+    async with conn.execute(f"PRAGMA table_info({table})") as cursor:
+        columns = [col[1] for col in await cursor.fetchall()]
+    async with conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+    ) as cursor:
+        index_sqls = [index[0] for index in await cursor.fetchall()]
+
+    # 引用已不存在玩家的孤儿行：CASCADE 列直接丢弃，SET NULL 列置空（空字符串也视为无主）
+    select_exprs = list(columns)
+    conditions = []
+    for column, action in keys:
+        exists = f"{column} IN (SELECT user_id FROM players)"
+        if action == "SET NULL":
+            select_exprs[columns.index(column)] = f"CASE WHEN {exists} THEN {column} END"
+        else:
+            conditions.append(exists)
+
+    async with conn.execute(f"SELECT COUNT(*) FROM {table}") as cursor:
+        total = (await cursor.fetchone())[0]
+    # 新表已存在说明上次迁移在复制途中中断，续传
+    if not await _table_exists(conn, new_table):
+        await conn.execute(create_sql)
+    await _copy_rows_chunked(conn, table, new_table, columns, select_exprs, " AND ".join(conditions))
+    async with conn.execute(f"SELECT COUNT(*) FROM {new_table}") as cursor:
+        kept = (await cursor.fetchone())[0]
+    await conn.execute(f"DROP TABLE {table}")
+    await conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+    for index_sql in index_sqls:
+        await conn.execute(index_sql)
+    return total - kept
+
+
+async def _create_player_delete_triggers(conn: aiosqlite.Connection):
+    """删除玩家时外键无法表达的联动：
+
+    - 未还清的贷款转为坏账（贷款与流水作为银行账目保留）
+    - 占据的灵眼连同占据者名称、占据时间一起释放（与主动释放灵眼一致）；在删除前执行，
+      外键的 SET NULL 动作只能置空 owner_id，之后就无法再按占据者找到这些行
+    """
+    await conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_players_delete_loans
+        AFTER DELETE ON players
+        BEGIN
+            UPDATE bank_loans SET status = 'bad_debt' WHERE user_id = OLD.user_id AND status = 'active';
+        END
+    """)
+    await conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_players_delete_spirit_eyes
+        BEFORE DELETE ON players
+        BEGIN
+            UPDATE spirit_eyes SET owner_id = NULL, owner_name = NULL, claim_time = NULL
+            WHERE owner_id = OLD.user_id;
+        END
+    """)
+
+
+async def _add_player_foreign_keys(conn: aiosqlite.Connection):
+    """为所有子表加上 players(user_id) 外键，删除玩家只需一条 DELETE FROM players"""
+    # 触发器引用了要重建的子表时，子表改名会失败；先删除，重建完成后再创建
+    await conn.execute("DROP TRIGGER IF EXISTS trg_players_delete_spirit_eyes")
+    for table, keys in PLAYER_FOREIGN_KEYS.items():
+        dropped = await _rebuild_with_player_foreign_keys(conn, table, keys)
+        if dropped:
+            logger.info(f"{table}: 丢弃 {dropped} 条引用已删除玩家的孤儿数据")
+    # 外键检查与级联删除时按子表列查找，补齐缺少的索引
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_pending_gifts_sender ON pending_gifts(sender_id)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_dual_req_from ON dual_cultivation_requests(from_id)")
+    # 重建时占据者已不存在的灵眼只置空了 owner_id，一并清除占据者名称和占据时间
+    await conn.execute("""
+        UPDATE spirit_eyes SET owner_name = NULL, claim_time = NULL
+        WHERE owner_id IS NULL AND (owner_name IS NOT NULL OR claim_time IS NOT NULL)
+    """)
+    await _create_player_delete_triggers(conn)
+
+
+@migration(25)
+async def _migrate_to_v25(conn: aiosqlite.Connection, config_manager: ConfigManager):
+    """迁移到v25 - 子表增加 players(user_id) 外键，删除玩家由数据库级联清理"""
+    logger.info("开始迁移到v25：玩家关联数据外键")
+    await _add_player_foreign_keys(conn)
+    logger.info("v25迁移完成")
+
+
+# 排行榜分页使用的索引：分数降序、同分按 user_id，与内存排行索引的顺序一致
+RANKING_INDEXES: Dict[str, str] = {
+    "idx_player_experience": "players(experience DESC, user_id)",
+    "idx_player_gold": "players(gold DESC, user_id)",
+    "idx_player_combat_power": "players(combat_power DESC, user_id)",
+    "idx_bank_accounts_balance": "bank_accounts(balance DESC, user_id)",
+}
+
+
+# 热路径查询的索引：索引名 -> 表(列)；可用 data/query_audit.py 检查查询计划
+HOT_PATH_INDEXES: Dict[str, str] = {
+    "idx_player_sect": "players(sect_id, sect_position, level_index DESC)",
+    "idx_player_experience": RANKING_INDEXES["idx_player_experience"],
+    "idx_player_gold": RANKING_INDEXES["idx_player_gold"],
+    "idx_bank_accounts_balance": RANKING_INDEXES["idx_bank_accounts_balance"],
+    "idx_impart_atk": "impart_info(impart_atk_per DESC)",
+    "idx_bounty_status_expire": "bounty_tasks(status, expire_time)",
+    "idx_bank_trans_user_time": "bank_transactions(user_id, created_at)",
+    "idx_player_items_item_count": "player_items(item_name, count)",
+    "idx_pending_gifts_receiver_time": "pending_gifts(receiver_id, created_at)",
+    "idx_dual_req_target_time": "dual_cultivation_requests(target_id, created_at)",
+}
+# 被上面的复合索引覆盖（前缀相同）的旧索引
+SUPERSEDED_INDEXES = [
+    "idx_bank_trans_user",
+    "idx_player_items_item",
+    "idx_pending_gifts_receiver",
+    "idx_dual_req_target",
+]
+
+
+async def _release_duplicate_user_names(conn: aiosqlite.Connection):
+    """唯一索引建立前清理重名道号：每个道号保留最早创建的玩家，其余玩家的道号清空（显示时回退为昵称）"""
+    async with conn.execute("""
+        SELECT user_id, user_name FROM players
+        WHERE user_name != '' AND rowid NOT IN (
+            SELECT MIN(rowid) FROM players WHERE user_name != '' GROUP BY user_name
+        )
+    """) as cursor:
+        duplicates = await cursor.fetchall()
+    if not duplicates:
+        return
+    await conn.executemany(
+        "UPDATE players SET user_name = '', version = version + 1 WHERE user_id = ?",
+        [(row[0],) for row in duplicates]
+    )
+    names = sorted({row[1] for row in duplicates})
+    logger.warning(f"{len(duplicates)} 名玩家的道号与他人重复，已清空：{', '.join(names[:20])}")
+
+
+async def _create_hot_path_indexes(conn: aiosqlite.Connection):
+    """创建热路径查询的索引，删除被复合索引覆盖的旧索引"""
+    # 道号唯一；空道号表示未设置，不参与约束（按道号查询需带上 user_name != '' 才能使用这个部分索引）
+    await _release_duplicate_user_names(conn)
+    await conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_player_user_name ON players(user_name) WHERE user_name != ''"
+    )
+    for name, target in HOT_PATH_INDEXES.items():
+        await conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+    for name in SUPERSEDED_INDEXES:
+        await conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+@migration(26)
+async def _migrate_to_v26(conn: aiosqlite.Connection, config_manager: ConfigManager):
+    """迁移到v26 - 热路径查询的二级索引（道号唯一、宗门成员、排行榜等）"""
+    logger.info("开始迁移到v26：热路径索引")
+    await _create_hot_path_indexes(conn)
+    logger.info("v26迁移完成")
+
+
+async def _create_system_config_table(conn: aiosqlite.Connection):
+    """创建系统配置键值表（定时任务的下次刷新时间、按玩家的冷却时间戳等）"""
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS system_config (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at INTEGER DEFAULT 0
+        )
+    """)
+
+
+@migration(27)
+async def _migrate_to_v27(conn: aiosqlite.Connection, config_manager: ConfigManager):
+    """迁移到v27 - system_config 表由迁移保证存在，运行时不再执行建表语句"""
+    logger.info("开始迁移到v27：系统配置表")
+    await _create_system_config_table(conn)
+    logger.info("v27迁移完成")
+
+
+async def _add_player_combat_stats(conn: aiosqlite.Connection):
+    """players 增加战力与总属性列及战力排行索引（数值由插件启动后的回填任务计算，见 DataBase.backfill_combat_stats）"""
+    async with conn.execute("PRAGMA table_info(players)") as cursor:
+        columns = {row[1] for row in await cursor.fetchall()}
+    if "combat_power" not in columns:
+        await conn.execute("ALTER TABLE players ADD COLUMN combat_power INTEGER NOT NULL DEFAULT 0")
+    if "total_attributes" not in columns:
+        await conn.execute("ALTER TABLE players ADD COLUMN total_attributes TEXT NOT NULL DEFAULT '{}'")
+    await conn.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_player_combat_power ON {RANKING_INDEXES['idx_player_combat_power']}"
+    )
+
+
+@migration(28)
+async def _migrate_to_v28(conn: aiosqlite.Connection, config_manager: ConfigManager):
+    """迁移到v28 - players 保存战力与总属性，战力排行和玩家信息不再逐个解析装备"""
+    logger.info("开始迁移到v28：玩家战力列")
+    await _add_player_combat_stats(conn)
+    logger.info("v28迁移完成")
+
+
+@migration(29)
+async def _migrate_to_v29(conn: aiosqlite.Connection, config_manager: ConfigManager):
+    """迁移到v29 - 排行索引加入 user_id 作为同分时的排序键，排行榜按键集分页"""
+    logger.info("开始迁移到v29：排行榜分页索引")
+    placeholders = ",".join("?" * len(RANKING_INDEXES))
+    async with conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND name IN ({placeholders})",
+        tuple(RANKING_INDEXES)
+    ) as cursor:
+        existing = {name: sql for name, sql in await cursor.fetchall()}
+    for name, target in RANKING_INDEXES.items():
+        # 从 v26 之前升级时索引已按新定义创建，不再重建
+        if existing.get(name) == f"CREATE INDEX {name} ON {target}":
+            continue
+        await conn.execute(f"DROP INDEX IF EXISTS {name}")
+        await conn.execute(f"CREATE INDEX {name} ON {target}")
+    logger.info("v29迁移完成")
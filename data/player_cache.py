@@ -0,0 +1,228 @@
+# data/player_cache.py
+"""
+玩家写回缓存：在内存中保存热点玩家的快照，读取直接命中内存，修改合并后批量落盘
+"""
+
+import copy
+from collections import OrderedDict
+from dataclasses import fields
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+from ..models import Player
+
+# 可更新的玩家字段（按模型定义顺序，保证同一字段集合生成相同的SQL）
+PLAYER_UPDATE_COLUMNS = tuple(f.name for f in fields(Player) if f.init and f.name != "user_id")
+
+
+@lru_cache(maxsize=None)
+def build_player_update_sql(columns: Tuple[str, ...]) -> str:
+    """按字段集合生成 UPDATE 语句（结果按字段集合缓存）
+
+    字段中不含 version 时，语句在库内把行版本号加一；含 version 时按给定值写入（缓存快照落盘）。
+    """
+    assignments = [f"{column} = ?" for column in columns]
+    if "version" not in columns:
+        assignments.append("version = version + 1")
+    return f"UPDATE players SET {', '.join(assignments)} WHERE user_id = ?"
+
+
+@lru_cache(maxsize=None)
+def build_player_cas_sql(columns: Tuple[str, ...]) -> str:
+    """生成比较并交换的 UPDATE 语句：仅当行版本号未变化时写入并把版本号加一
+
+    参数顺序：各字段值, user_id, 期望的版本号
+    """
+    assignments = [f"{column} = ?" for column in columns if column != "version"]
+    assignments.append("version = version + 1")
+    return f"UPDATE players SET {', '.join(assignments)} WHERE user_id = ? AND version = ?"
+
+
+def player_dirty_columns(player: Player) -> Tuple[str, ...]:
+    """获取需要写入的字段（无基线的对象返回全部字段）"""
+    dirty = player.get_dirty_fields()
+    if dirty is None:
+        return PLAYER_UPDATE_COLUMNS
+    return tuple(column for column in PLAYER_UPDATE_COLUMNS if column in dirty)
+
+
+def player_changed_columns(player: Player) -> Tuple[str, ...]:
+    """获取调用方修改过的业务字段（不含由数据层维护的行版本号）"""
+    return tuple(column for column in player_dirty_columns(player) if column != "version")
+
+
+class PlayerCache:
+    """玩家快照缓存
+
+    缓存中的 Player 是唯一的内存副本（按 user_id 索引），对外只返回它的拷贝，
+    调用方的修改通过 update_player 合并回快照，避免事务回滚后把未提交的修改留在缓存中。
+    快照上的脏字段即为尚未落盘的修改。
+    """
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max(1, int(max_size))
+        self._entries: "OrderedDict[str, Player]" = OrderedDict()
+        self._dirty: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def dirty_count(self) -> int:
+        """待落盘的玩家数量"""
+        return len(self._dirty)
+
+    def peek(self, user_id: str) -> Optional[Player]:
+        """获取缓存中的快照本身（不拷贝，仅供数据层内部使用）"""
+        return self._entries.get(user_id)
+
+    def get(self, user_id: str) -> Optional[Player]:
+        """获取玩家快照的拷贝"""
+        snapshot = self._entries.get(user_id)
+        if snapshot is None:
+            return None
+        self._entries.move_to_end(user_id)
+        return self._clone(snapshot)
+
+    def put(self, player: Player):
+        """以一个已与数据库一致的玩家对象作为快照放入缓存"""
+        if player.user_id in self._dirty:
+            # 已有未落盘的快照，以快照为准
+            return
+        snapshot = self._clone(player)
+        self._entries[player.user_id] = snapshot
+        self._entries.move_to_end(player.user_id)
+        self._shrink()
+
+    def merge(self, player: Player, columns: Iterable[str]) -> Optional[Player]:
+        """把调用方对象上的修改合并到快照，返回快照（未缓存时返回None）
+
+        有字段合并时快照的行版本号加一（随其他脏字段一起落盘）。
+        """
+        snapshot = self._entries.get(player.user_id)
+        if snapshot is None:
+            return None
+        merged = False
+        for column in columns:
+            if column != "version":
+                setattr(snapshot, column, getattr(player, column))
+                merged = True
+        if merged:
+            snapshot.version += 1
+        if snapshot.get_dirty_fields():
+            self._dirty.add(player.user_id)
+        self._entries.move_to_end(player.user_id)
+        return snapshot
+
+    def apply(self, user_id: str, **changes):
+        """同步已直接写入数据库的字段（不改变快照的脏字段状态）"""
+        snapshot = self._entries.get(user_id)
+        if snapshot is not None:
+            for column, value in changes.items():
+                object.__setattr__(snapshot, column, value)
+
+    def apply_all(self, **changes):
+        """同步已对全表写入的字段"""
+        for user_id in list(self._entries):
+            self.apply(user_id, **changes)
+
+    def bump_version(self, user_id: Optional[str] = None):
+        """同步库内已加一的行版本号（user_id 为 None 表示全表，不改变脏字段状态）"""
+        user_ids = list(self._entries) if user_id is None else [user_id]
+        for uid in user_ids:
+            snapshot = self._entries.get(uid)
+            if snapshot is not None:
+                object.__setattr__(snapshot, "version", snapshot.version + 1)
+
+    def discard(self, user_id: str):
+        """移除玩家快照（连同未落盘的修改，用于删除玩家等场景）"""
+        self._entries.pop(user_id, None)
+        self._dirty.discard(user_id)
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+        self._dirty.clear()
+
+    def _collect_pending(self, user_ids: Optional[Iterable[str]] = None) -> List[Tuple[str, Tuple[str, ...], tuple]]:
+        """收集待落盘的修改：(user_id, 字段, 值)"""
+        targets = self._dirty if user_ids is None else self._dirty.intersection(user_ids)
+        pending = []
+        for user_id in list(targets):
+            snapshot = self._entries.get(user_id)
+            columns = player_dirty_columns(snapshot) if snapshot is not None else ()
+            if not columns:
+                self._dirty.discard(user_id)
+                continue
+            values = tuple(getattr(snapshot, column) for column in columns)
+            pending.append((user_id, columns, values))
+        return pending
+
+    def _mark_flushed(self, pending: List[Tuple[str, Tuple[str, ...], tuple]]):
+        """标记已落盘的字段（落盘期间再次被修改的字段保持为脏）"""
+        for user_id, columns, values in pending:
+            snapshot = self._entries.get(user_id)
+            if snapshot is None:
+                continue
+            snapshot.discard_dirty_fields(
+                column for column, value in zip(columns, values) if getattr(snapshot, column) == value
+            )
+            if not snapshot.get_dirty_fields():
+                self._dirty.discard(user_id)
+        self._shrink()
+
+    async def flush(self, conn, user_ids: Optional[Iterable[str]] = None, background: bool = False) -> int:
+        """把缓存中的修改批量写入数据库
+
+        相同字段集合的玩家合并为一条 executemany，所有玩家在同一个事务中提交。
+        若当前协程已处于事务中，则写入并入该事务，修改仍保留为脏，
+        等下次落盘时再幂等重写，避免该事务回滚时丢失修改。
+
+        Args:
+            conn: 写连接（SerializedConnection）
+            user_ids: 只落盘指定玩家，默认全部
+            background: 是否走写队列的低优先级通道（定时落盘）
+
+        Returns:
+            写入的玩家数量
+        """
+        if conn.owns_transaction:
+            pending = self._collect_pending(user_ids)
+            await self._write_pending(conn, pending)
+            return len(pending)
+
+        dirty = self._dirty if user_ids is None else self._dirty.intersection(user_ids)
+        if not dirty:
+            return 0
+        async with conn.transaction(background):
+            # 取得写连接后再读取快照：排队期间其他事务提交的写入已同步到快照，不会被旧值覆盖
+            pending = self._collect_pending(user_ids)
+            await self._write_pending(conn, pending)
+        self._mark_flushed(pending)
+        return len(pending)
+
+    @staticmethod
+    async def _write_pending(conn, pending: List[Tuple[str, Tuple[str, ...], tuple]]):
+        """相同字段集合的玩家合并为一条 executemany 写入"""
+        groups: Dict[Tuple[str, ...], List[tuple]] = {}
+        for user_id, columns, values in pending:
+            groups.setdefault(columns, []).append(values + (user_id,))
+        for columns, params in groups.items():
+            await conn.executemany(build_player_update_sql(columns), params)
+
+    def _shrink(self):
+        """超出容量时按最近最少使用淘汰已落盘的快照"""
+        if len(self._entries) <= self.max_size:
+            return
+        for user_id in list(self._entries):
+            if len(self._entries) <= self.max_size:
+                break
+            if user_id not in self._dirty:
+                del self._entries[user_id]
+
+    @staticmethod
+    def _clone(player: Player) -> Player:
+        clone = copy.copy(player)
+        clone.mark_clean()
+        return clone
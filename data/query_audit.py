@@ -0,0 +1,204 @@
+# data/query_audit.py
+"""
+查询计划审计：收集 data/ 与 managers/ 源码中的 SQL 字符串，逐条执行 EXPLAIN QUERY PLAN，
+报告全表扫描和需要临时 B 树排序的查询，用于发现缺少索引的热路径查询。
+
+只依赖标准库，既可由管理员指令调用，也可离线运行：
+
+    python data/query_audit.py <数据库文件>
+"""
+
+import ast
+import re
+import sqlite3
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+PLUGIN_ROOT = Path(__file__).resolve().parent.parent
+AUDIT_DIRS = ("data", "managers")
+# 迁移脚本中的全表复制是有意为之，不参与审计
+EXCLUDED_FILES = {"migration.py", "query_audit.py"}
+# 行数固定且很少的表，全表扫描不视为问题
+SMALL_TABLES = {"db_info", "rifts", "shop", "system_config"}
+
+SQL_PREFIXES = ("SELECT", "UPDATE", "DELETE", "INSERT", "REPLACE", "WITH")
+_QUOTED = re.compile(r"'(?:[^']|'')*'")
+_ACCESS = re.compile(r"^(SCAN|SEARCH) (?:TABLE )?(\w+)")
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)\b(?! USING)")
+# 没有筛选、排序或连接条件的语句（如读取全部玩家、全表重置）本来就要访问每一行，扫描不算问题
+_INDEXABLE = re.compile(r"\b(WHERE|ORDER BY|GROUP BY|JOIN)\b", re.IGNORECASE)
+
+
+@dataclass
+class SqlStatement:
+    """源码中的一条 SQL"""
+    path: str
+    lineno: int
+    sql: str
+
+
+@dataclass
+class QueryFinding:
+    """一条有问题的查询"""
+    statement: SqlStatement
+    full_scans: List[str] = field(default_factory=list)  # 全表扫描的表
+    temp_sort: bool = False  # 使用临时 B 树排序/分组
+
+
+@dataclass
+class QueryAuditReport:
+    """审计结果"""
+    checked: int = 0
+    findings: List[QueryFinding] = field(default_factory=list)
+    skipped: List[SqlStatement] = field(default_factory=list)  # 无法还原或执行失败的 SQL
+
+    def format(self, limit: Optional[int] = None) -> str:
+        lines = [f"已分析 {self.checked} 条 SQL，问题 {len(self.findings)} 条，跳过 {len(self.skipped)} 条"]
+        for finding in self.findings[:limit]:
+            problems = [f"全表扫描 {', '.join(finding.full_scans)}"] if finding.full_scans else []
+            if finding.temp_sort:
+                problems.append("临时排序")
+            sql = " ".join(finding.statement.sql.split())
+            lines.append(f"- {finding.statement.path}:{finding.statement.lineno} [{'；'.join(problems)}]\n  {sql[:160]}")
+        if limit is not None and len(self.findings) > limit:
+            lines.append(f"... 另有 {len(self.findings) - limit} 条")
+        return "\n".join(lines)
+
+
+def _module_constants(tree: ast.Module) -> Dict[str, str]:
+    """模块级的字符串常量（如列清单），f-string 中引用时按其值还原"""
+    constants = {}
+    for node in tree.body:
+        if (
+            isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+            and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+        ):
+            constants[node.targets[0].id] = node.value.value
+    return constants
+
+
+def _render_fstring(node: ast.JoinedStr, constants: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """把 f-string 还原为可执行的 SQL：模块级字符串常量按值替换，其他列清单替换为 *，
+    占位符串替换为 ?，其余插值无法还原"""
+    parts = []
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            parts.append(str(value.value))
+            continue
+        if constants and isinstance(value.value, ast.Name) and value.value.id in constants:
+            parts.append(constants[value.value.id])
+            continue
+        source = ast.unparse(value.value)
+        if source.lower().endswith("columns"):
+            parts.append("*")
+        elif "placeholders" in source:
+            parts.append("?")
+        else:
+            return None
+    return "".join(parts)
+
+
+def collect_sql(paths: Iterable[Path], root: Path = PLUGIN_ROOT) -> List[SqlStatement]:
+    """收集 Python 源码中的 SQL 字符串常量（含可还原的 f-string），无法还原的以 None 记录"""
+    statements = []
+    for path in paths:
+        tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+        constants = _module_constants(tree)
+        # f-string 中的常量片段随 f-string 整体处理
+        fragments = {
+            id(value) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr) for value in node.values
+        }
+        for node in ast.walk(tree):
+            if id(node) in fragments:
+                continue
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                sql = node.value
+            elif isinstance(node, ast.JoinedStr):
+                rendered = _render_fstring(node, constants)
+                head = "".join(v.value for v in node.values if isinstance(v, ast.Constant))
+                if not head.lstrip().upper().startswith(SQL_PREFIXES):
+                    continue
+                sql = rendered
+            else:
+                continue
+            if sql is not None and not sql.lstrip().upper().startswith(SQL_PREFIXES):
+                continue
+            # 排除恰好以这些单词开头的提示文本
+            if sql is not None and not re.search(r"\b(FROM|SET|INTO|VALUES)\b", sql, re.IGNORECASE):
+                continue
+            statements.append(SqlStatement(str(path.relative_to(root)), node.lineno, sql))
+    return statements
+
+
+def source_files(root: Path = PLUGIN_ROOT) -> List[Path]:
+    """需要审计的源码文件"""
+    return sorted(
+        path for directory in AUDIT_DIRS for path in (root / directory).glob("*.py")
+        if path.name not in EXCLUDED_FILES
+    )
+
+
+def explain(conn: sqlite3.Connection, sql: str) -> List[str]:
+    """返回查询计划的每一步描述"""
+    params = [None] * _QUOTED.sub("", sql).count("?")
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def audit(conn: sqlite3.Connection, statements: Iterable[SqlStatement]) -> QueryAuditReport:
+    """对每条 SQL 执行 EXPLAIN QUERY PLAN 并汇总问题"""
+    report = QueryAuditReport()
+    seen = set()
+    for statement in statements:
+        if statement.sql is None:
+            report.skipped.append(statement)
+            continue
+        key = " ".join(statement.sql.split())
+        if key in seen:
+            continue
+        seen.add(key)
+        try:
+            plan = explain(conn, statement.sql)
+        except sqlite3.Error:
+            report.skipped.append(statement)
+            continue
+        report.checked += 1
+        finding = QueryFinding(statement)
+        indexable = _INDEXABLE.search(statement.sql) is not None
+        large_tables = False
+        for detail in plan:
+            if detail.startswith("USE TEMP B-TREE"):
+                finding.temp_sort = True
+                continue
+            match = _ACCESS.match(detail)
+            if not match or match.group(2) in SMALL_TABLES:
+                continue
+            large_tables = True
+            table = match.group(2)
+            if indexable and _FULL_SCAN.match(detail) and table not in finding.full_scans:
+                finding.full_scans.append(table)
+        # 小表上的排序不计入
+        finding.temp_sort = finding.temp_sort and large_tables
+        if finding.full_scans or finding.temp_sort:
+            report.findings.append(finding)
+    return report
+
+
+def audit_database(db_path, root: Path = PLUGIN_ROOT) -> QueryAuditReport:
+    """以只读方式打开数据库，审计插件源码中的全部 SQL（同步执行，异步环境中请放到线程中运行）"""
+    conn = sqlite3.connect(f"file:{Path(db_path).as_posix()}?mode=ro", uri=True)
+    try:
+        return audit(conn, collect_sql(source_files(root), root))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("用法: python data/query_audit.py <数据库文件>")
+        sys.exit(2)
+    result = audit_database(sys.argv[1])
+    print(result.format())
+    # 临时排序只作提示，出现全表扫描时以非零状态退出
+    sys.exit(1 if any(finding.full_scans for finding in result.findings) else 0)
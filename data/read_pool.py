@@ -0,0 +1,114 @@
+# data/read_pool.py
+"""
+只读连接池：WAL 模式下读写互不阻塞，排行榜等长查询走独立的只读连接
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
+
+import aiosqlite
+from astrbot.api import logger
+
+if TYPE_CHECKING:
+    from .transaction import SerializedConnection
+
+# PRAGMA 默认值
+DEFAULT_SQLITE_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "cache_size": -16000,  # 负数表示 KiB，约 16MB
+    "mmap_size": 134217728,  # 128MB
+    "busy_timeout": 5000,  # 毫秒
+    "foreign_keys": "ON",  # 按连接生效，删除玩家依赖外键级联清理关联数据
+}
+
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def build_sqlite_pragmas(db_config: dict) -> dict:
+    """从 DATABASE 配置中解析 PRAGMA 设置（非法值回退为默认值）"""
+    pragmas = dict(DEFAULT_SQLITE_PRAGMAS)
+    synchronous = str(db_config.get("SQLITE_SYNCHRONOUS", pragmas["synchronous"])).upper()
+    if synchronous in SYNCHRONOUS_MODES:
+        pragmas["synchronous"] = synchronous
+    else:
+        logger.warning(f"[database] 无效的 SQLITE_SYNCHRONOUS 配置: {synchronous}，使用默认值")
+    for key, config_key in (
+        ("cache_size", "SQLITE_CACHE_SIZE"),
+        ("mmap_size", "SQLITE_MMAP_SIZE"),
+        ("busy_timeout", "SQLITE_BUSY_TIMEOUT"),
+    ):
+        try:
+            pragmas[key] = int(db_config.get(config_key, pragmas[key]))
+        except (TypeError, ValueError):
+            logger.warning(f"[database] 无效的 {config_key} 配置，使用默认值")
+    return pragmas
+
+
+async def apply_pragmas(conn: aiosqlite.Connection, pragmas: dict):
+    """对连接应用 PRAGMA 设置"""
+    # PRAGMA 不支持参数绑定，数值已在 build_sqlite_pragmas 中校验
+    for key, value in pragmas.items():
+        await conn.execute(f"PRAGMA {key} = {value}")
+
+
+class ReadPool:
+    """只读连接池"""
+
+    def __init__(self, db_path: Path, size: int, pragmas: dict):
+        self.db_path = db_path
+        self.size = max(0, int(size))
+        self.pragmas = pragmas
+        self._connections: List[aiosqlite.Connection] = []
+        self._idle: Optional[asyncio.Queue] = None
+
+    @property
+    def is_open(self) -> bool:
+        """连接池是否可用"""
+        return self._idle is not None and self.size > 0
+
+    async def open(self):
+        """创建只读连接"""
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            conn = await aiosqlite.connect(self.db_path)
+            conn.row_factory = aiosqlite.Row
+            await apply_pragmas(conn, self.pragmas)
+            await conn.execute("PRAGMA query_only = ON")
+            self._connections.append(conn)
+            self._idle.put_nowait(conn)
+
+    async def close(self):
+        """关闭所有只读连接"""
+        connections, self._connections = self._connections, []
+        self._idle = None
+        for conn in connections:
+            try:
+                await conn.close()
+            except Exception as e:
+                logger.warning(f"[database] 关闭只读连接失败: {e}")
+
+    @asynccontextmanager
+    async def acquire(self):
+        """借出一个只读连接，用完自动归还"""
+        idle = self._idle
+        conn = await idle.get()
+        try:
+            yield conn
+        finally:
+            idle.put_nowait(conn)
+
+
+@asynccontextmanager
+async def read_connection(writer: "SerializedConnection", pool: Optional[ReadPool]):
+    """获取用于只读查询的连接
+
+    未启用连接池，或当前协程持有写连接上的事务（只读连接看不到事务内的修改）时，直接使用写连接。
+    其他协程的事务未提交时仍使用只读连接，不会读到别人尚未提交（可能回滚）的修改。
+    """
+    if pool is None or not pool.is_open or writer.owns_transaction:
+        yield writer
+    else:
+        async with pool.acquire() as conn:
+            yield conn
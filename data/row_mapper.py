@@ -0,0 +1,118 @@
+# data/row_mapper.py
+"""
+查询结果行到数据模型的映射
+
+按模型字段顺序生成显式列清单（代替 SELECT *），并按游标的列描述预先计算
+"列 -> 字段" 的位置映射，之后每一行都按位置直接构造对象，不再经过 dict 转换和字段过滤。
+"""
+
+from dataclasses import MISSING, fields
+from typing import Callable, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar
+
+from ..models import Player
+from ..models_extended import Boss, BuffInfo, ImpartInfo, Rift, Sect, UserCd
+
+T = TypeVar("T")
+
+
+class RowMapper(Generic[T]):
+    """把查询结果行按位置映射为数据类实例"""
+
+    def __init__(self, model: Type[T], after_load: Optional[Callable[[T], None]] = None):
+        self.model = model
+        self.after_load = after_load  # 每个对象构造后调用（如建立脏字段跟踪基线）
+        # 只映射构造参数字段（init=False 的字段为模型内部状态，不对应数据库列）
+        model_fields = [f for f in fields(model) if f.init]
+        self.fields: Tuple[str, ...] = tuple(f.name for f in model_fields)
+        self.columns = ", ".join(self.fields)  # 按字段顺序的显式列清单
+        self._build = self._slot_builder() if "__slots__" in model.__dict__ else model
+        # 列名元组 -> 各字段在行中的位置（None 表示列与字段一一对应，可直接按位置构造）
+        self._plans: Dict[Tuple[str, ...], Optional[List[int]]] = {}
+
+    def _slot_builder(self) -> Callable[..., T]:
+        """为使用 __slots__ 的模型生成直接写槽位的构造函数
+
+        跳过 __init__ 和 __setattr__（如脏字段跟踪），内部字段（init=False）取其默认值。
+        """
+        model = self.model
+        setters = [model.__dict__[name].__set__ for name in self.fields]
+        internal = []
+        for f in fields(model):
+            if f.init:
+                continue
+            if f.default_factory is not MISSING:
+                internal.append((model.__dict__[f.name].__set__, f.default_factory, True))
+            else:
+                internal.append((model.__dict__[f.name].__set__, f.default, False))
+        new = object.__new__
+
+        def build(*values):
+            obj = new(model)
+            for setter, value in zip(setters, values):
+                setter(obj, value)
+            for setter, default, is_factory in internal:
+                setter(obj, default() if is_factory else default)
+            return obj
+
+        return build
+
+    def _plan(self, description) -> Optional[List[int]]:
+        names = tuple(column[0] for column in description)
+        try:
+            return self._plans[names]
+        except KeyError:
+            pass
+
+        if names == self.fields:
+            plan = None
+        else:
+            # 列顺序不同或有多余的列时按列名取值；查询都使用 columns 列清单，缺列说明查询写错了
+            index = {name: i for i, name in enumerate(names)}
+            missing = [name for name in self.fields if name not in index]
+            if missing:
+                raise ValueError(f"查询结果缺少 {self.model.__name__} 字段对应的列: {', '.join(missing)}")
+            plan = [index[name] for name in self.fields]
+        self._plans[names] = plan
+        return plan
+
+    def map_rows(self, description, rows: Sequence) -> List[T]:
+        """按游标的列描述批量映射"""
+        if not rows:
+            return []
+        plan = self._plan(description)
+        build, after_load = self._build, self.after_load
+        if plan is None:
+            objects = [build(*row) for row in rows]
+        else:
+            objects = [build(*[row[i] for i in plan]) for row in rows]
+        if after_load is not None:
+            for obj in objects:
+                after_load(obj)
+        return objects
+
+    def map_row(self, description, row) -> Optional[T]:
+        """映射单行，row 为 None 时返回 None"""
+        if row is None:
+            return None
+        return self.map_rows(description, (row,))[0]
+
+    async def fetch_one(self, conn, sql: str, parameters=()) -> Optional[T]:
+        """执行查询并映射第一行"""
+        async with conn.execute(sql, parameters) as cursor:
+            row = await cursor.fetchone()
+            return self.map_row(cursor.description, row)
+
+    async def fetch_all(self, conn, sql: str, parameters=()) -> List[T]:
+        """执行查询并映射所有行"""
+        async with conn.execute(sql, parameters) as cursor:
+            rows = await cursor.fetchall()
+            return self.map_rows(cursor.description, rows)
+
+
+PLAYER_MAPPER = RowMapper(Player, Player.mark_clean)
+SECT_MAPPER = RowMapper(Sect)
+BUFF_INFO_MAPPER = RowMapper(BuffInfo)
+BOSS_MAPPER = RowMapper(Boss)
+RIFT_MAPPER = RowMapper(Rift)
+IMPART_INFO_MAPPER = RowMapper(ImpartInfo)
+USER_CD_MAPPER = RowMapper(UserCd)
@@ -0,0 +1,93 @@
+# data/system_config.py
+"""
+system_config 键值表的直写缓存
+
+表很小（定时任务的下次刷新时间、少量按玩家的冷却时间戳），首次访问时整表载入内存，
+之后读取不再访问数据库；写入先落库，事务提交后再更新缓存（回滚时缓存保持不变）。
+表由数据库迁移创建，这里不再执行建表语句。
+"""
+
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from .. import codec
+
+
+class SystemConfigStore:
+    """system_config 表的键值访问（字符串 / 整数 / JSON）"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._values: Dict[str, str] = {}
+        self._loaded = False
+
+    async def _ensure_loaded(self):
+        if self._loaded:
+            return
+        async with self.conn.execute("SELECT key, value FROM system_config") as cursor:
+            rows = await cursor.fetchall()
+        # 载入期间已提交的写入比查询结果新，不覆盖
+        for key, value in rows:
+            self._values.setdefault(key, value)
+        self._loaded = True
+
+    async def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """读取字符串值"""
+        await self._ensure_loaded()
+        return self._values.get(key, default)
+
+    async def get_int(self, key: str, default: Optional[int] = None) -> Optional[int]:
+        """读取整数值，不存在或无法解析时返回默认值"""
+        value = await self.get(key)
+        if value is None:
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            return default
+
+    async def get_json(self, key: str, default: Any = None) -> Any:
+        """读取 JSON 值，不存在或无法解析时返回默认值"""
+        value = await self.get(key)
+        if value is None:
+            return default
+        try:
+            return codec.loads(value)
+        except ValueError:
+            return default
+
+    async def set(self, key: str, value: str):
+        """写入字符串值"""
+        await self.set_many({key: value})
+
+    async def set_int(self, key: str, value: int):
+        """写入整数值"""
+        await self.set_many({key: str(int(value))})
+
+    async def set_json(self, key: str, value: Any):
+        """写入 JSON 值"""
+        await self.set_many({key: codec.dumps(value)})
+
+    async def set_many(self, items: Mapping[str, str]):
+        """原子地写入多个键（值为字符串）
+
+        作为非关键写操作参与组提交；事务外调用时等到提交完成、缓存已更新后才返回，
+        之后的读取总能读到新值。
+        """
+        if not items:
+            return
+        items = dict(items)
+        now = int(time.time())
+
+        async def work(conn):
+            await conn.executemany(
+                """
+                INSERT INTO system_config (key, value, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+                """,
+                [(key, value, now) for key, value in items.items()]
+            )
+            self.conn.after_commit(lambda: self._values.update(items))
+
+        _, durable = await self.conn.submit_grouped(work)
+        await durable
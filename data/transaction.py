@@ -0,0 +1,364 @@
+# data/transaction.py
+"""
+事务管理：在共享的写连接上串行化逻辑事务，嵌套事务使用 SAVEPOINT
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+import aiosqlite
+from astrbot.api import logger
+
+from .write_queue import WriteQueue
+
+# 只读语句与事务控制语句直接在底层连接上执行
+_READ_PREFIXES = ("SELECT", "PRAGMA", "EXPLAIN", "WITH")
+_CONTROL_PREFIXES = ("BEGIN", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+# 组提交单批最多合并的写操作数量，达到后立即提交
+GROUP_COMMIT_MAX_BATCH = 64
+
+# 当前协程最近一次参与组提交的写操作的 durable future（组提交 COMMIT 后才完成）
+_pending_group_commit: ContextVar[Optional[asyncio.Future]] = ContextVar("pending_group_commit", default=None)
+
+
+class TransactionRollback(Exception):
+    """在 transaction() 块内抛出以回滚该层事务，异常本身会被吞掉"""
+
+
+def _statement_kind(sql: str) -> str:
+    """粗略判断语句类型：read / control / write"""
+    head = sql.lstrip().split(None, 1)
+    keyword = head[0].upper() if head else ""
+    if keyword.startswith(_READ_PREFIXES):
+        return "read"
+    if keyword.startswith(_CONTROL_PREFIXES):
+        return "control"
+    return "write"
+
+
+class TransactionManager:
+    """写连接上的事务管理器
+
+    - 最外层事务经由单写者队列取得写连接后执行 BEGIN IMMEDIATE，其他协程的事务排队等待
+    - 同一协程内的嵌套事务使用 SAVEPOINT，内层失败只回滚到保存点
+    - 事务提交后才执行登记的回调（如同步玩家缓存），回滚时丢弃
+    - 块内抛出 TransactionRollback 可主动回滚当前这一层而不向外传播异常
+    - 开启组提交（group_window > 0）时，时间窗口内到达的非关键写操作合并为一次 COMMIT
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, queue_size: int = 256, group_window: float = 0.0):
+        self.conn = conn
+        self.queue = WriteQueue(queue_size)
+        self._owner: Optional[asyncio.Task] = None
+        self._depth = 0
+        self._after_commit: List[Callable[[], None]] = []
+
+        self.group_window = max(0.0, float(group_window))  # 组提交窗口（秒），0 表示关闭
+        self._group: List[tuple] = []
+        self._group_timer: Optional[asyncio.Task] = None
+        self._group_commits: Set[asyncio.Task] = set()
+
+    @property
+    def owned(self) -> bool:
+        """当前协程是否处于自己开启的事务中"""
+        return self._owner is not None and self._owner is asyncio.current_task()
+
+    @property
+    def active(self) -> bool:
+        """是否有事务正在进行"""
+        return self._owner is not None
+
+    @asynccontextmanager
+    async def transaction(self, background: bool = False):
+        """开启事务（async with），正常退出时提交，抛出异常时回滚
+
+        Args:
+            background: 是否走低优先级通道（定时任务等），嵌套事务忽略此参数
+        """
+        if self.owned:
+            async with self._savepoint():
+                yield
+            return
+
+        permit = await self.queue.acquire(background)
+        try:
+            async with self._begin():
+                yield
+        finally:
+            self.queue.release(permit)
+
+    async def submit(self, work: Callable[[aiosqlite.Connection], Awaitable], background: bool = False):
+        """提交一个写工作单元，由写任务在事务中执行，返回其结果
+
+        Args:
+            work: 接收写连接的异步函数
+            background: 是否走低优先级通道
+        """
+        if self.owned:
+            async with self._savepoint():
+                return await work(self.conn)
+
+        async def unit():
+            async with self._begin():
+                return await work(self.conn)
+
+        return await self.queue.submit(unit, background)
+
+    async def submit_grouped(self, work: Callable[[aiosqlite.Connection], Awaitable]) -> Tuple[object, asyncio.Future]:
+        """提交非关键写操作，在组提交窗口内与其他写操作共用一次 COMMIT
+
+        执行完成即返回结果，不等待提交；需要确认落盘的调用方可以等待返回的 durable future。
+        未开启组提交或已在事务中时，等同于 submit。
+
+        Returns:
+            (work 的返回值, durable future)
+        """
+        loop = asyncio.get_running_loop()
+        durable = loop.create_future()
+        # 调用方不等待 durable 时，避免提交失败产生 "exception was never retrieved" 警告
+        durable.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+        if self.owned or self.group_window <= 0:
+            result = await self.submit(work)
+            durable.set_result(None)
+            return result, durable
+
+        result_future = loop.create_future()
+        self._group.append((work, result_future, durable))
+        # 写操作执行后、组 COMMIT 前登记的提交后回调要等到 durable 完成（见 after_commit）
+        _pending_group_commit.set(durable)
+        if len(self._group) >= GROUP_COMMIT_MAX_BATCH:
+            self._commit_group_soon()
+        elif self._group_timer is None:
+            self._group_timer = asyncio.create_task(self._group_timer_run())
+        return await result_future, durable
+
+    def _take_group(self) -> List[tuple]:
+        if self._group_timer is not None:
+            # 计时任务只会在等待窗口期间被取消，此时它尚未取走批次
+            self._group_timer.cancel()
+            self._group_timer = None
+        batch, self._group = self._group, []
+        return batch
+
+    def _commit_group_soon(self):
+        task = asyncio.create_task(self._commit_group(self._take_group()))
+        self._group_commits.add(task)
+        task.add_done_callback(self._group_commits.discard)
+
+    async def _group_timer_run(self):
+        await asyncio.sleep(self.group_window)
+        self._group_timer = None
+        await self._commit_group(self._take_group())
+
+    async def flush_group(self):
+        """立即提交组提交窗口中等待的写操作，并等待进行中的组提交完成"""
+        batch = self._take_group()
+        if batch:
+            await self._commit_group(batch)
+        if self._group_commits:
+            await asyncio.gather(*self._group_commits, return_exceptions=True)
+
+    async def _commit_group(self, batch: List[tuple]):
+        if not batch:
+            return
+
+        committed = []
+
+        async def run(conn):
+            for work, result_future, durable in batch:
+                if result_future.cancelled():
+                    durable.cancel()
+                    continue
+                try:
+                    # 每个写操作一个保存点，单个失败不影响同批的其他写操作
+                    async with self._savepoint():
+                        result = await work(conn)
+                except Exception as e:
+                    result_future.set_exception(e)
+                    durable.set_exception(e)
+                else:
+                    result_future.set_result(result)
+                    committed.append(durable)
+
+        try:
+            await self.submit(run)
+        except BaseException as e:
+            logger.error(f"[database] 组提交失败: {e}")
+            for _, result_future, durable in batch:
+                for future in (result_future, durable):
+                    if future.done():
+                        continue
+                    if isinstance(e, Exception):
+                        future.set_exception(e)
+                    else:
+                        future.cancel()
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        for durable in committed:
+            if not durable.done():
+                durable.set_result(None)
+
+    @asynccontextmanager
+    async def _begin(self):
+        """在已取得写连接的前提下执行最外层事务"""
+        self._owner = asyncio.current_task()
+        self._depth = 0
+        self._after_commit = []
+        try:
+            await self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except TransactionRollback:
+                await self.conn.rollback()
+                return
+            except BaseException:
+                await self.conn.rollback()
+                raise
+            try:
+                await self.conn.commit()
+            except BaseException:
+                # COMMIT 失败时事务仍处于打开状态，回滚后再向外传播
+                await self.conn.rollback()
+                raise
+            callbacks = self._after_commit
+        finally:
+            self._owner = None
+            self._after_commit = []
+
+        for callback in callbacks:
+            self._run_callback(callback)
+
+    @staticmethod
+    def _run_callback(callback: Callable[[], None]):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"[database] 事务提交后回调执行失败: {e}")
+
+    @asynccontextmanager
+    async def _savepoint(self):
+        self._depth += 1
+        name = f"sp_{self._depth}"
+        callbacks_mark = len(self._after_commit)
+        await self.conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield
+        except BaseException as e:
+            await self.conn.execute(f"ROLLBACK TO {name}")
+            await self.conn.execute(f"RELEASE {name}")
+            del self._after_commit[callbacks_mark:]
+            if not isinstance(e, TransactionRollback):
+                raise
+        else:
+            await self.conn.execute(f"RELEASE {name}")
+        finally:
+            self._depth -= 1
+
+    def after_commit(self, callback: Callable[[], None]):
+        """登记事务提交后执行的回调
+
+        当前协程在事务中时于最外层提交后执行；刚执行的写操作加入了组提交批次时，
+        等该批次 COMMIT 成功后执行（失败则丢弃）；否则写操作已提交，立即执行。
+        """
+        if self.owned:
+            self._after_commit.append(callback)
+            return
+        pending = _pending_group_commit.get()
+        if pending is None or pending.done():
+            if pending is None or (not pending.cancelled() and pending.exception() is None):
+                self._run_callback(callback)
+            return
+
+        def on_durable(future: asyncio.Future):
+            if not future.cancelled() and future.exception() is None:
+                self._run_callback(callback)
+        pending.add_done_callback(on_durable)
+
+
+class SerializedConnection:
+    """包装共享写连接，使未显式开启事务的写操作也与事务串行执行
+
+    不在事务中的单条写语句会自动包在一个独立事务中执行（等待其他协程的事务结束），
+    因此其后的 commit() 不会误提交其他协程进行到一半的事务。需要参与组提交的写操作
+    须显式通过 submit_grouped 提交。
+    其余属性和方法直接转发给底层 aiosqlite 连接。
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, queue_size: int = 256, group_window: float = 0.0):
+        self._conn = conn
+        self.transactions = TransactionManager(conn, queue_size, group_window)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    @property
+    def raw(self) -> aiosqlite.Connection:
+        """底层 aiosqlite 连接"""
+        return self._conn
+
+    def transaction(self, background: bool = False):
+        """开启事务（async with），支持嵌套"""
+        return self.transactions.transaction(background)
+
+    def submit(self, work: Callable[[aiosqlite.Connection], Awaitable], background: bool = False):
+        """提交写工作单元（闭包），由写任务执行"""
+        return self.transactions.submit(work, background)
+
+    def submit_grouped(self, work: Callable[[aiosqlite.Connection], Awaitable]):
+        """提交非关键写操作（组提交），返回 (结果, durable future)"""
+        return self.transactions.submit_grouped(work)
+
+    def after_commit(self, callback: Callable[[], None]):
+        """登记事务提交后执行的回调"""
+        self.transactions.after_commit(callback)
+
+    @property
+    def owns_transaction(self) -> bool:
+        """当前协程的写操作是否会直接进入已开启的事务"""
+        if self.transactions.owned:
+            return True
+        # 未经管理器开启的手动事务（如数据库迁移）
+        return not self.transactions.active and self._conn.in_transaction
+
+    def _passthrough(self, sql: str) -> bool:
+        return _statement_kind(sql) != "write" or self.owns_transaction
+
+    def execute(self, sql: str, parameters=None):
+        if self._passthrough(sql):
+            return self._conn.execute(sql, parameters)
+        return self._execute_in_transaction(self._conn.execute, sql, parameters)
+
+    def executemany(self, sql: str, parameters):
+        if self._passthrough(sql):
+            return self._conn.executemany(sql, parameters)
+        return self._execute_in_transaction(self._conn.executemany, sql, parameters)
+
+    async def _execute_in_transaction(self, method, sql, parameters):
+        async with self.transactions.transaction():
+            return await method(sql, parameters)
+
+    async def close(self):
+        """提交组提交窗口中的写操作，停止写任务并关闭连接"""
+        await self.transactions.flush_group()
+        await self.transactions.queue.stop()
+        await self._conn.close()
+
+    async def commit(self):
+        """提交：事务内由最外层统一提交，此处不做任何事"""
+        if self.transactions.owned:
+            return
+        if not self.transactions.active and self._conn.in_transaction:
+            await self._conn.commit()
+
+    async def rollback(self):
+        """回滚：事务内请通过抛出异常回滚，此处只处理手动事务"""
+        if self.transactions.owned:
+            raise RuntimeError("事务内请通过抛出异常回滚，而不是直接调用 rollback()")
+        if not self.transactions.active and self._conn.in_transaction:
+            await self._conn.rollback()
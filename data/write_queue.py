@@ -0,0 +1,162 @@
+# data/write_queue.py
+"""
+单写者队列：由一个写任务按先进先出顺序处理所有写操作
+
+写操作有两种提交方式：
+- 工作单元（闭包）：由写任务自己在事务中执行，调用方等待其返回值
+- 事务许可：写任务把写连接的使用权交给调用方（db.transaction() 的代码块），直到调用方归还
+
+交互指令走普通通道，定时任务走低优先级通道；队列满时提交方等待（背压）。
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+# 低优先级通道连续让行的上限，超过后强制处理一个低优先级请求，避免饿死
+BACKGROUND_STARVATION_LIMIT = 8
+
+
+class _WriteRequest:
+    __slots__ = ("work", "future", "released", "enqueued_at")
+
+    def __init__(self, work: Optional[Callable[[], Awaitable]]):
+        self.work = work
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.released: Optional[asyncio.Event] = None if work is not None else asyncio.Event()
+        self.enqueued_at = time.monotonic()
+
+
+class WriteQueue:
+    """单写者队列"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = max(1, int(maxsize))
+        self._lanes = {False: deque(), True: deque()}  # background -> 请求队列
+        self._slots = {
+            False: asyncio.Semaphore(self.maxsize),
+            True: asyncio.Semaphore(self.maxsize),
+        }
+        self._has_work = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._background_skipped = 0
+
+        # 统计信息
+        self.processed = 0
+        self.max_depth = 0
+        self.total_wait = 0.0
+
+    @property
+    def writer_task(self) -> Optional[asyncio.Task]:
+        """写任务"""
+        return self._writer
+
+    @property
+    def depth(self) -> int:
+        """排队中的写请求数量"""
+        return len(self._lanes[False]) + len(self._lanes[True])
+
+    def stats(self) -> dict:
+        """队列统计信息"""
+        return {
+            "depth": self.depth,
+            "interactive": len(self._lanes[False]),
+            "background": len(self._lanes[True]),
+            "max_depth": self.max_depth,
+            "processed": self.processed,
+            "avg_wait_ms": round(self.total_wait / self.processed * 1000, 2) if self.processed else 0.0,
+        }
+
+    def start(self):
+        """启动写任务"""
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止写任务，尚未处理的请求会被取消"""
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        for lane in self._lanes.values():
+            while lane:
+                request = lane.popleft()
+                if not request.future.done():
+                    request.future.cancel()
+
+    async def submit(self, work: Callable[[], Awaitable], background: bool = False):
+        """提交一个工作单元，由写任务执行并返回其结果"""
+        request = await self._enqueue(_WriteRequest(work), background)
+        return await request.future
+
+    async def acquire(self, background: bool = False) -> _WriteRequest:
+        """申请写连接使用权，返回的许可需通过 release 归还"""
+        request = await self._enqueue(_WriteRequest(None), background)
+        try:
+            await request.future
+        except asyncio.CancelledError:
+            # 已获得许可但调用方被取消时，立即归还
+            if request.future.done() and not request.future.cancelled():
+                request.released.set()
+            else:
+                request.future.cancel()
+            raise
+        return request
+
+    @staticmethod
+    def release(request: _WriteRequest):
+        """归还写连接使用权"""
+        request.released.set()
+
+    async def _enqueue(self, request: _WriteRequest, background: bool) -> _WriteRequest:
+        self.start()
+        await self._slots[background].acquire()
+        self._lanes[background].append(request)
+        self.max_depth = max(self.max_depth, self.depth)
+        self._has_work.set()
+        return request
+
+    async def _next(self) -> _WriteRequest:
+        while True:
+            interactive, background = self._lanes[False], self._lanes[True]
+            if interactive and (not background or self._background_skipped < BACKGROUND_STARVATION_LIMIT):
+                if background:
+                    self._background_skipped += 1
+                lane = False
+            elif background:
+                self._background_skipped = 0
+                lane = True
+            else:
+                self._has_work.clear()
+                await self._has_work.wait()
+                continue
+            request = self._lanes[lane].popleft()
+            self._slots[lane].release()
+            return request
+
+    async def _run(self):
+        while True:
+            request = await self._next()
+            if request.future.cancelled():
+                continue
+            self.processed += 1
+            self.total_wait += time.monotonic() - request.enqueued_at
+
+            if request.work is None:
+                request.future.set_result(None)
+                await request.released.wait()
+                continue
+
+            try:
+                result = await request.work()
+            except asyncio.CancelledError:
+                request.future.cancel()
+                raise
+            except Exception as e:
+                request.future.set_exception(e)
+            else:
+                request.future.set_result(result)
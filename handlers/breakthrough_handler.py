@@ -37,7 +37,7 @@ class BreakthroughHandler:
             return
 
         await self.pill_manager.update_temporary_effects(player)
-        modifiers = self.pill_manager.get_breakthrough_modifiers(player)
+        modifiers = await self.pill_manager.get_breakthrough_modifiers(player)
 
         # 获取当前和下一境界信息
         current_level_data = level_data[player.level_index]
@@ -129,7 +129,7 @@ class BreakthroughHandler:
         display_name = event.get_sender_name()
 
         await self.pill_manager.update_temporary_effects(player)
-        modifiers = self.pill_manager.get_breakthrough_modifiers(player)
+        modifiers = await self.pill_manager.get_breakthrough_modifiers(player)
 
         # 根据修炼类型获取对应的境界数据
         level_data = self.config_manager.get_level_data(player.cultivation_type)
@@ -5,7 +5,7 @@ from astrbot.api.event import AstrMessageEvent
 from astrbot.api.all import *
 from ..managers.combat_manager import CombatManager, CombatStats
 from ..data.data_manager import DataBase
-from .utils import player_required
+from .utils import player_required, user_locks
 from ..models import Player
 from ..models_extended import UserStatus
 
@@ -161,53 +161,55 @@ class CombatHandlers:
             yield event.plain_result("❌ 不能和自己决斗")
             return
 
-        # 检查发起者状态
-        user_cd = await self.db.ext.get_user_cd(user_id)
-        if user_cd and user_cd.type != UserStatus.IDLE:
-            current_status = UserStatus.get_name(user_cd.type)
-            yield event.plain_result(f"❌ 你当前正在{current_status}，无法进行战斗！")
-            return
+        # 同时锁定双方，避免与双方的其他指令交错修改气血
+        async with user_locks.hold(user_id, target_id):
+            # 检查发起者状态
+            user_cd = await self.db.ext.get_user_cd(user_id)
+            if user_cd and user_cd.type != UserStatus.IDLE:
+                current_status = UserStatus.get_name(user_cd.type)
+                yield event.plain_result(f"❌ 你当前正在{current_status}，无法进行战斗！")
+                return
         
-        # 检查目标状态
-        target_cd = await self.db.ext.get_user_cd(target_id)
-        if target_cd and target_cd.type != UserStatus.IDLE:
-            target_status = UserStatus.get_name(target_cd.type)
-            yield event.plain_result(f"❌ 对方当前正在{target_status}，无法进行战斗！")
-            return
+            # 检查目标状态
+            target_cd = await self.db.ext.get_user_cd(target_id)
+            if target_cd and target_cd.type != UserStatus.IDLE:
+                target_status = UserStatus.get_name(target_cd.type)
+                yield event.plain_result(f"❌ 对方当前正在{target_status}，无法进行战斗！")
+                return
 
-        # 检查冷却
-        now = int(time.time())
-        cooldown = await self._get_combat_cooldown(user_id)
-        last_duel = cooldown.get("last_duel_time", 0)
-        if last_duel and (now - last_duel) < DUEL_COOLDOWN:
-            remaining = DUEL_COOLDOWN - (now - last_duel)
-            yield event.plain_result(f"❌ 决斗冷却中，还需 {remaining // 60} 分 {remaining % 60} 秒")
-            return
+            # 检查冷却
+            now = int(time.time())
+            cooldown = await self._get_combat_cooldown(user_id)
+            last_duel = cooldown.get("last_duel_time", 0)
+            if last_duel and (now - last_duel) < DUEL_COOLDOWN:
+                remaining = DUEL_COOLDOWN - (now - last_duel)
+                yield event.plain_result(f"❌ 决斗冷却中，还需 {remaining // 60} 分 {remaining % 60} 秒")
+                return
 
-        # 获取双方数据
-        p1_stats = await self._prepare_combat_stats(user_id)
-        p2_stats = await self._prepare_combat_stats(target_id)
+            # 获取双方数据
+            p1_stats = await self._prepare_combat_stats(user_id)
+            p2_stats = await self._prepare_combat_stats(target_id)
         
-        if not p1_stats:
-            yield event.plain_result("❌ 你还未踏入修仙之路")
-            return
-        if not p2_stats:
-            yield event.plain_result("❌ 对方还未踏入修仙之路")
-            return
+            if not p1_stats:
+                yield event.plain_result("❌ 你还未踏入修仙之路")
+                return
+            if not p2_stats:
+                yield event.plain_result("❌ 对方还未踏入修仙之路")
+                return
 
-        # 战斗
-        result = self.combat_mgr.player_vs_player(p1_stats, p2_stats, combat_type=2) # 2=决斗
+            # 战斗
+            result = self.combat_mgr.player_vs_player(p1_stats, p2_stats, combat_type=2) # 2=决斗
         
-        # 结算（更新HP）
-        await self.db.ext.update_player_hp_mp(user_id, result['player1_final_hp'], result['player1_final_mp'])
-        await self.db.ext.update_player_hp_mp(target_id, result['player2_final_hp'], result['player2_final_mp'])
+            # 结算（更新HP）
+            await self.db.ext.update_player_hp_mp(user_id, result['player1_final_hp'], result['player1_final_mp'])
+            await self.db.ext.update_player_hp_mp(target_id, result['player2_final_hp'], result['player2_final_mp'])
         
-        # 更新冷却
-        await self._update_combat_cooldown(user_id, "duel")
+            # 更新冷却
+            await self._update_combat_cooldown(user_id, "duel")
         
-        # 生成战报
-        log = "\n".join(result['combat_log'])
-        yield event.plain_result(f"{log}")
+            # 生成战报
+            log = "\n".join(result['combat_log'])
+            yield event.plain_result(f"{log}")
 
     async def handle_spar(self, event: AstrMessageEvent, target: str):
         """切磋 (不消耗气血)"""
@@ -6,7 +6,7 @@ from astrbot.api.all import At
 from ..data import DataBase
 from ..managers.dual_cultivation_manager import DualCultivationManager
 from ..models import Player
-from .utils import player_required
+from .utils import lock_players, player_required
 
 __all__ = ["DualCultivationHandlers"]
 
@@ -43,13 +43,21 @@ class DualCultivationHandlers:
             )
             return
         
-        success, msg = await self.mgr.send_request(player, target_id)
+        async with lock_players(self.db, player, target_id) as player:
+            if not player:
+                return
+            success, msg = await self.mgr.send_request(player, target_id)
         yield event.plain_result(msg)
     
     @player_required
     async def handle_accept(self, player: Player, event: AstrMessageEvent):
         """接受双修"""
-        success, msg = await self.mgr.accept_request(player)
+        # 双修同时修改双方修为，锁定发起者和接受者
+        initiator_id = await self.mgr.get_request_initiator(player.user_id)
+        async with lock_players(self.db, player, initiator_id) as player:
+            if not player:
+                return
+            success, msg = await self.mgr.accept_request(player)
         yield event.plain_result(msg)
     
     @player_required
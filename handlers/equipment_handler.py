@@ -36,7 +36,7 @@ class EquipmentHandler:
         )
 
         await self.pill_manager.update_temporary_effects(player)
-        pill_multipliers = self.pill_manager.calculate_pill_attribute_effects(player)
+        pill_multipliers = await self.pill_manager.calculate_pill_attribute_effects(player)
 
         # 构建装备显示
         equipment_lines = [
@@ -125,7 +125,7 @@ class EquipmentHandler:
             return
 
         # 检查储物戒中是否有该物品
-        if not self.storage_ring_manager.has_item(player, item_name, 1):
+        if not await self.storage_ring_manager.has_item(player, item_name, 1):
             yield event.plain_result(
                 f"❌ 储物戒中没有【{item_name}】\n"
                 f"请先通过购买或获得该装备"
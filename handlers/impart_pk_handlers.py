@@ -5,7 +5,7 @@ from astrbot.api.event import AstrMessageEvent
 from ..data import DataBase
 from ..managers.impart_pk_manager import ImpartPkManager
 from ..models import Player
-from .utils import player_required
+from .utils import lock_players, player_required
 
 __all__ = ["ImpartPkHandlers"]
 
@@ -38,14 +38,18 @@ class ImpartPkHandlers:
             yield event.plain_result("❌ 不能挑战自己。")
             return
         
-        # 获取目标玩家
-        target = await self.db.get_player_by_id(target_id)
-        if not target:
-            yield event.plain_result("❌ 对方还未踏入修仙之路。")
-            return
+        # 挑战同时修改双方的传承与修为，锁定双方
+        async with lock_players(self.db, player, target_id) as player:
+            if not player:
+                return
+            # 获取目标玩家
+            target = await self.db.get_player_by_id(target_id)
+            if not target:
+                yield event.plain_result("❌ 对方还未踏入修仙之路。")
+                return
         
-        # 发起挑战
-        wins, log, rewards = await self.impart_pk_mgr.challenge_impart(player, target)
+            # 发起挑战
+            wins, log, rewards = await self.impart_pk_mgr.challenge_impart(player, target)
         
         if wins:
             result_msg = (
@@ -98,8 +98,9 @@ class MiscHandler:
             "  传承排行 → 查看传承榜\n"
             "\n"
             "📊【排行榜】\n"
-            "  境界排行 / 战力排行 / 灵石排行\n"
-            "  宗门排行 / 存款排行 / 贡献排行\n"
+            "  境界排行 / 战力排行 / 灵石排行 [页码]\n"
+            "  宗门排行 / 存款排行 [页码] / 贡献排行\n"
+            "  我的排名 [境界/战力/灵石/存款/传承/贡献]\n"
             "\n"
             "🚶【历练系统】(路线化冒险玩法)\n"
             "  开始历练 <路线名>\n"
@@ -47,8 +47,10 @@ class NicknameHandler:
             return
         
         old_name = player.user_name if player.user_name else "无"
-        player.user_name = new_name
-        await self.db.update_player(player)
+        # 并发改成同一道号时由唯一索引兜底
+        if not await self.db.ext.update_player_name(player.user_id, new_name):
+            yield event.plain_result(f"❌ 道号『{new_name}』已被其他修士使用。")
+            return
         
         yield event.plain_result(
             "✅ 道号修改成功！\n"
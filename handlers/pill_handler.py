@@ -76,14 +76,12 @@ class PillHandler:
             player: 玩家对象
             event: 事件对象
         """
-        # 先更新临时效果
-        await self.pill_manager.update_temporary_effects(player)
+        # 先更新临时效果，得到当前生效的临时效果
+        active_effects = await self.pill_manager.update_temporary_effects(player)
 
         # 获取丹药背包显示
-        inventory_display = self.pill_manager.get_pill_inventory_display(player)
+        inventory_display = await self.pill_manager.get_pill_inventory_display(player)
 
-        # 获取当前生效的临时效果
-        active_effects = player.get_active_pill_effects()
         effects_display = []
 
         if active_effects:
@@ -4,9 +4,9 @@ import random
 from datetime import datetime
 from astrbot.api.event import AstrMessageEvent
 from astrbot.api import AstrBotConfig
-from ..data import DataBase
+from ..data import DataBase, PlayerVersionConflict
 from ..core import CultivationManager, PillManager
-from ..models import Player
+from ..models import Player, calculate_combat_power
 from ..models_extended import UserStatus
 from ..config_manager import ConfigManager
 from .utils import player_required
@@ -116,29 +116,20 @@ class PlayerHandler:
 
         # 更新丹药效果并计算最终属性倍率
         await self.pill_manager.update_temporary_effects(player)
-        pill_multipliers = self.pill_manager.calculate_pill_attribute_effects(player)
+        pill_multipliers = await self.pill_manager.calculate_pill_attribute_effects(player)
 
-        # 获取装备加成后的属性
-        from ..core import EquipmentManager
-        equipment_manager = EquipmentManager(self.db, self.config_manager)
-        equipped_items = equipment_manager.get_equipped_items(
-            player,
-            self.config_manager.items_data,
-            self.config_manager.weapons_data
-        )
-        total_attrs = player.get_total_attributes(equipped_items, pill_multipliers)
+        # 装备加成后的属性随玩家数据保存，尚未回填的旧数据在这里补算
+        if player.total_attributes == "{}":
+            self.db.refresh_combat_stats(player, force=True)
+        total_attrs = player.get_combat_attributes(pill_multipliers)
 
         # 图片生成暂时禁用（缺少资源文件会导致效果很差）
         # 直接使用优化后的文本格式显示
 
         # 文本模式 (完整信息显示)
         
-        # 获取战力（综合攻防）
-        combat_power = (
-            int(total_attrs['physical_damage']) + int(total_attrs['magic_damage']) +
-            int(total_attrs['physical_defense']) + int(total_attrs['magic_defense']) +
-            int(total_attrs['mental_power']) // 10
-        )
+        # 获取战力（综合攻防，含临时丹药效果）
+        combat_power = calculate_combat_power(total_attrs)
         
         # 获取宗门信息
         sect_name = "无宗门"
@@ -316,7 +307,7 @@ class PlayerHandler:
 
         # 更新丹药效果，确保持续结算
         await self.pill_manager.update_temporary_effects(player)
-        pill_multipliers = self.pill_manager.calculate_pill_attribute_effects(player)
+        pill_multipliers = await self.pill_manager.calculate_pill_attribute_effects(player)
 
         # 获取主修心法的修为加成
         technique_bonus = 0.0
@@ -381,14 +372,6 @@ class PlayerHandler:
         # 获取今天的日期（格式：YYYY-MM-DD）
         today = datetime.now().strftime("%Y-%m-%d")
 
-        # 检查是否已经签到过
-        if player.last_check_in_date == today:
-            yield event.plain_result(
-                "📅 道友今日已经签到过了\n"
-                "请明日再来。"
-            )
-            return
-
         # 获取签到奖励范围配置
         check_in_gold_min = self.config["VALUES"].get("CHECK_IN_GOLD_MIN", 50)
         check_in_gold_max = self.config["VALUES"].get("CHECK_IN_GOLD_MAX", 500)
@@ -397,19 +380,33 @@ class PlayerHandler:
         if check_in_gold_min > check_in_gold_max:
             check_in_gold_min, check_in_gold_max = check_in_gold_max, check_in_gold_min
 
-        # 生成随机奖励
-        check_in_gold = random.randint(check_in_gold_min, check_in_gold_max)
-
-        # 更新玩家数据
-        player.gold += check_in_gold
-        player.last_check_in_date = today
-        await self.db.update_player(player)
+        def check_in(fresh: Player):
+            # 检查是否已经签到过（版本冲突重试时以最新数据重新判断，避免并发签到重复领奖）
+            if fresh.last_check_in_date == today:
+                return None
+            check_in_gold = random.randint(check_in_gold_min, check_in_gold_max)
+            fresh.gold += check_in_gold
+            fresh.last_check_in_date = today
+            return check_in_gold, fresh.gold
+
+        try:
+            result = await self.db.mutate_player(player.user_id, check_in)
+        except PlayerVersionConflict:
+            yield event.plain_result("❌ 道友的数据正被其他操作修改，签到未生效，请稍后再试。")
+            return
+        if result is None:
+            yield event.plain_result(
+                "📅 道友今日已经签到过了\n"
+                "请明日再来。"
+            )
+            return
+        check_in_gold, current_gold = result
 
         reply_msg = (
             "✅ 签到成功！\n"
             "━━━━━━━━━━━━━━━\n"
             f"💰 获得灵石：{check_in_gold}\n"
-            f"💎 当前灵石：{player.gold}\n"
+            f"💎 当前灵石：{current_gold}\n"
             "━━━━━━━━━━━━━━━\n"
             "明日再来，莫要忘记哦~"
         )
@@ -434,10 +431,10 @@ class PlayerHandler:
             return
 
         key = f"rebirth_last_{player.user_id}"
-        last_ts = await self.db.ext.get_system_config(key)
+        last_ts = await self.db.ext.system_config.get_int(key)
         now = int(time.time())
         if last_ts:
-            diff = now - int(last_ts)
+            diff = now - last_ts
             if diff < REBIRTH_COOLDOWN:
                 remaining = REBIRTH_COOLDOWN - diff
                 days = remaining // 86400
@@ -461,7 +458,7 @@ class PlayerHandler:
             return
 
         await self.db.delete_player_cascade(player.user_id)
-        await self.db.ext.set_system_config(key, str(now))
+        await self.db.ext.system_config.set_int(key, now)
 
         yield event.plain_result(
             "💀 你选择了弃道重修，旧生一切化为尘埃。\n"
@@ -2,35 +2,44 @@
 from astrbot.api.event import AstrMessageEvent
 from ..managers.ranking_manager import RankingManager
 from ..data.data_manager import DataBase
+from ..models import Player
+from .utils import player_required
+
+
+def _parse_page(page: str) -> int:
+    """解析页码参数，缺省或无效时为第一页"""
+    page = str(page).strip()
+    return max(1, int(page)) if page.isdigit() else 1
+
 
 class RankingHandlers:
     def __init__(self, db: DataBase, rank_mgr: RankingManager):
         self.db = db
         self.rank_mgr = rank_mgr
 
-    async def handle_rank_level(self, event: AstrMessageEvent):
+    async def handle_rank_level(self, event: AstrMessageEvent, page: str = ""):
         """境界排行"""
-        success, msg = await self.rank_mgr.get_level_ranking()
+        success, msg = await self.rank_mgr.get_level_ranking(_parse_page(page), str(event.get_sender_id()))
         yield event.plain_result(msg)
 
-    async def handle_rank_power(self, event: AstrMessageEvent):
+    async def handle_rank_power(self, event: AstrMessageEvent, page: str = ""):
         """战力排行"""
-        success, msg = await self.rank_mgr.get_power_ranking()
+        success, msg = await self.rank_mgr.get_power_ranking(_parse_page(page), str(event.get_sender_id()))
         yield event.plain_result(msg)
     
-    async def handle_rank_wealth(self, event: AstrMessageEvent):
+    async def handle_rank_wealth(self, event: AstrMessageEvent, page: str = ""):
         """财富排行"""
-        success, msg = await self.rank_mgr.get_wealth_ranking()
+        success, msg = await self.rank_mgr.get_wealth_ranking(_parse_page(page), str(event.get_sender_id()))
         yield event.plain_result(msg)
     
-    async def handle_rank_sect(self, event: AstrMessageEvent):
+    async def handle_rank_sect(self, event: AstrMessageEvent, page: str = ""):
         """宗门排行"""
-        success, msg = await self.rank_mgr.get_sect_ranking()
+        success, msg = await self.rank_mgr.get_sect_ranking(_parse_page(page), str(event.get_sender_id()))
         yield event.plain_result(msg)
     
-    async def handle_rank_deposit(self, event: AstrMessageEvent):
+    async def handle_rank_deposit(self, event: AstrMessageEvent, page: str = ""):
         """存款排行"""
-        success, msg = await self.rank_mgr.get_deposit_ranking()
+        success, msg = await self.rank_mgr.get_deposit_ranking(_parse_page(page), str(event.get_sender_id()))
         yield event.plain_result(msg)
     
     async def handle_rank_sect_contribution(self, event: AstrMessageEvent):
@@ -48,3 +57,9 @@ class RankingHandlers:
         
         success, msg = await self.rank_mgr.get_contribution_ranking(player.sect_id)
         yield event.plain_result(msg)
+
+    @player_required
+    async def handle_my_rank(self, player: Player, event: AstrMessageEvent, board_name: str = ""):
+        """我的排名"""
+        success, msg = await self.rank_mgr.get_my_rank(player, board_name.strip())
+        yield event.plain_result(msg)
@@ -4,7 +4,7 @@ import time
 import re
 from astrbot.api.event import AstrMessageEvent
 from astrbot.api import AstrBotConfig, logger
-from ..data import DataBase
+from ..data import DataBase, TransactionRollback
 from ..core import ShopManager, EquipmentManager, PillManager, StorageRingManager
 from ..models import Player
 from ..config_manager import ConfigManager
@@ -12,6 +12,9 @@ from .utils import player_required
 
 __all__ = ["ShopHandler"]
 
+# 购买时查找物品的阁楼顺序
+PAVILION_IDS = ["pill_pavilion", "weapon_pavilion", "treasure_pavilion"]
+
 class ShopHandler:
     """商店处理器"""
     
@@ -45,10 +48,6 @@ class ShopHandler:
     async def _ensure_pavilion_refreshed(self, pavilion_id: str, item_getter, count: int) -> None:
         """确保阁楼已刷新"""
         last_refresh_time, current_items = await self.db.get_shop_data(pavilion_id)
-        if current_items:
-            updated = self.shop_manager.ensure_items_have_stock(current_items)
-            if updated:
-                await self.db.update_shop_data(pavilion_id, last_refresh_time, current_items)
         refresh_hours = self.config.get("PAVILION_REFRESH_HOURS", 1)
         if not current_items or self.shop_manager.should_refresh_shop(last_refresh_time, refresh_hours):
             new_items = self.shop_manager.generate_pavilion_items(item_getter, count)
@@ -91,13 +90,10 @@ class ShopHandler:
         yield event.plain_result(display)
 
     async def _find_item_in_pavilions(self, item_name: str):
-        """在所有阁楼中查找物品"""
-        for pavilion_id in ["pill_pavilion", "weapon_pavilion", "treasure_pavilion"]:
-            _, items = await self.db.get_shop_data(pavilion_id)
-            if items:
-                for item in items:
-                    if item['name'] == item_name and item.get('stock', 0) > 0:
-                        return pavilion_id, item
+        """在所有阁楼中查找有库存的物品"""
+        item = await self.db.find_shop_item(item_name, PAVILION_IDS)
+        if item:
+            return item['shop_id'], item
         return None, None
 
     @player_required
@@ -160,72 +156,74 @@ class ShopHandler:
         item_type = target_item['type']
         result_lines = []
 
-        await self.db.conn.execute("BEGIN IMMEDIATE")
+        failure_msg = None
         try:
-            player = await self.db.get_player_by_id(event.get_sender_id())
-            if player.gold < total_price:
-                await self.db.conn.rollback()
-                yield event.plain_result(
-                    f"灵石不足！\n【{target_item['name']}】价格: {price} 灵石\n"
-                    f"购买数量: {quantity}\n需要灵石: {total_price}\n你的灵石: {player.gold}"
-                )
-                return
-
-            reserved, _, remaining = await self.db.decrement_shop_item_stock(pavilion_id, item_name, quantity, external_transaction=True)
-            if not reserved:
-                await self.db.conn.rollback()
-                yield event.plain_result(f"【{item_name}】已售罄，请等待刷新。")
-                return
-
-            if item_type in ['weapon', 'armor', 'main_technique', 'technique', 'accessory']:
-                success, msg = await self.storage_ring_manager.store_item(player, target_item['name'], quantity, external_transaction=True)
-                if success:
-                    type_name = {"weapon": "武器", "armor": "防具", "main_technique": "心法", "technique": "功法", "accessory": "饰品"}.get(item_type, "装备")
-                    result_lines.append(f"成功购买{type_name}【{target_item['name']}】x{quantity}，已存入储物戒。")
-                else:
-                    result_lines.append(f"成功购买【{target_item['name']}】x{quantity}。")
-                    result_lines.append(f"⚠️ 存入储物戒失败：{msg}")
-            elif item_type in ['pill', 'exp_pill', 'utility_pill']:
-                await self.pill_manager.add_pill_to_inventory(player, target_item['name'], count=quantity)
-                result_lines.append(f"成功购买【{target_item['name']}】x{quantity}，已添加到背包。")
-            elif item_type == 'legacy_pill':
-                success, message = await self._apply_legacy_pill_effects(player, target_item, quantity)
-                if not success:
-                    await self.db.conn.rollback()
-                    yield event.plain_result(message)
-                    return
-                result_lines.append(message)
-            elif item_type == 'material':
-                success, msg = await self.storage_ring_manager.store_item(player, target_item['name'], quantity, external_transaction=True)
-                if success:
-                    result_lines.append(f"成功购买材料【{target_item['name']}】x{quantity}，已存入储物戒。")
-                else:
-                    result_lines.append(f"成功购买材料【{target_item['name']}】x{quantity}。")
-                    result_lines.append(f"⚠️ 存入储物戒失败：{msg}")
-            elif item_type == '功法':
-                success, msg = await self.storage_ring_manager.store_item(player, target_item['name'], quantity, external_transaction=True)
-                if success:
-                    result_lines.append(f"成功购买功法【{target_item['name']}】x{quantity}，已存入储物戒。")
+            async with self.db.transaction():
+                player = await self.db.get_player_by_id(event.get_sender_id())
+                if player.gold < total_price:
+                    failure_msg = (
+                        f"灵石不足！\n【{target_item['name']}】价格: {price} 灵石\n"
+                        f"购买数量: {quantity}\n需要灵石: {total_price}\n你的灵石: {player.gold}"
+                    )
+                    raise TransactionRollback()
+
+                reserved, remaining = await self.db.decrement_shop_item_stock(pavilion_id, item_name, quantity)
+                if not reserved:
+                    if remaining > 0:
+                        failure_msg = f"【{item_name}】库存不足，当前库存: {remaining}。"
+                    else:
+                        failure_msg = f"【{item_name}】已售罄，请等待刷新。"
+                    raise TransactionRollback()
+
+                if item_type in ['weapon', 'armor', 'main_technique', 'technique', 'accessory']:
+                    success, msg = await self.storage_ring_manager.store_item(player, target_item['name'], quantity)
+                    if success:
+                        type_name = {"weapon": "武器", "armor": "防具", "main_technique": "心法", "technique": "功法", "accessory": "饰品"}.get(item_type, "装备")
+                        result_lines.append(f"成功购买{type_name}【{target_item['name']}】x{quantity}，已存入储物戒。")
+                    else:
+                        result_lines.append(f"成功购买【{target_item['name']}】x{quantity}。")
+                        result_lines.append(f"⚠️ 存入储物戒失败：{msg}")
+                elif item_type in ['pill', 'exp_pill', 'utility_pill']:
+                    await self.pill_manager.add_pill_to_inventory(player, target_item['name'], count=quantity)
+                    result_lines.append(f"成功购买【{target_item['name']}】x{quantity}，已添加到背包。")
+                elif item_type == 'legacy_pill':
+                    success, message = await self._apply_legacy_pill_effects(player, target_item, quantity)
+                    if not success:
+                        failure_msg = message
+                        raise TransactionRollback()
+                    result_lines.append(message)
+                elif item_type == 'material':
+                    success, msg = await self.storage_ring_manager.store_item(player, target_item['name'], quantity)
+                    if success:
+                        result_lines.append(f"成功购买材料【{target_item['name']}】x{quantity}，已存入储物戒。")
+                    else:
+                        result_lines.append(f"成功购买材料【{target_item['name']}】x{quantity}。")
+                        result_lines.append(f"⚠️ 存入储物戒失败：{msg}")
+                elif item_type == '功法':
+                    success, msg = await self.storage_ring_manager.store_item(player, target_item['name'], quantity)
+                    if success:
+                        result_lines.append(f"成功购买功法【{target_item['name']}】x{quantity}，已存入储物戒。")
+                    else:
+                        result_lines.append(f"成功购买功法【{target_item['name']}】x{quantity}。")
+                        result_lines.append(f"⚠️ 存入储物戒失败：{msg}")
                 else:
-                    result_lines.append(f"成功购买功法【{target_item['name']}】x{quantity}。")
-                    result_lines.append(f"⚠️ 存入储物戒失败：{msg}")
-            else:
-                await self.db.conn.rollback()
-                yield event.plain_result(f"未知的物品类型：{item_type}")
-                return
-
-            player.gold -= total_price
-            await self.db.update_player(player)
-            await self.db.conn.commit()
-            
-            result_lines.append(f"花费灵石: {total_price}，剩余: {player.gold}")
-            result_lines.append(f"剩余库存: {remaining}" if remaining > 0 else "该物品已售罄！")
-            yield event.plain_result("\n".join(result_lines))
+                    failure_msg = f"未知的物品类型：{item_type}"
+                    raise TransactionRollback()
+
+                player.gold -= total_price
+                await self.db.update_player(player, durable=True)
         except Exception as e:
-            await self.db.conn.rollback()
             logger.error(f"购买异常: {e}")
             raise
 
+        if failure_msg:
+            yield event.plain_result(failure_msg)
+            return
+
+        result_lines.append(f"花费灵石: {total_price}，剩余: {player.gold}")
+        result_lines.append(f"剩余库存: {remaining}" if remaining > 0 else "该物品已售罄！")
+        yield event.plain_result("\n".join(result_lines))
+
     def _get_acquire_hint(self, item_type: str) -> str:
         """根据类型返回获取提示"""
         return self.ITEM_ACQUIRE_HINTS.get(item_type, "商店刷新或活动奖励")
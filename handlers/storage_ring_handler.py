@@ -6,7 +6,7 @@ from ..data import DataBase
 from ..core import StorageRingManager
 from ..config_manager import ConfigManager
 from ..models import Player
-from .utils import player_required
+from .utils import lock_players, player_required
 
 CMD_STORAGE_RING = "储物戒"
 CMD_STORE_ITEM = "存入"
@@ -48,7 +48,7 @@ class StorageRingHandler:
         display_name = event.get_sender_name()
 
         # 获取储物戒信息
-        ring_info = self.storage_ring_manager.get_storage_ring_info(player)
+        ring_info = await self.storage_ring_manager.get_storage_ring_info(player)
 
         lines = [
             f"=== {display_name} 的储物戒 ===\n",
@@ -74,7 +74,7 @@ class StorageRingHandler:
             lines.append("【存储物品】空\n")
 
         # 空间警告
-        warning = self.storage_ring_manager.get_space_warning(player)
+        warning = self.storage_ring_manager.format_space_warning(ring_info["used"], ring_info["capacity"])
         if warning:
             lines.append(f"\n{warning}\n")
 
@@ -235,40 +235,44 @@ class StorageRingHandler:
             yield event.plain_result("数量必须大于0")
             return
 
-        # 检查物品是否在储物戒中
-        if not self.storage_ring_manager.has_item(player, item_name, count):
-            current = self.storage_ring_manager.get_item_count(player, item_name)
-            if current == 0:
-                yield event.plain_result(f"储物戒中没有【{item_name}】")
-            else:
-                yield event.plain_result(f"储物戒中【{item_name}】数量不足（当前：{current}个）")
-            return
-
-        target_player = await self.db.get_player_by_id(target_id)
-        if not target_player:
-            yield event.plain_result(f"目标玩家（QQ:{target_id}）尚未开始修仙")
-            return
-
-        if target_id == player.user_id:
-            yield event.plain_result("不能赠予物品给自己")
-            return
-
-        # 先从储物戒中取出物品
-        success, _ = await self.storage_ring_manager.retrieve_item(player, item_name, count)
-        if not success:
-            yield event.plain_result("赠予失败：无法取出物品")
-            return
-
-        # 存储待处理的赠予请求到数据库
-        sender_name = event.get_sender_name()
-        await self.db.ext.create_pending_gift(
-            receiver_id=target_id,
-            sender_id=player.user_id,
-            sender_name=sender_name,
-            item_name=item_name,
-            count=count,
-            expires_hours=24  # 24小时后过期
-        )
+        # 锁定赠予双方，避免与双方的其他指令交错
+        async with lock_players(self.db, player, target_id) as player:
+            if not player:
+                return
+            # 检查物品是否在储物戒中
+            current = await self.storage_ring_manager.get_item_count(player, item_name)
+            if current < count:
+                if current == 0:
+                    yield event.plain_result(f"储物戒中没有【{item_name}】")
+                else:
+                    yield event.plain_result(f"储物戒中【{item_name}】数量不足（当前：{current}个）")
+                return
+
+            target_player = await self.db.get_player_by_id(target_id)
+            if not target_player:
+                yield event.plain_result(f"目标玩家（QQ:{target_id}）尚未开始修仙")
+                return
+
+            if target_id == player.user_id:
+                yield event.plain_result("不能赠予物品给自己")
+                return
+
+            # 先从储物戒中取出物品
+            success, _ = await self.storage_ring_manager.retrieve_item(player, item_name, count)
+            if not success:
+                yield event.plain_result("赠予失败：无法取出物品")
+                return
+
+            # 存储待处理的赠予请求到数据库
+            sender_name = event.get_sender_name()
+            await self.db.ext.create_pending_gift(
+                receiver_id=target_id,
+                sender_id=player.user_id,
+                sender_name=sender_name,
+                item_name=item_name,
+                count=count,
+                expires_hours=24  # 24小时后过期
+            )
 
         yield event.plain_result(
             f"📦 赠予请求已发送！\n"
@@ -446,7 +450,7 @@ class StorageRingHandler:
             return
 
         keyword = keyword.strip().lower()
-        items = player.get_storage_ring_items()
+        items = await self.storage_ring_manager.get_items(player)
         
         # 模糊搜索
         matched = []
@@ -496,7 +500,7 @@ class StorageRingHandler:
             yield event.plain_result(f"未知分类：{category}\n可用分类：材料、装备、功法、其他")
             return
         
-        items = player.get_storage_ring_items()
+        items = await self.storage_ring_manager.get_items(player)
         categorized = self._categorize_items(items)
         cat_items = categorized.get(category, [])
         
@@ -2,12 +2,14 @@
 # 通用工具函数和装饰器
 
 import time
+from contextlib import asynccontextmanager
 from functools import wraps
 from typing import Callable, Coroutine, AsyncGenerator
 
 from astrbot.api.event import AstrMessageEvent
 from ..models import Player
 from ..models_extended import UserStatus
+from ..utils import KeyedLocks
 
 # 指令常量
 CMD_START_XIUXIAN = "我要修仙"
@@ -16,6 +18,10 @@ CMD_START_CULTIVATION = "闭关"
 CMD_END_CULTIVATION = "出关"
 CMD_CHECK_IN = "签到"
 
+# 按用户ID加锁：player_required 锁定发起者，涉及两名玩家的指令（决斗、双修、赠予、传承挑战）
+# 通过 user_locks.hold(发起者, 目标) 同时锁定双方
+user_locks = KeyedLocks()
+
 # 忙碌状态下允许执行的命令白名单
 BUSY_STATE_ALLOWED_COMMANDS = [
     # 基础信息查看
@@ -44,6 +50,7 @@ BUSY_STATE_ALLOWED_COMMANDS = [
     "灵石榜",
     "宗门榜",
     "存款榜",
+    "我的排名",
     # 帮助信息
     "修仙帮助",
     # 闭关相关
@@ -61,9 +68,15 @@ def player_required(func: Callable[..., Coroutine[any, any, AsyncGenerator[any,
     一个装饰器，用于需要玩家登录才能执行的指令。
     它会自动检查玩家是否存在、状态是否空闲（特定指令除外），否则将玩家对象作为参数注入。
     同时检查贷款状态，如有贷款则显示还款提示。
+    指令执行期间持有该玩家的锁：同一玩家的指令串行执行（重复提交在内存中排队），不同玩家互不阻塞。
     """
     @wraps(func)
     async def wrapper(self, event: AstrMessageEvent, *args, **kwargs):
+        async with user_locks.hold(event.get_sender_id()):
+            async for result in run(self, event, *args, **kwargs):
+                yield result
+
+    async def run(self, event: AstrMessageEvent, *args, **kwargs):
         # self 是 Handler 类的实例 (e.g., PlayerHandler)
         player = await self.db.get_player_by_id(event.get_sender_id())
 
@@ -111,6 +124,19 @@ def player_required(func: Callable[..., Coroutine[any, any, AsyncGenerator[any,
     return wrapper
 
 
+@asynccontextmanager
+async def lock_players(db, player: Player, *other_ids: str):
+    """在 player_required 指令中同时锁定发起者和其他玩家（async with）
+
+    为保证加锁顺序可能临时释放发起者的锁，此时会重新读取发起者，产出最新的玩家对象（已被删除时为 None）。
+    """
+    others = [user_id for user_id in other_ids if user_id]
+    async with user_locks.hold(player.user_id, *others) as reacquired:
+        if reacquired:
+            player = await db.get_player_by_id(player.user_id)
+        yield player
+
+
 def _is_command_allowed(message_text: str, allowed_commands: list) -> bool:
     """检查命令是否在允许列表中"""
     for cmd in allowed_commands:
@@ -136,17 +162,14 @@ async def _check_loan_status(db, player: Player) -> dict:
         # 检查是否已逾期
         if now > due_at:
             # 使用事务保护，防止并发删除
-            await db.conn.execute("BEGIN IMMEDIATE")
-            try:
+            async with db.transaction():
                 # 重新检查贷款状态（可能已被其他请求处理）
                 loan = await db.ext.get_active_loan(player.user_id)
                 if not loan or loan["status"] != "active":
-                    await db.conn.rollback()
                     return None
                 
                 # 再次检查是否逾期
                 if now <= loan["due_at"]:
-                    await db.conn.rollback()
                     return None
                 
                 player_name = player.user_name or f"道友{player.user_id[:6]}"
@@ -163,8 +186,6 @@ async def _check_loan_status(db, player: Player) -> dict:
                     "逾期未还款，被银行追杀致死", now
                 )
                 
-                await db.conn.commit()
-                
                 loan_type_name = "突破贷款" if loan["loan_type"] == "breakthrough" else "普通贷款"
                 
                 return {
@@ -181,9 +202,6 @@ async def _check_loan_status(db, player: Player) -> dict:
                         f"若想重新修仙，请使用「我要修仙」命令"
                     )
                 }
-            except Exception:
-                await db.conn.rollback()
-                raise
         
         # 计算剩余时间
         remaining_seconds = due_at - now
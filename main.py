@@ -5,6 +5,8 @@ from astrbot.api import logger, AstrBotConfig
 from astrbot.api.star import Context, Star, StarTools
 from astrbot.api.event import AstrMessageEvent, filter
 from .data import DataBase, MigrationManager
+from .data.backup import DatabaseBackup
+from .data.query_audit import audit_database
 from .config_manager import ConfigManager
 from .handlers import (
     MiscHandler, PlayerHandler, EquipmentHandler, BreakthroughHandler, 
@@ -81,6 +83,10 @@ CMD_BOSS_INFO = "世界Boss"
 CMD_BOSS_FIGHT = "挑战Boss"
 CMD_SPAWN_BOSS = "生成Boss"
 
+# 管理员指令
+CMD_DB_AUDIT = "索引审计"
+CMD_DB_BACKUP = "备份数据库"
+
 # 排行榜指令
 CMD_RANK_LEVEL = "境界排行"
 CMD_RANK_POWER = "战力排行"
@@ -88,6 +94,7 @@ CMD_RANK_WEALTH = "灵石排行"
 CMD_RANK_SECT = "宗门排行"
 CMD_RANK_DEPOSIT = "存款排行"
 CMD_RANK_CONTRIBUTION = "贡献排行"
+CMD_MY_RANK = "我的排名"
 
 # 战斗指令
 CMD_DUEL = "决斗"
@@ -176,7 +183,8 @@ class XiuXianPlugin(Star):
         plugin_data_path = StarTools.get_data_dir("astrbot_plugin_monixiuxian2")
         plugin_data_path.mkdir(parents=True, exist_ok=True)
         db_path = plugin_data_path / db_filename
-        self.db = DataBase(str(db_path))
+        self.db = DataBase(str(db_path), self.config.get("DATABASE", {}))
+        self.backup = DatabaseBackup(self.db, plugin_data_path / "backups", self.config.get("BACKUP", {}))
 
         self.misc_handler = MiscHandler(self.db)
         self.player_handler = PlayerHandler(self.db, self.config, self.config_manager)
@@ -234,6 +242,8 @@ class XiuXianPlugin(Star):
         self.loan_check_task = None # 贷款逾期检查任务
         self.spirit_eye_task = None # 灵眼生成任务
         self.bounty_check_task = None  # 悬赏过期检查任务
+        self.backup_task = None  # 数据库定时备份任务
+        self.combat_stats_task = None  # 战力回填任务
 
         access_control_config = self.config.get("ACCESS_CONTROL", {})
         self.whitelist_groups = [str(g) for g in access_control_config.get("WHITELIST_GROUPS", [])]
@@ -279,15 +289,26 @@ class XiuXianPlugin(Star):
         await self.db.connect()
         migration_manager = MigrationManager(self.db.conn, self.config_manager)
         await migration_manager.migrate()
-        
-        # 确保系统配置表存在
-        await self.db.ext.ensure_system_config_table()
+        await self.db.load_leaderboards()
+
+        # 写入玩家时按装备重算战力；首次升级或物品配置变化后在后台为全部玩家回填
+        from .core import EquipmentManager
+        equipment_mgr = EquipmentManager(self.db, self.config_manager)
+        self.db.set_equipment_resolver(
+            lambda player: equipment_mgr.get_equipped_items(
+                player, self.config_manager.items_data, self.config_manager.weapons_data
+            ),
+            self.config_manager.get_equipment_signature()
+        )
+        self.combat_stats_task = asyncio.create_task(self._backfill_combat_stats())
         
         # 启动定时任务
         self.boss_task = asyncio.create_task(self._schedule_boss_spawn())
         self.loan_check_task = asyncio.create_task(self._schedule_loan_check())
         self.spirit_eye_task = asyncio.create_task(self._schedule_spirit_eye_spawn())
         self.bounty_check_task = asyncio.create_task(self._schedule_bounty_check())
+        if self.backup.enabled:
+            self.backup_task = asyncio.create_task(self._schedule_backup())
         
         logger.info("【修仙插件】已加载。")
 
@@ -300,6 +321,12 @@ class XiuXianPlugin(Star):
             self.spirit_eye_task.cancel()
         if self.bounty_check_task:
             self.bounty_check_task.cancel()
+        if self.backup_task:
+            self.backup_task.cancel()
+        if self.combat_stats_task:
+            self.combat_stats_task.cancel()
+        # 正在进行的备份（含管理员手动触发的）在下一步停止，不再读取即将关闭的数据库
+        self.backup.cancel()
         await self.db.close()
         logger.info("【修仙插件】已卸载。")
         
@@ -316,18 +343,17 @@ class XiuXianPlugin(Star):
                 interval = self.config_manager.boss_config.get("spawn_interval", 3600)
                 
                 # 检查是否有存储的下次刷新时间
-                next_spawn_str = await self.db.ext.get_system_config("boss_next_spawn_time")
+                next_spawn_time = await self.db.ext.system_config.get_int("boss_next_spawn_time")
                 current_time = int(time.time())
                 
-                if next_spawn_str:
-                    next_spawn_time = int(next_spawn_str)
+                if next_spawn_time:
                     remaining = next_spawn_time - current_time
                     if remaining > 0:
                         logger.info(f"【修仙插件】Boss将在 {remaining} 秒后刷新")
                         await asyncio.sleep(remaining)
                 else:
                     next_spawn_time = current_time + interval
-                    await self.db.ext.set_system_config("boss_next_spawn_time", str(next_spawn_time))
+                    await self.db.ext.system_config.set_int("boss_next_spawn_time", next_spawn_time)
                     await asyncio.sleep(interval)
                 
                 # 尝试生成Boss
@@ -339,7 +365,7 @@ class XiuXianPlugin(Star):
                 
                 # 设置下次刷新时间
                 next_spawn_time = int(time.time()) + interval
-                await self.db.ext.set_system_config("boss_next_spawn_time", str(next_spawn_time))
+                await self.db.ext.system_config.set_int("boss_next_spawn_time", next_spawn_time)
                 
                 # 成功后重置重试计数
                 retry_count = 0
@@ -511,18 +537,17 @@ class XiuXianPlugin(Star):
                 spawn_interval = 7200
                 
                 # 检查是否有存储的下次刷新时间
-                next_spawn_str = await self.db.ext.get_system_config("spirit_eye_next_spawn_time")
+                next_spawn_time = await self.db.ext.system_config.get_int("spirit_eye_next_spawn_time")
                 current_time = int(time.time())
                 
-                if next_spawn_str:
-                    next_spawn_time = int(next_spawn_str)
+                if next_spawn_time:
                     remaining = next_spawn_time - current_time
                     if remaining > 0:
                         logger.info(f"【修仙插件】灵眼将在 {remaining} 秒后刷新")
                         await asyncio.sleep(remaining)
                 else:
                     next_spawn_time = current_time + spawn_interval
-                    await self.db.ext.set_system_config("spirit_eye_next_spawn_time", str(next_spawn_time))
+                    await self.db.ext.system_config.set_int("spirit_eye_next_spawn_time", next_spawn_time)
                     await asyncio.sleep(spawn_interval)
                 
                 # 生成灵眼
@@ -533,7 +558,7 @@ class XiuXianPlugin(Star):
                 
                 # 设置下次刷新时间
                 next_spawn_time = int(time.time()) + spawn_interval
-                await self.db.ext.set_system_config("spirit_eye_next_spawn_time", str(next_spawn_time))
+                await self.db.ext.system_config.set_int("spirit_eye_next_spawn_time", next_spawn_time)
                 
                 # 成功后重置重试计数
                 retry_count = 0
@@ -562,6 +587,52 @@ class XiuXianPlugin(Star):
                 logger.error(f"悬赏检查任务异常: {e}")
                 await asyncio.sleep(60)
 
+    async def _backfill_combat_stats(self):
+        """后台回填玩家战力（失败时下次启动重试）"""
+        try:
+            await self.db.backfill_combat_stats()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"【修仙插件】战力回填失败: {e}")
+
+    async def _schedule_backup(self):
+        """数据库定时备份任务（支持持久化和指数退避）"""
+        import time
+        
+        retry_count = 0
+        max_retry_delay = 3600
+        
+        while True:
+            try:
+                await self.db.ensure_connection()
+                interval = max(60, int(self.backup.interval))
+                
+                # 重启后按上次记录的时间继续，不会每次加载插件都立即备份
+                next_backup_time = await self.db.ext.system_config.get_int("backup_next_time")
+                current_time = int(time.time())
+                if not next_backup_time:
+                    next_backup_time = current_time + interval
+                    await self.db.ext.system_config.set_int("backup_next_time", next_backup_time)
+                remaining = next_backup_time - current_time
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                
+                if not self.backup.running:
+                    await self.backup.run()
+                
+                await self.db.ext.system_config.set_int("backup_next_time", int(time.time()) + interval)
+                retry_count = 0
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"数据库备份任务异常: {e}")
+                retry_count += 1
+                delay = min(60 * (2 ** retry_count), max_retry_delay)
+                logger.info(f"【修仙插件】备份任务将在 {delay} 秒后重试（第{retry_count}次）")
+                await asyncio.sleep(delay)
+
     async def _broadcast_spirit_eye_spawn(self, msg: str):
         """广播灵眼刷新消息"""
         from astrbot.api.event import MessageChain
@@ -880,36 +951,71 @@ class XiuXianPlugin(Star):
         if success and boss:
             await self._broadcast_boss_spawn(boss)
 
+    @filter.command(CMD_DB_AUDIT, "审计SQL查询计划中的全表扫描(管理员)")
+    @require_whitelist
+    async def handle_db_audit(self, event: AstrMessageEvent):
+        if not self._check_boss_admin(event):
+            yield event.plain_result("❌ 你没有权限执行索引审计！此指令仅限管理员使用。")
+            return
+        
+        # EXPLAIN QUERY PLAN 走独立的只读连接，放到线程中执行，不占用事件循环
+        report = await asyncio.to_thread(audit_database, self.db.db_path)
+        yield event.plain_result(f"🔍 索引审计\n━━━━━━━━━━━━━━━\n{report.format(limit=10)}")
+
+    @filter.command(CMD_DB_BACKUP, "立即在线备份数据库(管理员)")
+    @require_whitelist
+    async def handle_db_backup(self, event: AstrMessageEvent):
+        if not self._check_boss_admin(event):
+            yield event.plain_result("❌ 你没有权限备份数据库！此指令仅限管理员使用。")
+            return
+        if self.backup.running:
+            yield event.plain_result("⏳ 已有备份正在进行，请稍后再试。")
+            return
+        
+        try:
+            result = await self.backup.run()
+        except Exception as e:
+            logger.error(f"数据库备份失败: {e}")
+            yield event.plain_result(f"❌ 备份失败：{e}")
+            return
+        yield event.plain_result(
+            f"💾 数据库备份完成\n━━━━━━━━━━━━━━━\n"
+            f"文件：{result.path.name}\n"
+            f"大小：{result.size / 1048576:.2f} MB（{result.pages} 页）\n"
+            f"耗时：{result.duration:.2f} 秒\n"
+            f"已清理旧备份：{result.removed} 个"
+        )
+
     # ===== 排行榜指令 =====
 
     @filter.command(CMD_RANK_LEVEL, "查看境界排行榜")
     @require_whitelist
-    async def handle_rank_level(self, event: AstrMessageEvent):
-        async for r in self.ranking_handlers.handle_rank_level(event):
+    async def handle_rank_level(self, event: AstrMessageEvent, page: str = ""):
+        async for r in self.ranking_handlers.handle_rank_level(event, page):
             yield r
 
     @filter.command(CMD_RANK_POWER, "查看战力排行榜")
     @require_whitelist
-    async def handle_rank_power(self, event: AstrMessageEvent):
-        async for r in self.ranking_handlers.handle_rank_power(event):
+    async def handle_rank_power(self, event: AstrMessageEvent, page: str = ""):
+        async for r in self.ranking_handlers.handle_rank_power(event, page):
             yield r
 
     @filter.command(CMD_RANK_WEALTH, "查看财富排行榜")
     @require_whitelist
-    async def handle_rank_wealth(self, event: AstrMessageEvent):
-        async for r in self.ranking_handlers.handle_rank_wealth(event):
+    async def handle_rank_wealth(self, event: AstrMessageEvent, page: str = ""):
+        async for r in self.ranking_handlers.handle_rank_wealth(event, page):
             yield r
 
     @filter.command(CMD_RANK_SECT, "查看宗门排行榜")
     @require_whitelist
-    async def handle_rank_sect(self, event: AstrMessageEvent):
-        async for r in self.ranking_handlers.handle_rank_sect(event):
+    async def handle_rank_sect(self, event: AstrMessageEvent, page: str = ""):
+        async for r in self.ranking_handlers.handle_rank_sect(event, page):
             yield r
 
     @filter.command(CMD_RANK_DEPOSIT, "查看存款排行榜")
     @require_whitelist
-    async def handle_rank_deposit(self, event: AstrMessageEvent):
-        async for r in self.ranking_handlers.handle_rank_deposit(event):
+    async def handle_rank_deposit(self, event: AstrMessageEvent, page: str = ""):
+        async for r in self.ranking_handlers.handle_rank_deposit(event, page):
             yield r
 
     @filter.command(CMD_RANK_CONTRIBUTION, "查看宗门贡献排行榜")
@@ -918,6 +1024,12 @@ class XiuXianPlugin(Star):
         async for r in self.ranking_handlers.handle_rank_sect_contribution(event):
             yield r
 
+    @filter.command(CMD_MY_RANK, "查看我在各排行榜的名次")
+    @require_whitelist
+    async def handle_my_rank(self, event: AstrMessageEvent, board_name: str = ""):
+        async for r in self.ranking_handlers.handle_my_rank(event, board_name):
+            yield r
+
     # ===== 战斗指令 =====
 
     @filter.command(CMD_DUEL, "与其他玩家决斗(消耗气血)")
@@ -197,7 +197,7 @@ class AlchemyManager:
             for material_name, required_count in materials.items():
                 if material_name == "灵石":
                     continue
-                current_count = self.storage_ring_manager.get_item_count(player, material_name)
+                current_count = await self.storage_ring_manager.get_item_count(player, material_name)
                 if current_count < required_count:
                     missing_materials.append(f"{material_name}（需要{required_count}，拥有{current_count}）")
         else:
@@ -208,22 +208,15 @@ class AlchemyManager:
             return False, f"❌ 材料不足！\n" + "\n".join(f"  · {m}" for m in missing_materials), None
         
         # 5. 扣除所有材料
-        player.gold -= required_gold
-        
-        # 扣除储物戒中的材料
+        # 扣除储物戒中的材料（原子操作，检查后被其他操作取走时整体失败）
         consumed_materials = []
         if self.storage_ring_manager:
-            items = player.get_storage_ring_items()
-            for material_name, required_count in materials.items():
-                if material_name == "灵石":
-                    continue
-                if material_name in items and items[material_name] >= required_count:
-                    if items[material_name] == required_count:
-                        del items[material_name]
-                    else:
-                        items[material_name] -= required_count
-                    consumed_materials.append(f"{material_name}×{required_count}")
-            player.set_storage_ring_items(items)
+            ring_materials = {name: count for name, count in materials.items() if name != "灵石"}
+            if not await self.storage_ring_manager.consume_items(player, ring_materials):
+                return False, "❌ 材料不足！", None
+            consumed_materials = [f"{name}×{count}" for name, count in ring_materials.items()]
+
+        player.gold -= required_gold
         
         # 6. 判断成功率
         success_rate = recipe["success_rate"]
@@ -239,9 +232,7 @@ class AlchemyManager:
             pill_name = recipe["name"]
             
             # 将丹药存入丹药背包
-            inventory = player.get_pills_inventory()
-            inventory[pill_name] = inventory.get(pill_name, 0) + 1
-            player.set_pills_inventory(inventory)
+            await self.db.ext.add_player_pill(player.user_id, pill_name, 1)
             
             await self.db.update_player(player)
             
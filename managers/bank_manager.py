@@ -92,22 +92,19 @@ class BankManager:
         if amount <= 0:
             return False, "存款金额必须大于0。"
         
-        await self.db.conn.execute("BEGIN IMMEDIATE")
-        try:
+        async with self.db.transaction():
             player = await self.db.get_player_by_id(player.user_id)
             if player.gold < amount:
-                await self.db.conn.rollback()
                 return False, f"灵石不足！你只有 {player.gold:,} 灵石。"
             
             bank_data = await self.db.ext.get_bank_account(player.user_id)
             current_balance = bank_data["balance"] if bank_data else 0
             
             if current_balance + amount > self.max_deposit:
-                await self.db.conn.rollback()
                 return False, f"存款上限为 {self.max_deposit:,} 灵石，当前余额 {current_balance:,}。"
             
             player.gold -= amount
-            await self.db.update_player(player)
+            await self.db.update_player(player, durable=True)
             
             new_balance = current_balance + amount
             now = int(time.time())
@@ -119,23 +116,17 @@ class BankManager:
             
             await self._add_transaction(player.user_id, "deposit", amount, new_balance, "存入灵石")
             
-            await self.db.conn.commit()
             return True, f"成功存入 {amount:,} 灵石！\n当前余额：{new_balance:,} 灵石"
-        except Exception as e:
-            await self.db.conn.rollback()
-            raise
     
     async def withdraw(self, player: Player, amount: int) -> Tuple[bool, str]:
         """取出灵石"""
         if amount <= 0:
             return False, "取款金额必须大于0。"
         
-        await self.db.conn.execute("BEGIN IMMEDIATE")
-        try:
+        async with self.db.transaction():
             player = await self.db.get_player_by_id(player.user_id)
             bank_data = await self.db.ext.get_bank_account(player.user_id)
             if not bank_data or bank_data["balance"] < amount:
-                await self.db.conn.rollback()
                 current = bank_data["balance"] if bank_data else 0
                 return False, f"余额不足！当前余额：{current:,} 灵石。"
             
@@ -147,37 +138,34 @@ class BankManager:
             )
             
             player.gold += amount
-            await self.db.update_player(player)
+            await self.db.update_player(player, durable=True)
             
             await self._add_transaction(player.user_id, "withdraw", -amount, new_balance, "取出灵石")
             
-            await self.db.conn.commit()
             return True, f"成功取出 {amount:,} 灵石！\n当前余额：{new_balance:,} 灵石\n当前持有：{player.gold:,} 灵石"
-        except Exception as e:
-            await self.db.conn.rollback()
-            raise
     
     async def claim_interest(self, player: Player) -> Tuple[bool, str]:
         """领取利息"""
-        bank_data = await self.db.ext.get_bank_account(player.user_id)
-        if not bank_data or bank_data["balance"] <= 0:
-            return False, "你还没有存款，无法领取利息。"
-        
-        interest = self._calculate_interest(
-            bank_data["balance"], 
-            bank_data["last_interest_time"]
-        )
-        
-        if interest <= 0:
-            return False, "利息不足1灵石，请明日再来。"
-        
-        # 利息转入本金
-        new_balance = bank_data["balance"] + interest
-        now = int(time.time())
-        await self.db.ext.update_bank_account(player.user_id, new_balance, now)
-        
-        # 记录流水
-        await self._add_transaction(player.user_id, "interest", interest, new_balance, "领取利息")
+        async with self.db.transaction():
+            bank_data = await self.db.ext.get_bank_account(player.user_id)
+            if not bank_data or bank_data["balance"] <= 0:
+                return False, "你还没有存款，无法领取利息。"
+            
+            interest = self._calculate_interest(
+                bank_data["balance"], 
+                bank_data["last_interest_time"]
+            )
+            
+            if interest <= 0:
+                return False, "利息不足1灵石，请明日再来。"
+            
+            # 利息转入本金
+            new_balance = bank_data["balance"] + interest
+            now = int(time.time())
+            await self.db.ext.update_bank_account(player.user_id, new_balance, now)
+            
+            # 记录流水
+            await self._add_transaction(player.user_id, "interest", interest, new_balance, "领取利息")
         
         return True, f"成功领取利息 {interest:,} 灵石！\n当前余额：{new_balance:,} 灵石"
     
@@ -222,12 +210,10 @@ class BankManager:
         if amount > self.max_loan_amount:
             return False, f"最大贷款金额为 {self.max_loan_amount:,} 灵石。"
         
-        await self.db.conn.execute("BEGIN IMMEDIATE")
-        try:
+        async with self.db.transaction():
             player = await self.db.get_player_by_id(player.user_id)
             existing_loan = await self.db.ext.get_active_loan(player.user_id)
             if existing_loan:
-                await self.db.conn.rollback()
                 return False, "你已有未还清的贷款，请先还款后再申请新贷款。"
             
             if loan_type == "breakthrough":
@@ -247,7 +233,7 @@ class BankManager:
             )
             
             player.gold += amount
-            await self.db.update_player(player)
+            await self.db.update_player(player, durable=True)
             
             bank_data = await self.db.ext.get_bank_account(player.user_id)
             balance = bank_data["balance"] if bank_data else 0
@@ -256,7 +242,6 @@ class BankManager:
             total_interest = int(amount * interest_rate * duration_days)
             total_due = amount + total_interest
             
-            await self.db.conn.commit()
             return True, (
                 f"💰 {type_name}成功！\n"
                 f"━━━━━━━━━━━━━━━\n"
@@ -268,24 +253,18 @@ class BankManager:
                 f"当前持有：{player.gold:,} 灵石\n"
                 f"💀 逾期将被银行追杀致死！"
             )
-        except Exception as e:
-            await self.db.conn.rollback()
-            raise
     
     async def repay(self, player: Player) -> Tuple[bool, str]:
         """还款"""
-        await self.db.conn.execute("BEGIN IMMEDIATE")
-        try:
+        async with self.db.transaction():
             player = await self.db.get_player_by_id(player.user_id)
             loan_info = await self.get_loan_info(player)
             if not loan_info:
-                await self.db.conn.rollback()
                 return False, "你当前没有需要偿还的贷款。"
             
             total_due = loan_info["total_due"]
             
             if player.gold < total_due:
-                await self.db.conn.rollback()
                 return False, (
                     f"灵石不足！\n"
                     f"应还金额：{total_due:,} 灵石\n"
@@ -295,7 +274,7 @@ class BankManager:
                 )
             
             player.gold -= total_due
-            await self.db.update_player(player)
+            await self.db.update_player(player, durable=True)
             
             await self.db.ext.close_loan(loan_info["id"])
             
@@ -308,7 +287,6 @@ class BankManager:
             
             loan_type_name = "突破贷款" if loan_info["loan_type"] == "breakthrough" else "普通贷款"
             
-            await self.db.conn.commit()
             return True, (
                 f"✅ 还款成功！\n"
                 f"━━━━━━━━━━━━━━━\n"
@@ -319,9 +297,6 @@ class BankManager:
                 f"━━━━━━━━━━━━━━━\n"
                 f"当前持有：{player.gold:,} 灵石"
             )
-        except Exception as e:
-            await self.db.conn.rollback()
-            raise
     
     async def check_and_process_overdue_loans(self) -> List[dict]:
         """检查并处理逾期贷款 - 逾期玩家将被银行追杀致死
@@ -331,34 +306,39 @@ class BankManager:
         """
         now = int(time.time())
         overdue_loans = await self.db.ext.get_overdue_loans(now)
+        if not overdue_loans:
+            return []
         processed = []
         
-        for loan in overdue_loans:
-            player = await self.db.get_player_by_id(loan["user_id"])
-            if not player:
-                # 玩家已不存在，直接关闭贷款
-                await self.db.ext.mark_loan_overdue(loan["id"])
-                continue
-            
-            player_name = player.user_name or f"道友{player.user_id[:6]}"
+        # 所有逾期贷款在一个事务内处理，逾期玩家一次批量删除；定时任务走低优先级通道
+        async with self.db.transaction(background=True):
+            # 玩家已不存在时只关闭贷款
+            victims = await self.db.get_players_by_ids(loan["user_id"] for loan in overdue_loans)
+            victim_ids = list(victims)
             
             # 删除玩家数据（银行追杀致死）- 级联删除所有关联数据
-            await self.db.delete_player_cascade(player.user_id)
-            
-            # 标记贷款逾期
-            await self.db.ext.mark_loan_overdue(loan["id"])
+            await self.db.delete_players_cascade(victim_ids)
             
-            # 记录流水
-            await self._add_transaction(
-                loan["user_id"], "bank_kill", 0, 0,
-                f"逾期未还款，被银行追杀致死"
-            )
-            
-            processed.append({
-                **loan,
-                "player_name": player_name,
-                "death": True
-            })
+            killed = set()
+            for loan in overdue_loans:
+                # 标记贷款逾期
+                await self.db.ext.mark_loan_overdue(loan["id"])
+                
+                player = victims.get(loan["user_id"])
+                if not player or player.user_id in killed:
+                    continue
+                killed.add(player.user_id)
+                
+                # 记录流水
+                await self._add_transaction(
+                    loan["user_id"], "bank_kill", 0, 0,
+                    f"逾期未还款，被银行追杀致死"
+                )
+                processed.append({
+                    **loan,
+                    "player_name": player.user_name or f"道友{player.user_id[:6]}",
+                    "death": True
+                })
         
         return processed
     
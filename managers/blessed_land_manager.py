@@ -55,21 +55,21 @@ class BlessedLandManager:
         if player.gold < price:
             return False, f"❌ 灵石不足！购买{land_config['name']}需要 {price:,} 灵石。"
         
-        # 扣除灵石
-        player.gold -= price
-        await self.db.update_player(player)
-        
-        # 创建洞天
-        await self.db.conn.execute(
-            """
-            INSERT INTO blessed_lands (user_id, land_type, land_name, level, exp_bonus, 
-                                       gold_per_hour, last_collect_time)
-            VALUES (?, ?, ?, 1, ?, ?, ?)
-            """,
-            (player.user_id, land_type, land_config["name"], land_config["exp_bonus"],
-             land_config["gold_per_hour"], int(time.time()))
-        )
-        await self.db.conn.commit()
+        async with self.db.transaction():
+            # 扣除灵石
+            player.gold -= price
+            await self.db.update_player(player)
+            
+            # 创建洞天
+            await self.db.conn.execute(
+                """
+                INSERT INTO blessed_lands (user_id, land_type, land_name, level, exp_bonus, 
+                                           gold_per_hour, last_collect_time)
+                VALUES (?, ?, ?, 1, ?, ?, ?)
+                """,
+                (player.user_id, land_type, land_config["name"], land_config["exp_bonus"],
+                 land_config["gold_per_hour"], int(time.time()))
+            )
         
         return True, (
             f"✨ 恭喜获得【{land_config['name']}】！\n"
@@ -113,17 +113,17 @@ class BlessedLandManager:
         new_exp_bonus = config["exp_bonus"] * (1 + new_level * 0.1)
         new_gold_per_hour = int(config["gold_per_hour"] * (1 + new_level * 0.15))
         
-        player.gold -= upgrade_cost
-        await self.db.update_player(player)
-        
-        await self.db.conn.execute(
-            """
-            UPDATE blessed_lands SET level = ?, exp_bonus = ?, gold_per_hour = ?
-            WHERE user_id = ?
-            """,
-            (new_level, new_exp_bonus, new_gold_per_hour, player.user_id)
-        )
-        await self.db.conn.commit()
+        async with self.db.transaction():
+            player.gold -= upgrade_cost
+            await self.db.update_player(player)
+            
+            await self.db.conn.execute(
+                """
+                UPDATE blessed_lands SET level = ?, exp_bonus = ?, gold_per_hour = ?
+                WHERE user_id = ?
+                """,
+                (new_level, new_exp_bonus, new_gold_per_hour, player.user_id)
+            )
         
         return True, (
             f"🎉 {land['land_name']}升级到 Lv.{new_level}！\n"
@@ -159,15 +159,15 @@ class BlessedLandManager:
         exp_income = int(player.experience * land["exp_bonus"] * hours * 0.01)
         exp_income = min(exp_income, max_exp_per_hour * hours)
         
-        player.gold += gold_income
-        player.experience += exp_income
-        await self.db.update_player(player)
-        
-        await self.db.conn.execute(
-            "UPDATE blessed_lands SET last_collect_time = ? WHERE user_id = ?",
-            (now, player.user_id)
-        )
-        await self.db.conn.commit()
+        async with self.db.transaction():
+            player.gold += gold_income
+            player.experience += exp_income
+            await self.db.update_player(player)
+            
+            await self.db.conn.execute(
+                "UPDATE blessed_lands SET last_collect_time = ? WHERE user_id = ?",
+                (now, player.user_id)
+            )
         
         return True, (
             f"✅ 洞天收取成功！\n"
@@ -212,28 +212,28 @@ class BlessedLandManager:
         if player.gold < advance_cost:
             return False, f"❌ 灵石不足！进阶需要 {advance_cost:,} 灵石。"
         
-        # 扣除灵石
-        player.gold -= advance_cost
-        await self.db.update_player(player)
-        
-        # 取消等级保留，每次进阶后从1级开始
-        initial_level = 1
-        
-        # 删除原洞天，创建新洞天
-        await self.db.conn.execute(
-            "DELETE FROM blessed_lands WHERE user_id = ?",
-            (player.user_id,)
-        )
-        await self.db.conn.execute(
-            """
-            INSERT INTO blessed_lands (user_id, land_type, land_name, level, exp_bonus, 
-                                       gold_per_hour, last_collect_time)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (player.user_id, target_type, target_config["name"], initial_level, 
-             target_config["exp_bonus"], target_config["gold_per_hour"], int(time.time()))
-        )
-        await self.db.conn.commit()
+        async with self.db.transaction():
+            # 扣除灵石
+            player.gold -= advance_cost
+            await self.db.update_player(player)
+            
+            # 取消等级保留，每次进阶后从1级开始
+            initial_level = 1
+            
+            # 删除原洞天，创建新洞天
+            await self.db.conn.execute(
+                "DELETE FROM blessed_lands WHERE user_id = ?",
+                (player.user_id,)
+            )
+            await self.db.conn.execute(
+                """
+                INSERT INTO blessed_lands (user_id, land_type, land_name, level, exp_bonus, 
+                                           gold_per_hour, last_collect_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (player.user_id, target_type, target_config["name"], initial_level, 
+                 target_config["exp_bonus"], target_config["gold_per_hour"], int(time.time()))
+            )
         
         return True, (
             f"✨ 恭喜进阶到【{target_config['name']}】！\n"
@@ -7,7 +7,7 @@ Boss系统管理器 - 处理Boss生成、战斗、奖励等逻辑
 import random
 import time
 from typing import Tuple, Dict, Optional, List, TYPE_CHECKING
-from ..data.data_manager import DataBase
+from ..data.data_manager import DataBase, PlayerVersionConflict
 from ..models_extended import Boss, UserStatus
 from ..models import Player
 from .combat_manager import CombatManager, CombatStats
@@ -266,30 +266,42 @@ ATK：{atk}
         winner = battle_result["winner"]
         reward = battle_result["reward"]
         
+        def apply_battle_result(fresh: Player):
+            # 以最新数据写入奖励与战后HP/MP，不覆盖战斗期间其他操作的修改
+            if reward > 0:
+                fresh.gold += reward
+            fresh.hp = battle_result["player_final_hp"]
+            fresh.mp = battle_result["player_final_mp"]
+        
+        # Boss状态、物品掉落与玩家奖励在同一事务中提交
+        item_msg = ""
+        try:
+            async with self.db.transaction():
+                if winner == user_id:
+                    boss.status = 0  # 标记Boss为已击败
+                    await self.db.ext.defeat_boss(boss.boss_id)
+                    
+                    # 物品掉落
+                    if self.storage_ring_manager:
+                        dropped_items = await self._roll_boss_drops(player, boss)
+                        item_lines = []
+                        for item_name, count in dropped_items:
+                            success, _ = await self.storage_ring_manager.store_item(player, item_name, count, silent=True)
+                            if success:
+                                item_lines.append(f"  · {item_name} x{count}")
+                            else:
+                                item_lines.append(f"  · {item_name} x{count}（储物戒已满，丢失）")
+                        if item_lines:
+                            item_msg = "\n\n📦 获得物品：\n" + "\n".join(item_lines)
+                else:
+                    boss.hp = battle_result["boss_final_hp"]
+                    await self.db.ext.update_boss(boss)
+                
+                await self.db.mutate_player(user_id, apply_battle_result)
+        except PlayerVersionConflict:
+            return False, "❌ 道友的数据正被其他操作修改，本次挑战未生效，请稍后再试！", None
+        
         if winner == user_id:
-            # 玩家胜利
-            boss.status = 0  # 标记Boss为已击败
-            await self.db.ext.defeat_boss(boss.boss_id)
-            
-            # 发放奖励
-            player.gold += reward
-            
-            # 物品掉落
-            item_msg = ""
-            dropped_items = []
-            if self.storage_ring_manager:
-                dropped_items = await self._roll_boss_drops(player, boss)
-                if dropped_items:
-                    item_lines = []
-                    for item_name, count in dropped_items:
-                        success, _ = await self.storage_ring_manager.store_item(player, item_name, count, silent=True)
-                        if success:
-                            item_lines.append(f"  · {item_name} x{count}")
-                        else:
-                            item_lines.append(f"  · {item_name} x{count}（储物戒已满，丢失）")
-                    if item_lines:
-                        item_msg = "\n\n📦 获得物品：\n" + "\n".join(item_lines)
-            
             result_msg = f"""
 🎉 挑战成功！
 ━━━━━━━━━━━━━━━
@@ -303,10 +315,7 @@ ATK：{atk}
 HP：{battle_result['player_final_hp']}/{player_stats.max_hp}
             """.strip()
         else:
-            # 玩家失败
-            boss.hp = battle_result["boss_final_hp"]
-            await self.db.ext.update_boss(boss)
-            
+            # 玩家失败（仍获得安慰奖）
             result_msg = f"""
 💀 挑战失败
 ━━━━━━━━━━━━━━━
@@ -318,25 +327,14 @@ HP：{battle_result['player_final_hp']}/{player_stats.max_hp}
 
 {boss.boss_name} 剩余HP：{boss.hp}/{boss.max_hp}
             """.strip()
-            
-            # 即使失败也给予部分奖励
-            if reward > 0:
-                player.gold += reward
-        
-        # 更新玩家HP/MP
-        player.hp = battle_result["player_final_hp"]
-        player.mp = battle_result["player_final_mp"]
-        await self.db.update_player(player)
         
         # 如果玩家失败（血量变成1），记录失败时间
-        if battle_result["winner"] != user_id and player.hp <= 1:
-            # 更新用户冷却时间记录到extra_data
-            import json
+        if winner != user_id and battle_result["player_final_hp"] <= 1:
+            # 更新用户冷却时间记录到extra_data（库内只修改这一个键）
             try:
-                extra_data = json.loads(user_cd.extra_data) if user_cd.extra_data else {}
-                extra_data['last_boss_defeat_time'] = int(time.time())
-                user_cd.extra_data = json.dumps(extra_data)
-                await self.db.ext.update_user_cd(user_cd)
+                await self.db.ext.json_set_field(
+                    "user_cd", "extra_data", user_id, "last_boss_defeat_time", int(time.time())
+                )
             except Exception:
                 # 如果更新失败，忽略错误
                 pass
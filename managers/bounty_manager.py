@@ -9,6 +9,7 @@ from typing import Tuple, List, Optional, Dict, TYPE_CHECKING
 
 from astrbot.api import logger
 
+from .. import codec
 from ..data import DataBase
 from ..models import Player
 
@@ -237,24 +238,20 @@ class BountyManager:
         now = int(time.time())
         time_limit = cached.get("time_limit", template.get("time_limit", 3600))
 
-        await self.db.conn.execute("BEGIN IMMEDIATE")
-        try:
+        async with self.db.transaction():
             active = await self.db.ext.get_active_bounty(player.user_id)
             if active:
-                await self.db.conn.rollback()
                 return False, f"你已有进行中的悬赏：{active['bounty_name']}，请先完成或放弃。"
 
             cd_key = f"bounty_abandon_cd_{player.user_id}"
-            cd_value = await self.db.ext.get_system_config(cd_key)
-            if cd_value:
-                cd_time = int(cd_value)
+            cd_time = await self.db.ext.system_config.get_int(cd_key)
+            if cd_time:
                 if now < cd_time:
-                    await self.db.conn.rollback()
                     remaining = (cd_time - now) // 60 or 1
                     return False, f"你刚放弃过悬赏，还需等待 {remaining} 分钟才能再次接取。"
 
             expire_time = now + time_limit
-            rewards_json = json.dumps({
+            rewards_json = codec.dumps({
                 "stone": cached["reward"]["stone"],
                 "exp": cached["reward"]["exp"],
                 "difficulty": diff_key,
@@ -262,7 +259,7 @@ class BountyManager:
                 "item_table": cached.get("item_table"),
                 "description": cached.get("description", ""),
                 "progress_tags": cached.get("progress_tags", [])
-            }, ensure_ascii=False)
+            })
 
             await self.db.conn.execute(
                 """
@@ -283,10 +280,6 @@ class BountyManager:
                     expire_time
                 )
             )
-            await self.db.conn.commit()
-        except Exception:
-            await self.db.conn.rollback()
-            raise
 
         return True, (
             f"🎯 接取悬赏成功！\n"
@@ -301,7 +294,7 @@ class BountyManager:
         if not active:
             return False, "你当前没有进行中的悬赏任务。\n使用 /悬赏令 查看可接取的任务。"
 
-        rewards = json.loads(active["rewards"])
+        rewards = codec.loads(active["rewards"])
         remaining = max(0, active["expire_time"] - int(time.time()))
         progress = active.get("current_progress", 0)
         target = active.get("target_count", 1)
@@ -322,11 +315,9 @@ class BountyManager:
         )
 
     async def complete_bounty(self, player: Player) -> Tuple[bool, str]:
-        await self.db.conn.execute("BEGIN IMMEDIATE")
-        try:
+        async with self.db.transaction():
             active = await self.db.ext.get_active_bounty(player.user_id)
             if not active:
-                await self.db.conn.rollback()
                 return False, "你当前没有进行中的悬赏任务。"
 
             if int(time.time()) > active["expire_time"]:
@@ -334,13 +325,11 @@ class BountyManager:
                     "UPDATE bounty_tasks SET status = 0 WHERE user_id = ? AND status = 1",
                     (player.user_id,)
                 )
-                await self.db.conn.commit()
                 return False, "悬赏任务已超时，自动取消。"
 
             progress = active.get("current_progress", 0)
             target = active.get("target_count", 1)
             if progress < target:
-                await self.db.conn.rollback()
                 return False, (
                     f"❌ 任务尚未完成！\n"
                     f"任务：{active['bounty_name']}\n"
@@ -349,7 +338,7 @@ class BountyManager:
                     f"💡 通过历练或秘境推进悬赏进度"
                 )
 
-            rewards = json.loads(active["rewards"])
+            rewards = codec.loads(active["rewards"])
             stone_reward = rewards.get("stone", 0)
             exp_reward = rewards.get("exp", 0)
 
@@ -361,19 +350,13 @@ class BountyManager:
             MAX_VALUE = 2**63 - 1
             player.gold = min(player.gold + stone_reward, MAX_VALUE)
             player.experience = min(player.experience + exp_reward, MAX_VALUE)
-            await self.db.conn.execute(
-                "UPDATE players SET gold = ?, experience = ? WHERE user_id = ?",
-                (player.gold, player.experience, player.user_id)
-            )
-            await self.db.conn.commit()
-        except Exception:
-            await self.db.conn.rollback()
-            raise
+            # 与任务状态在同一事务中落盘（经由数据层以同步玩家缓存）
+            await self.db.update_player(player, durable=True)
 
         item_msg = ""
         if self.storage_ring_manager:
             try:
-                rewards = json.loads(active["rewards"])
+                rewards = codec.loads(active["rewards"])
                 item_table = rewards.get("item_table") or active.get("target_type", "gather")
                 dropped_items = await self._roll_bounty_items(player, item_table)
                 if dropped_items:
@@ -389,7 +372,7 @@ class BountyManager:
             except Exception:
                 logger.warning("悬赏物品奖励发放异常", exc_info=True)
 
-        rewards = json.loads(active["rewards"])
+        rewards = codec.loads(active["rewards"])
         diff_name = rewards.get("difficulty_name", rewards.get("difficulty", "未知"))
         return True, (
             f"✅ 悬赏完成（{diff_name}）！\n"
@@ -400,13 +383,14 @@ class BountyManager:
         )
 
     async def abandon_bounty(self, player: Player) -> Tuple[bool, str]:
-        active = await self.db.ext.get_active_bounty(player.user_id)
-        if not active:
-            return False, "你当前没有进行中的悬赏任务。"
+        async with self.db.transaction():
+            active = await self.db.ext.get_active_bounty(player.user_id)
+            if not active:
+                return False, "你当前没有进行中的悬赏任务。"
 
-        await self.db.ext.cancel_bounty(player.user_id)
-        abandon_cooldown = int(time.time()) + 1800
-        await self.db.ext.set_system_config(f"bounty_abandon_cd_{player.user_id}", str(abandon_cooldown))
+            await self.db.ext.cancel_bounty(player.user_id)
+            abandon_cooldown = int(time.time()) + 1800
+            await self.db.ext.system_config.set_int(f"bounty_abandon_cd_{player.user_id}", abandon_cooldown)
         return True, f"已放弃悬赏：{active['bounty_name']}\n⚠️ 30分钟内无法接取新悬赏"
 
     # -------- 进度与奖励 --------
@@ -440,20 +424,17 @@ class BountyManager:
         if not activity_tag:
             return False, ""
 
-        await self.db.conn.execute("BEGIN IMMEDIATE")
-        try:
+        async with self.db.transaction():
             active = await self.db.ext.get_active_bounty(player.user_id)
             if not active:
-                await self.db.conn.rollback()
                 return False, ""
 
             if int(time.time()) > active["expire_time"]:
-                await self.db.conn.rollback()
                 return False, ""
 
             rewards_data = {}
             try:
-                rewards_data = json.loads(active["rewards"])
+                rewards_data = codec.loads(active["rewards"])
             except Exception:
                 rewards_data = {}
 
@@ -464,13 +445,11 @@ class BountyManager:
                 allowed_tags = [str(tag).lower() for tag in rewards_data.get("progress_tags", [])]
 
             if activity_tag not in allowed_tags:
-                await self.db.conn.rollback()
                 return False, ""
 
             progress = active.get("current_progress", 0)
             target = active.get("target_count", 1)
             if progress >= target:
-                await self.db.conn.rollback()
                 return False, ""
 
             new_progress = min(target, progress + count)
@@ -478,20 +457,19 @@ class BountyManager:
                 "UPDATE bounty_tasks SET current_progress = ? WHERE user_id = ? AND status = 1 AND current_progress = ?",
                 (new_progress, player.user_id, progress)
             )
-            await self.db.conn.commit()
 
             if new_progress >= target:
                 return True, f"\n\n📜 悬赏【{active['bounty_name']}】已完成！使用 /完成悬赏 领取奖励"
             return True, f"\n\n📜 悬赏进度：{new_progress}/{target}"
-        except Exception:
-            await self.db.conn.rollback()
-            raise
 
     async def check_and_expire_bounties(self) -> int:
         now = int(time.time())
-        cursor = await self.db.conn.execute(
-            "UPDATE bounty_tasks SET status = 3 WHERE status = 1 AND expire_time < ?",
-            (now,)
+        # 定时任务，走写队列的低优先级通道
+        cursor = await self.db.submit(
+            lambda conn: conn.execute(
+                "UPDATE bounty_tasks SET status = 3 WHERE status = 1 AND expire_time < ?",
+                (now,)
+            ),
+            background=True
         )
-        await self.db.conn.commit()
         return cursor.rowcount
@@ -27,24 +27,21 @@ class DualCultivationManager:
         now = int(time.time())
         expires_at = now + DUAL_CULT_REQUEST_EXPIRE
         
-        # 先清理该目标的旧请求
-        await self.db.conn.execute(
-            "DELETE FROM dual_cultivation_requests WHERE target_id = ?",
-            (target_id,)
-        )
-        
-        await self.db.conn.execute(
-            """
-            INSERT INTO dual_cultivation_requests (from_id, from_name, target_id, created_at, expires_at)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (from_id, from_name, target_id, now, expires_at)
-        )
-        await self.db.conn.commit()
-        
-        async with self.db.conn.execute("SELECT last_insert_rowid()") as cursor:
-            row = await cursor.fetchone()
-            return row[0] if row else 0
+        async with self.db.transaction():
+            # 先清理该目标的旧请求
+            await self.db.conn.execute(
+                "DELETE FROM dual_cultivation_requests WHERE target_id = ?",
+                (target_id,)
+            )
+            
+            cursor = await self.db.conn.execute(
+                """
+                INSERT INTO dual_cultivation_requests (from_id, from_name, target_id, created_at, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (from_id, from_name, target_id, now, expires_at)
+            )
+            return cursor.lastrowid or 0
     
     async def _get_pending_request(self, target_id: str) -> Optional[Dict]:
         """获取待处理的双修请求"""
@@ -78,6 +75,11 @@ class DualCultivationManager:
                 }
             return None
     
+    async def get_request_initiator(self, target_id: str) -> Optional[str]:
+        """获取向目标发起的待处理双修请求的发起者ID"""
+        request = await self._get_pending_request(target_id)
+        return request["from_id"] if request else None
+
     async def _delete_request(self, request_id: int):
         """删除双修请求"""
         await self.db.conn.execute(
@@ -174,18 +176,19 @@ class DualCultivationManager:
         init_exp_gain = int(acceptor.experience * DUAL_CULT_EXP_BONUS)
         accept_exp_gain = int(initiator.experience * DUAL_CULT_EXP_BONUS)
         
-        # 应用收益
-        initiator.experience += init_exp_gain
-        acceptor.experience += accept_exp_gain
-        await self.db.update_player(initiator)
-        await self.db.update_player(acceptor)
-        
-        # 记录冷却
-        await self._set_last_dual_time(initiator.user_id, now)
-        await self._set_last_dual_time(acceptor.user_id, now)
-        
-        # 清除请求
-        await self._delete_request(request["id"])
+        # 应用收益（双方收益、冷却与清除请求在同一事务中完成）
+        async with self.db.transaction():
+            initiator.experience += init_exp_gain
+            acceptor.experience += accept_exp_gain
+            await self.db.update_player(initiator)
+            await self.db.update_player(acceptor)
+            
+            # 记录冷却
+            await self._set_last_dual_time(initiator.user_id, now)
+            await self._set_last_dual_time(acceptor.user_id, now)
+            
+            # 清除请求
+            await self._delete_request(request["id"])
         
         return True, (
             f"💕 双修成功！\n"
@@ -90,28 +90,29 @@ class ImpartPkManager:
     
     async def get_impart_ranking(self, limit: int = 10) -> list:
         """获取传承排行榜"""
-        # 查询所有传承数据，按攻击加成排序
-        async with self.db.conn.execute(
-            """
-            SELECT user_id, impart_hp_per, impart_mp_per, impart_atk_per, 
-                   impart_know_per, impart_burst_per
-            FROM impart_info 
-            ORDER BY impart_atk_per DESC 
-            LIMIT ?
-            """,
-            (limit,)
-        ) as cursor:
-            rows = await cursor.fetchall()
-            results = []
-            for row in rows:
-                user_id = row[0]
-                player = await self.db.get_player_by_id(user_id)
-                if player:
-                    total_per = row[1] + row[2] + row[3] + row[4] + row[5]
-                    results.append({
-                        "user_id": user_id,
-                        "user_name": player.user_name or user_id[:8],
-                        "atk_per": row[3],
-                        "total_per": total_per
-                    })
-            return results
+        # 按攻击加成排序，走 idx_impart_atk 只读取前 limit 行，玩家道号随同一条查询返回
+        await self.db.flush_players()
+        async with self.db.reader() as conn:
+            async with conn.execute(
+                """
+                SELECT i.user_id, i.impart_hp_per, i.impart_mp_per, i.impart_atk_per, 
+                       i.impart_know_per, i.impart_burst_per, p.user_name
+                FROM impart_info i
+                JOIN players p ON p.user_id = i.user_id
+                ORDER BY i.impart_atk_per DESC 
+                LIMIT ?
+                """,
+                (limit,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+        results = []
+        for row in rows:
+            user_id = row[0]
+            total_per = row[1] + row[2] + row[3] + row[4] + row[5]
+            results.append({
+                "user_id": user_id,
+                "user_name": row[6] or user_id[:8],
+                "atk_per": row[3],
+                "total_per": total_per
+            })
+        return results
@@ -3,8 +3,13 @@
 排行榜系统管理器 - 处理各种排行榜逻辑
 """
 
-from typing import Tuple, List, TYPE_CHECKING, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Tuple, List, TYPE_CHECKING, Optional
 from ..data.data_manager import DataBase
+from ..data.leaderboard import (
+    BOARD_CONTRIBUTION, BOARD_DEPOSIT, BOARD_IMPART, BOARD_LEVEL, BOARD_POWER, BOARD_WEALTH
+)
 from ..managers.combat_manager import CombatManager
 
 if TYPE_CHECKING:
@@ -23,6 +28,33 @@ POSITION_MAP = {
 # 名称最大显示长度
 MAX_NAME_LENGTH = 12
 
+# 我的排名支持的排行榜：名称 -> (排行索引, 分数名称)
+MY_RANK_BOARDS = {
+    "境界": (BOARD_LEVEL, "修为"),
+    "战力": (BOARD_POWER, "战力"),
+    "灵石": (BOARD_WEALTH, "灵石"),
+    "存款": (BOARD_DEPOSIT, "存款"),
+    "传承": (BOARD_IMPART, "攻击加成"),
+    "贡献": (BOARD_CONTRIBUTION, "贡献度"),
+}
+MY_RANK_ALIASES = {"宗门贡献": "贡献", "修为": "境界", "财富": "灵石"}
+# 我的排名显示的前后邻居数量
+MY_RANK_RADIUS = 2
+
+# 排行榜每页显示数量
+PAGE_SIZE = 10
+# 最多记录翻页位置的玩家数
+MAX_PAGE_CURSORS = 1000
+
+
+@dataclass
+class PageCursor:
+    """玩家在排行榜上的翻页位置（排序键即 (分数, ID)，用于键集分页）"""
+    board: str
+    page: int
+    start: Optional[tuple]  # 本页起点：上一页最后一名的排序键，第一页为 None
+    last: tuple  # 本页最后一名的排序键
+
 
 def _short_id(user_id) -> str:
     """安全获取短ID，防止非字符串类型报错"""
@@ -33,10 +65,12 @@ def _short_id(user_id) -> str:
 
 def _safe_name(player: Optional["Player"], fallback_id) -> str:
     """安全获取玩家名称，带长度截断和特殊字符过滤"""
-    if player and player.user_name:
-        name = player.user_name
-    else:
-        name = f"道友{_short_id(fallback_id)}"
+    return _display_name(player.user_name if player else "", fallback_id)
+
+
+def _display_name(user_name: Optional[str], fallback_id) -> str:
+    """按道号生成显示名称（排行查询直接返回道号时使用），规则同 _safe_name"""
+    name = user_name or f"道友{_short_id(fallback_id)}"
     
     # 过滤危险字符（@可能触发群通知）
     name = name.replace("@", "＠")
@@ -53,41 +87,100 @@ class RankingManager:
         self.db = db
         self.combat_mgr = combat_mgr
         self.config_manager = config_manager
+        # 每个玩家最近查看的排行榜页（user_id -> 翻页位置），按最近使用淘汰
+        self._cursors: "OrderedDict[str, PageCursor]" = OrderedDict()
+    
+    async def _key_at(self, board_key: str, fallback: Callable[[int], Awaitable], index: int):
+        """排在第 index + 1 位的排序键：优先查内存排行索引（O(log n)），未载入时查数据库索引"""
+        leaderboards = self.db.leaderboards
+        if leaderboards.loaded:
+            return leaderboards.board(board_key).key_at(index)
+        return await fallback(index)
+    
+    async def _page_start(
+        self, user_id: str, board: str, page: int, key_at: Callable[[int], Awaitable]
+    ) -> Tuple[bool, Optional[tuple]]:
+        """
+        定位分页起点
         
-        # 延迟导入，避免循环依赖，只初始化一次
-        from ..core import EquipmentManager
-        self.equipment_manager = EquipmentManager(self.db, self.config_manager)
+        Returns:
+            (页是否存在, 起点排序键)；第一页的起点为 None
+        """
+        if page <= 1:
+            return True, None
+        cursor = self._cursors.get(user_id) if user_id else None
+        if cursor is not None and cursor.board == board:
+            # 刷新当前页或翻到下一页时直接使用记录的排序键
+            if page == cursor.page:
+                return True, cursor.start
+            if page == cursor.page + 1:
+                return True, cursor.last
+        start = await key_at((page - 1) * PAGE_SIZE - 1)
+        return start is not None, start
+    
+    async def _fetch_page(
+        self,
+        user_id: str,
+        board: str,
+        page: int,
+        key_at: Callable[[int], Awaitable],
+        fetch: Callable[[int, Optional[tuple]], Awaitable[list]],
+        sort_key: Callable[[Any], tuple],
+    ) -> list:
+        """按键集分页读取一页，并记录玩家的翻页位置"""
+        found, start = await self._page_start(user_id, board, page, key_at)
+        rows = await fetch(PAGE_SIZE, start) if found else []
+        if rows and user_id:
+            self._cursors[user_id] = PageCursor(board, page, start, sort_key(rows[-1]))
+            self._cursors.move_to_end(user_id)
+            while len(self._cursors) > MAX_PAGE_CURSORS:
+                self._cursors.popitem(last=False)
+        return rows
+    
+    @staticmethod
+    def _page_footer(command: str, page: int, count: int) -> str:
+        if count < PAGE_SIZE:
+            return f"第 {page} 页（已是最后一页）"
+        return f"第 {page} 页 · 发送「{command} {page + 1}」查看下一页"
+    
+    async def _player_page(self, user_id: str, column: str, board_key: str, page: int) -> List["Player"]:
+        """按分数列分页读取玩家"""
+        return await self._fetch_page(
+            user_id, board_key, page,
+            lambda index: self._key_at(board_key, lambda i: self.db.get_ranking_key(column, i), index),
+            lambda limit, after: self.db.get_top_players(column, limit, after),
+            lambda player: (getattr(player, column), player.user_id),
+        )
     
-    async def get_level_ranking(self, limit: int = 10) -> Tuple[bool, str]:
+    async def get_level_ranking(self, page: int = 1, user_id: str = "") -> Tuple[bool, str]:
         """
         境界排行榜
         
         Args:
-            limit: 显示数量
+            page: 页码（每页 PAGE_SIZE 名）
+            user_id: 查看者ID，用于记录翻页位置
             
         Returns:
             (成功标志, 消息)
         """
-        all_players = await self.db.get_all_players()
-        
-        if not all_players:
-            return False, "❌ 暂无数据！"
+        sorted_players = await self._player_page(user_id, "experience", BOARD_LEVEL, page)
         
-        # 按修为排序
-        sorted_players = sorted(all_players, key=lambda p: p.experience, reverse=True)[:limit]
+        if not sorted_players:
+            return False, "❌ 暂无数据！" if page <= 1 else f"❌ 第 {page} 页暂无数据！"
         
         msg = "📊 境界排行榜\n"
         msg += "━━━━━━━━━━━━━━━\n"
         
-        for idx, player in enumerate(sorted_players, 1):
+        for idx, player in enumerate(sorted_players, (page - 1) * PAGE_SIZE + 1):
             name = _safe_name(player, player.user_id)
             level_name = player.get_level(self.config_manager)
             msg += f"{idx}. {name}\n"
             msg += f"   境界：{level_name} | 修为：{player.experience:,}\n\n"
         
+        msg += self._page_footer("境界排行", page, len(sorted_players))
         return True, msg
     
-    async def get_power_ranking(self, limit: int = 10) -> Tuple[bool, str]:
+    async def get_power_ranking(self, page: int = 1, user_id: str = "") -> Tuple[bool, str]:
         """
         战力排行榜（基于综合属性）
         
@@ -95,45 +188,25 @@ class RankingManager:
         与玩家信息显示的战力保持一致
         
         Args:
-            limit: 显示数量
+            page: 页码（每页 PAGE_SIZE 名）
+            user_id: 查看者ID，用于记录翻页位置
             
         Returns:
             (成功标志, 消息)
         """
-        all_players = await self.db.get_all_players()
-        
-        if not all_players:
-            return False, "❌ 暂无数据！"
-        
-        # 计算战力（综合属性）
-        player_power = []
-        for player in all_players:
-            # 获取装备加成
-            equipped_items = self.equipment_manager.get_equipped_items(
-                player,
-                self.config_manager.items_data,
-                self.config_manager.weapons_data
-            )
-            
-            # 排行榜显示基础战力，不含临时丹药效果（更公平）
-            total_attrs = player.get_total_attributes(equipped_items, None)
-            
-            # 战力 = 物伤 + 法伤 + 物防 + 法防 + 精神力/10
-            combat_power = (
-                int(total_attrs['physical_damage']) + int(total_attrs['magic_damage']) +
-                int(total_attrs['physical_defense']) + int(total_attrs['magic_defense']) +
-                int(total_attrs['mental_power']) // 10
-            )
-            player_power.append((player, combat_power, total_attrs))
+        # 战力与总属性随玩家数据保存（排行榜显示基础战力，不含临时丹药效果，更公平）
+        sorted_players = await self._player_page(user_id, "combat_power", BOARD_POWER, page)
         
-        # 按战力排序
-        sorted_players = sorted(player_power, key=lambda x: x[1], reverse=True)[:limit]
+        if not sorted_players:
+            return False, "❌ 暂无数据！" if page <= 1 else f"❌ 第 {page} 页暂无数据！"
         
         msg = "📊 战力排行榜\n"
         msg += "━━━━━━━━━━━━━━━\n"
         
-        for idx, (player, power, attrs) in enumerate(sorted_players, 1):
+        for idx, player in enumerate(sorted_players, (page - 1) * PAGE_SIZE + 1):
             name = _safe_name(player, player.user_id)
+            power = player.combat_power
+            attrs = player.get_combat_attributes()
             # 显示主要攻击属性（根据修炼类型）
             if player.cultivation_type == "体修":
                 main_atk = int(attrs['physical_damage'])
@@ -144,98 +217,110 @@ class RankingManager:
             msg += f"{idx}. {name}\n"
             msg += f"   战力：{power:,} | {atk_label}：{main_atk:,}\n\n"
         
+        msg += self._page_footer("战力排行", page, len(sorted_players))
         return True, msg
     
-    async def get_wealth_ranking(self, limit: int = 10) -> Tuple[bool, str]:
+    async def get_wealth_ranking(self, page: int = 1, user_id: str = "") -> Tuple[bool, str]:
         """
         财富排行榜（灵石）
         
         Args:
-            limit: 显示数量
+            page: 页码（每页 PAGE_SIZE 名）
+            user_id: 查看者ID，用于记录翻页位置
             
         Returns:
             (成功标志, 消息)
         """
-        all_players = await self.db.get_all_players()
-        
-        if not all_players:
-            return False, "❌ 暂无数据！"
+        sorted_players = await self._player_page(user_id, "gold", BOARD_WEALTH, page)
         
-        # 按灵石排序
-        sorted_players = sorted(all_players, key=lambda p: p.gold, reverse=True)[:limit]
+        if not sorted_players:
+            return False, "❌ 暂无数据！" if page <= 1 else f"❌ 第 {page} 页暂无数据！"
         
         msg = "📊 财富排行榜\n"
         msg += "━━━━━━━━━━━━━━━\n"
         
-        for idx, player in enumerate(sorted_players, 1):
+        for idx, player in enumerate(sorted_players, (page - 1) * PAGE_SIZE + 1):
             name = _safe_name(player, player.user_id)
             msg += f"{idx}. {name}\n"
             msg += f"   灵石：{player.gold:,}\n\n"
         
+        msg += self._page_footer("灵石排行", page, len(sorted_players))
         return True, msg
     
-    async def get_sect_ranking(self, limit: int = 10) -> Tuple[bool, str]:
+    async def get_sect_ranking(self, page: int = 1, user_id: str = "") -> Tuple[bool, str]:
         """
         宗门排行榜（建设度）
         
         Args:
-            limit: 显示数量
+            page: 页码（每页 PAGE_SIZE 个宗门）
+            user_id: 查看者ID，用于记录翻页位置
             
         Returns:
             (成功标志, 消息)
         """
-        all_sects = await self.db.ext.get_all_sects()
-        
-        if not all_sects:
-            return False, "❌ 暂无宗门数据！"
-        
-        # 显式按建设度排序，不依赖DB层的排序行为
-        top_sects = sorted(all_sects, key=lambda s: s.sect_scale, reverse=True)[:limit]
+        # 宗主道号与成员数由排行查询连表返回，先让缓存中的玩家修改落盘
+        await self.db.flush_players()
+        # 宗门不在内存排行索引中，跳页时由数据库索引定位起点
+        top_sects = await self._fetch_page(
+            user_id, "sect", page,
+            self.db.ext.get_sect_ranking_key,
+            self.db.ext.get_sect_ranking,
+            lambda sect: (sect["sect_scale"], sect["sect_id"]),
+        )
+        
+        if not top_sects:
+            return False, "❌ 暂无宗门数据！" if page <= 1 else f"❌ 第 {page} 页暂无宗门数据！"
         
         msg = "📊 宗门排行榜\n"
         msg += "━━━━━━━━━━━━━━━\n"
         
-        for idx, sect in enumerate(top_sects, 1):
-            owner = await self.db.get_player_by_id(sect.sect_owner)
-            owner_name = _safe_name(owner, sect.sect_owner)
-            members = await self.db.ext.get_sect_members(sect.sect_id)
+        for idx, sect in enumerate(top_sects, (page - 1) * PAGE_SIZE + 1):
+            owner_name = _display_name(sect["owner_name"], sect["sect_owner"])
             
             # 宗门名称也需要安全处理
-            sect_name = sect.sect_name.replace("@", "＠")
+            sect_name = sect["sect_name"].replace("@", "＠")
             if len(sect_name) > MAX_NAME_LENGTH:
                 sect_name = sect_name[:MAX_NAME_LENGTH] + "…"
             
             msg += f"{idx}. 【{sect_name}】\n"
             msg += f"   宗主：{owner_name}\n"
-            msg += f"   建设度：{sect.sect_scale:,} | 成员：{len(members)}人\n\n"
+            msg += f"   建设度：{sect['sect_scale']:,} | 成员：{sect['member_count']}人\n\n"
         
+        msg += self._page_footer("宗门排行", page, len(top_sects))
         return True, msg
     
-    async def get_deposit_ranking(self, limit: int = 10) -> Tuple[bool, str]:
+    async def get_deposit_ranking(self, page: int = 1, user_id: str = "") -> Tuple[bool, str]:
         """
         存款排行榜（银行存款）
         
         Args:
-            limit: 显示数量
+            page: 页码（每页 PAGE_SIZE 名）
+            user_id: 查看者ID，用于记录翻页位置
             
         Returns:
             (成功标志, 消息)
         """
-        rankings = await self.db.ext.get_deposit_ranking(limit)
+        # 道号由排行查询连表返回，先让缓存中的玩家修改落盘
+        await self.db.flush_players()
+        rankings = await self._fetch_page(
+            user_id, BOARD_DEPOSIT, page,
+            lambda index: self._key_at(BOARD_DEPOSIT, self.db.ext.get_deposit_ranking_key, index),
+            self.db.ext.get_deposit_ranking,
+            lambda item: (item["balance"], item["user_id"]),
+        )
         
         if not rankings:
-            return False, "❌ 暂无存款数据！"
+            return False, "❌ 暂无存款数据！" if page <= 1 else f"❌ 第 {page} 页暂无存款数据！"
         
         msg = "📊 存款排行榜\n"
         msg += "━━━━━━━━━━━━━━━\n"
         
-        for idx, item in enumerate(rankings, 1):
-            uid = item["user_id"]
-            player = await self.db.get_player_by_id(uid)
-            name = _safe_name(player, uid)
+        for idx, item in enumerate(rankings, (page - 1) * PAGE_SIZE + 1):
+            name = _display_name(item["user_name"], item["user_id"])
             msg += f"{idx}. {name}\n"
             msg += f"   存款：{item['balance']:,} 灵石\n\n"
         
+        msg += self._page_footer("存款排行", page, len(rankings))
         return True, msg
     
     async def get_contribution_ranking(self, sect_id: int, limit: int = 10) -> Tuple[bool, str]:
@@ -277,3 +362,62 @@ class RankingManager:
             msg += f"   贡献度：{member.sect_contribution:,}\n\n"
         
         return True, msg
+    
+    def _format_score(self, board: str, score) -> str:
+        if board == BOARD_IMPART:
+            return f"{score:.1%}"
+        return f"{int(score):,}"
+    
+    async def get_my_rank(self, player: "Player", board_name: str = "") -> Tuple[bool, str]:
+        """
+        我的排名（内存排行索引，O(log n) 查询名次和前后邻居）
+        
+        Args:
+            player: 玩家
+            board_name: 排行榜名称，为空时显示各排行榜的名次概览
+            
+        Returns:
+            (成功标志, 消息)
+        """
+        leaderboards = self.db.leaderboards
+        if not leaderboards.loaded:
+            return False, "❌ 排行数据加载中，请稍后再试！"
+        
+        board_name = MY_RANK_ALIASES.get(board_name, board_name)
+        if not board_name:
+            msg = "📊 我的排名\n"
+            msg += "━━━━━━━━━━━━━━━\n"
+            for name, (board_key, _) in MY_RANK_BOARDS.items():
+                board = leaderboards.board(board_key, player.sect_id)
+                rank = board.rank(player.user_id) if board else None
+                if rank is None:
+                    msg += f"{name}：未上榜\n"
+                else:
+                    msg += f"{name}：第 {rank:,} 名 / 共 {len(board):,} 人\n"
+            msg += f"━━━━━━━━━━━━━━━\n💡 发送「我的排名 <{'/'.join(MY_RANK_BOARDS)}>」查看前后名次"
+            return True, msg
+        
+        if board_name not in MY_RANK_BOARDS:
+            return False, f"❌ 没有这个排行榜！可选：{'/'.join(MY_RANK_BOARDS)}"
+        board_key, score_label = MY_RANK_BOARDS[board_name]
+        if board_key == BOARD_CONTRIBUTION and not player.sect_id:
+            return False, "❌ 你尚未加入任何宗门，无法查看宗门贡献排名。"
+        
+        board = leaderboards.board(board_key, player.sect_id)
+        entries = board.around(player.user_id, MY_RANK_RADIUS) if board else []
+        if not entries:
+            return False, f"❌ 你还未登上{board_name}排行榜！"
+        
+        others = await self.db.get_players_by_ids(
+            user_id for _, user_id, _ in entries if user_id != player.user_id
+        )
+        msg = f"📊 我的{board_name}排名\n"
+        msg += "━━━━━━━━━━━━━━━\n"
+        for rank, user_id, score in entries:
+            other = player if user_id == player.user_id else others.get(user_id)
+            marker = "👉 " if user_id == player.user_id else ""
+            msg += f"{marker}{rank}. {_safe_name(other, user_id)}　{score_label}：{self._format_score(board_key, score)}\n"
+        msg += "━━━━━━━━━━━━━━━\n"
+        msg += f"共 {len(board):,} 人上榜"
+        return True, msg
+
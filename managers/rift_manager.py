@@ -240,9 +240,7 @@ class RiftManager:
                 is_pill = self._is_pill_item(item_name)
                 if is_pill:
                     # 存入丹药背包
-                    inventory = player.get_pills_inventory()
-                    inventory[item_name] = inventory.get(item_name, 0) + count
-                    player.set_pills_inventory(inventory)
+                    await self.db.ext.add_player_pill(player.user_id, item_name, count)
                     item_lines.append(f"  · {item_name} x{count}（丹药背包）")
                 elif self.storage_ring_manager:
                     success, _ = await self.storage_ring_manager.store_item(player, item_name, count, silent=True)
@@ -304,7 +304,9 @@ class SectManager:
         Returns:
             (成功标志, 消息)
         """
-        sects = await self.db.ext.get_all_sects()
+        # 只显示前10个，宗主道号与成员数由同一条查询返回
+        await self.db.flush_players()
+        sects = await self.db.ext.get_sect_ranking(10)
         
         if not sects:
             return False, "❌ 当前还没有任何宗门！"
@@ -312,14 +314,12 @@ class SectManager:
         msg = "🏛️ 宗门列表\n"
         msg += "━━━━━━━━━━━━━━━\n"
         
-        for idx, sect in enumerate(sects[:10], 1):  # 只显示前10个
-            owner = await self.db.get_player_by_id(sect.sect_owner)
-            owner_name = owner.user_name if owner and owner.user_name else "未知"
-            members = await self.db.ext.get_sect_members(sect.sect_id)
+        for idx, sect in enumerate(sects, 1):
+            owner_name = sect["owner_name"] or "未知"
             
-            msg += f"{idx}. 【{sect.sect_name}】\n"
+            msg += f"{idx}. 【{sect['sect_name']}】\n"
             msg += f"   宗主：{owner_name}\n"
-            msg += f"   建设度：{sect.sect_scale} | 成员：{len(members)}人\n\n"
+            msg += f"   建设度：{sect['sect_scale']} | 成员：{sect['member_count']}人\n\n"
         
         return True, msg
     
@@ -1,9 +1,11 @@
 # models.py
 
-from dataclasses import dataclass
-from typing import TYPE_CHECKING, List, Optional
+from dataclasses import dataclass, field, fields
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 import json
 
+from . import codec
+
 if TYPE_CHECKING:
     from .config_manager import ConfigManager
 
@@ -54,9 +56,13 @@ class Item:
             attrs.append(f"气血+{self.blood_qi}")
         return "、".join(attrs) if attrs else "无属性加成"
 
-@dataclass
+@dataclass(slots=True)
 class Player:
-    """玩家数据模型 - 完整修仙系统（参照NoneBot2）"""
+    """玩家数据模型 - 完整修仙系统（参照NoneBot2）
+
+    使用 __slots__ 存储以减少每个玩家对象的内存占用。JSON 字段（功法列表、永久丹药增益）
+    在首次读取时解码并缓存在对象上，之后的读取直接返回缓存；只有调用对应的 set_ 方法时才重新编码。
+    """
 
     user_id: str
     level_index: int = 0
@@ -108,20 +114,99 @@ class Player:
     blessed_spot_name: str = ""  # 洞天福地名称
 
     # 丹药系统字段
-    active_pill_effects: str = "[]"  # 当前生效的临时丹药效果（JSON字符串）
+    active_pill_effects: str = "[]"  # 旧版临时丹药效果（已迁移到 pill_effects 表，仅为兼容旧数据保留）
     permanent_pill_gains: str = "{}"  # 永久丹药累积增益（JSON字符串）
     has_resurrection_pill: bool = False  # 是否拥有回生丹效果
     has_debuff_shield: bool = False  # 是否拥有一次负面效果免疫
-    pills_inventory: str = "{}"  # 丹药背包（JSON字符串，格式：{pill_id: count}）
+    pills_inventory: str = "{}"  # 旧版丹药背包（已迁移到 player_pills 表，仅为兼容旧数据保留）
 
     # 储物戒系统字段
     storage_ring: str = "基础储物戒"  # 当前装备的储物戒名称
-    storage_ring_items: str = "{}"  # 储物戒中的物品（JSON字符串，格式：{item_name: {count, bound}}）
+    storage_ring_items: str = "{}"  # 旧版储物戒物品（已迁移到 player_items 表，仅为兼容旧数据保留）
 
     # Phase 1: 每日限制系统
     daily_pill_usage: str = "{}"  # 每日丹药使用次数（JSON字符串，格式：{pill_id: count}）
     last_daily_reset: str = ""  # 上次每日重置日期（格式：YYYY-MM-DD）
 
+    # 战力与装备加成后的总属性（不含临时丹药效果），由数据层在装备、功法、境界或基础属性变化时重算
+    combat_power: int = 0
+    total_attributes: str = "{}"  # JSON字符串，见 refresh_combat_stats
+
+    # 乐观并发控制
+    version: int = 0  # 行版本号，每次写入加一（见 DataBase.update_player_cas）
+
+    # 内部状态（不对应数据库列，不参与构造和比较）
+    # 脏字段集合，None 表示没有数据库基线（新建对象），此时更新需写入全部字段
+    _dirty_fields: Optional[set] = field(default=None, init=False, repr=False, compare=False)
+    # 已解码的 JSON 字段缓存 {字段名: (解码时的原始字符串, 解码结果)}
+    _decoded: Optional[Dict[str, Tuple[str, Any]]] = field(default=None, init=False, repr=False, compare=False)
+
+    def __setattr__(self, name: str, value):
+        if name in PLAYER_COLUMNS:
+            try:
+                dirty = self._dirty_fields
+                if dirty is not None and getattr(self, name) != value:
+                    dirty.add(name)
+            except AttributeError:
+                # 构造过程中字段尚未赋值
+                pass
+        object.__setattr__(self, name, value)
+
+    def __copy__(self) -> "Player":
+        clone = object.__new__(Player)
+        for name in PLAYER_COLUMNS:
+            object.__setattr__(clone, name, getattr(self, name))
+        dirty = self._dirty_fields
+        object.__setattr__(clone, "_dirty_fields", set(dirty) if dirty is not None else None)
+        # 解码缓存中的对象可能被调用方就地修改，拷贝不共享缓存
+        object.__setattr__(clone, "_decoded", None)
+        return clone
+
+    def mark_clean(self):
+        """以当前字段值作为数据库基线，清空脏字段记录"""
+        object.__setattr__(self, "_dirty_fields", set())
+
+    def get_dirty_fields(self) -> Optional[set]:
+        """获取自加载以来被修改的字段（None 表示无基线，需全量写入）"""
+        dirty = self._dirty_fields
+        return set(dirty) if dirty is not None else None
+
+    def discard_dirty_fields(self, columns):
+        """把指定字段从脏字段记录中移除（已落盘）"""
+        dirty = self._dirty_fields
+        if dirty is not None:
+            dirty.difference_update(columns)
+
+    def _get_json(self, name: str, default_factory):
+        """读取 JSON 字段的解码结果，字段原始字符串未变化时直接返回缓存
+
+        返回的是缓存对象本身，仅供只读使用；对外的 get_* 方法返回其拷贝。
+        """
+        raw = getattr(self, name)
+        decoded = self._decoded
+        if decoded is not None:
+            cached = decoded.get(name)
+            if cached is not None and cached[0] is raw:
+                return cached[1]
+        else:
+            decoded = {}
+            object.__setattr__(self, "_decoded", decoded)
+        try:
+            value = codec.loads(raw)
+        except json.JSONDecodeError:
+            value = default_factory()
+        decoded[name] = (raw, value)
+        return value
+
+    def _set_json(self, name: str, value):
+        """编码并写入 JSON 字段，同时更新解码缓存"""
+        raw = codec.dumps(value)
+        setattr(self, name, raw)
+        if self._decoded is None:
+            object.__setattr__(self, "_decoded", {})
+        # 缓存拷贝，调用方之后修改传入的对象不影响缓存
+        self._decoded[name] = (raw, _clone_json(value))
+
     def get_level(self, config_manager: "ConfigManager") -> str:
         """获取境界名称"""
         level_data = config_manager.get_level_data(self.cultivation_type)
@@ -137,59 +222,40 @@ class Player:
         return 0
 
     def get_techniques_list(self) -> List[str]:
-        """获取功法列表"""
-        try:
-            return json.loads(self.techniques)
-        except json.JSONDecodeError:
-            return []
+        """获取功法列表（返回拷贝，修改后需调用 set_techniques_list 保存）"""
+        return _clone_json(self._get_json("techniques", list))
 
     def set_techniques_list(self, techniques_list: List[str]):
         """设置功法列表"""
-        self.techniques = json.dumps(techniques_list, ensure_ascii=False)
-
-    def get_active_pill_effects(self) -> List[dict]:
-        """获取当前生效的临时丹药效果列表"""
-        try:
-            return json.loads(self.active_pill_effects)
-        except json.JSONDecodeError:
-            return []
-
-    def set_active_pill_effects(self, effects: List[dict]):
-        """设置当前生效的临时丹药效果"""
-        self.active_pill_effects = json.dumps(effects, ensure_ascii=False)
+        self._set_json("techniques", techniques_list)
 
     def get_permanent_pill_gains(self) -> dict:
-        """获取永久丹药累积增益"""
-        try:
-            return json.loads(self.permanent_pill_gains)
-        except json.JSONDecodeError:
-            return {}
+        """获取永久丹药累积增益（返回拷贝，修改后需调用 set_permanent_pill_gains 保存）"""
+        return _clone_json(self._get_json("permanent_pill_gains", dict))
 
     def set_permanent_pill_gains(self, gains: dict):
         """设置永久丹药累积增益"""
-        self.permanent_pill_gains = json.dumps(gains, ensure_ascii=False)
-
-    def get_pills_inventory(self) -> dict:
-        """获取丹药背包"""
-        try:
-            return json.loads(self.pills_inventory)
-        except json.JSONDecodeError:
-            return {}
-
-    def set_pills_inventory(self, inventory: dict):
-        """设置丹药背包"""
-        self.pills_inventory = json.dumps(inventory, ensure_ascii=False)
-
-    def get_storage_ring_items(self) -> dict:
-        """获取储物戒物品"""
-        try:
-            return json.loads(self.storage_ring_items)
-        except json.JSONDecodeError:
-            return {}
-
-    def set_storage_ring_items(self, items: dict):
-        """设置储物戒物品"""
-        self.storage_ring_items = json.dumps(items, ensure_ascii=False)
+        self._set_json("permanent_pill_gains", gains)
+
+    def refresh_combat_stats(self, equipped_items: List[Item]):
+        """按当前装备重算并保存战力与总属性（不含临时丹药效果）"""
+        total = self.get_total_attributes(equipped_items)
+        # 当前灵气/气血随时变化，不保存
+        for key in VOLATILE_ATTRIBUTES:
+            total.pop(key, None)
+        self.combat_power = calculate_combat_power(total)
+        self._set_json("total_attributes", total)
+
+    def get_combat_attributes(self, pill_multipliers: Optional[dict] = None) -> dict:
+        """读取已保存的总属性，附加当前灵气/气血并应用丹药倍率（结果与 get_total_attributes 一致）"""
+        stored = self._get_json("total_attributes", dict)
+        if not stored:
+            # 尚未回填的旧数据，只有基础属性
+            return self.get_total_attributes([], pill_multipliers)
+        total = dict(stored)
+        total["spiritual_qi"] = self.spiritual_qi
+        total["blood_qi"] = self.blood_qi
+        return _apply_pill_multipliers(total, pill_multipliers)
 
     def get_total_attributes(self, equipped_items: List[Item], pill_multipliers: Optional[dict] = None) -> dict:
         """计算包含装备加成和丹药效果的总属性
@@ -229,11 +295,44 @@ class Player:
                 total["max_spiritual_qi"] += item.spiritual_qi
                 total["max_blood_qi"] += item.blood_qi
 
-        # 应用丹药倍率效果
-        if pill_multipliers:
-            total["physical_damage"] = int(total["physical_damage"] * pill_multipliers.get("physical_damage", 1.0))
-            total["magic_damage"] = int(total["magic_damage"] * pill_multipliers.get("magic_damage", 1.0))
-            total["physical_defense"] = int(total["physical_defense"] * pill_multipliers.get("physical_defense", 1.0))
-            total["magic_defense"] = int(total["magic_defense"] * pill_multipliers.get("magic_defense", 1.0))
-
-        return total
+        return _apply_pill_multipliers(total, pill_multipliers)
+
+
+def _clone_json(value):
+    """拷贝 JSON 解码结果（只含 dict/list 与不可变标量，比 copy.deepcopy 快）"""
+    if isinstance(value, dict):
+        return {key: _clone_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_clone_json(item) for item in value]
+    return value
+
+
+def _apply_pill_multipliers(total: dict, pill_multipliers: Optional[dict]) -> dict:
+    """应用丹药属性倍率效果"""
+    if pill_multipliers:
+        total["physical_damage"] = int(total["physical_damage"] * pill_multipliers.get("physical_damage", 1.0))
+        total["magic_damage"] = int(total["magic_damage"] * pill_multipliers.get("magic_damage", 1.0))
+        total["physical_defense"] = int(total["physical_defense"] * pill_multipliers.get("physical_defense", 1.0))
+        total["magic_defense"] = int(total["magic_defense"] * pill_multipliers.get("magic_defense", 1.0))
+    return total
+
+
+def calculate_combat_power(total_attrs: dict) -> int:
+    """战力 = 物伤 + 法伤 + 物防 + 法防 + 精神力/10"""
+    return (
+        int(total_attrs['physical_damage']) + int(total_attrs['magic_damage']) +
+        int(total_attrs['physical_defense']) + int(total_attrs['magic_defense']) +
+        int(total_attrs['mental_power']) // 10
+    )
+
+
+# 对应 players 表列的字段（不含内部状态）
+PLAYER_COLUMNS = frozenset(f.name for f in fields(Player) if f.init)
+# 总属性中随时变化、不随战力一起保存的字段
+VOLATILE_ATTRIBUTES = ("spiritual_qi", "blood_qi")
+# 影响战力与总属性的字段，修改后需要重算
+COMBAT_STAT_COLUMNS = frozenset({
+    "level_index", "cultivation_type", "weapon", "armor", "main_technique", "techniques", "permanent_pill_gains",
+    "max_spiritual_qi", "max_blood_qi",
+    "magic_damage", "physical_damage", "magic_defense", "physical_defense", "mental_power",
+})
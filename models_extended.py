@@ -3,7 +3,8 @@
 from dataclasses import dataclass
 from enum import IntEnum
 from typing import TYPE_CHECKING, List, Optional
-import json
+
+from . import codec
 
 if TYPE_CHECKING:
     from .config_manager import ConfigManager
@@ -49,26 +50,26 @@ class Sect:
         try:
             if self.mainbuff == "0" or not self.mainbuff:
                 return []
-            return json.loads(self.mainbuff) if isinstance(self.mainbuff, str) else [self.mainbuff]
+            return codec.loads(self.mainbuff) if isinstance(self.mainbuff, str) else [self.mainbuff]
         except:
             return []
     
     def set_mainbuff_list(self, buff_list: List[int]):
         """设置主修功法ID列表"""
-        self.mainbuff = json.dumps(buff_list, ensure_ascii=False) if buff_list else "0"
+        self.mainbuff = codec.dumps(buff_list) if buff_list else "0"
     
     def get_secbuff_list(self) -> List[int]:
         """获取辅修功法ID列表"""
         try:
             if self.secbuff == "0" or not self.secbuff:
                 return []
-            return json.loads(self.secbuff) if isinstance(self.secbuff, str) else [self.secbuff]
+            return codec.loads(self.secbuff) if isinstance(self.secbuff, str) else [self.secbuff]
         except:
             return []
     
     def set_secbuff_list(self, buff_list: List[int]):
         """设置辅修功法ID列表"""
-        self.secbuff = json.dumps(buff_list, ensure_ascii=False) if buff_list else "0"
+        self.secbuff = codec.dumps(buff_list) if buff_list else "0"
 
 
 @dataclass
@@ -116,13 +117,13 @@ class Rift:
     def get_rewards(self) -> dict:
         """获取奖励字典"""
         try:
-            return json.loads(self.rewards)
+            return codec.loads(self.rewards)
         except:
             return {}
     
     def set_rewards(self, rewards_dict: dict):
         """设置奖励字典"""
-        self.rewards = json.dumps(rewards_dict, ensure_ascii=False)
+        self.rewards = codec.dumps(rewards_dict)
 
 
 @dataclass
@@ -151,10 +152,10 @@ class UserCd:
     def get_extra_data(self) -> dict:
         """获取额外数据字典"""
         try:
-            return json.loads(self.extra_data)
+            return codec.loads(self.extra_data)
         except:
             return {}
     
     def set_extra_data(self, data: dict):
         """设置额外数据"""
-        self.extra_data = json.dumps(data, ensure_ascii=False)
+        self.extra_data = codec.dumps(data)
@@ -1,3 +1,4 @@
 from .config_loader import ConfigLoader
+from .keyed_lock import KeyedLocks
 
-__all__ = ["ConfigLoader"]
+__all__ = ["ConfigLoader", "KeyedLocks"]
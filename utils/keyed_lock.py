@@ -0,0 +1,117 @@
+# utils/keyed_lock.py
+"""
+按键（如用户ID）加锁的进程内异步锁注册表
+
+- 每个键一把锁，锁对象以弱引用登记，没有协程持有或等待时自动回收
+- 同一个任务可重入（如 player_required 已持有发起者的锁，指令内再锁定发起者和目标）
+- 一次锁定多个键时按键排序依次获取；若当前任务已持有排在待获取键之后的锁，
+  先释放这些锁再与待获取的锁一起按顺序重新获取，保证所有任务的加锁顺序一致，不会死锁
+"""
+
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+
+class _KeyLock:
+    """单个键的可重入锁"""
+
+    __slots__ = ("key", "lock", "owner", "depth", "__weakref__")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.lock = asyncio.Lock()
+        self.owner: Optional[asyncio.Task] = None
+        self.depth = 0
+
+    async def acquire(self, task: asyncio.Task):
+        await self.lock.acquire()
+        self.owner = task
+        self.depth = 1
+
+    def release(self, task: asyncio.Task):
+        # 重新获取期间被取消时，外层上下文可能并未持有该锁
+        if self.owner is not task:
+            return
+        self.depth -= 1
+        if self.depth == 0:
+            self.owner = None
+            self.lock.release()
+
+
+class KeyedLocks:
+    """按键加锁的注册表
+
+    用法::
+
+        async with locks.hold(user_id, target_id) as reacquired:
+            if reacquired:
+                ...  # 期间曾释放过已持有的锁，之前读取的数据需要重新读取
+    """
+
+    def __init__(self):
+        self._locks: "weakref.WeakValueDictionary[str, _KeyLock]" = weakref.WeakValueDictionary()
+
+    def __len__(self) -> int:
+        """当前被持有或等待中的锁数量"""
+        return len(self._locks)
+
+    def locked(self, key: str) -> bool:
+        """键是否被锁定"""
+        entry = self._locks.get(str(key))
+        return entry is not None and entry.lock.locked()
+
+    def _entry(self, key: str) -> _KeyLock:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = _KeyLock(key)
+            self._locks[key] = entry
+        return entry
+
+    def _held_by(self, task: asyncio.Task) -> List[_KeyLock]:
+        return [entry for entry in list(self._locks.values()) if entry.owner is task]
+
+    @asynccontextmanager
+    async def hold(self, *keys):
+        """锁定一个或多个键（async with），产出是否曾为保证加锁顺序而临时释放过已持有的锁"""
+        task = asyncio.current_task()
+        entries = [self._entry(key) for key in sorted({str(key) for key in keys})]
+        missing = [entry for entry in entries if entry.owner is not task]
+        reentered = [entry for entry in entries if entry.owner is task]
+
+        reacquired = False
+        if missing:
+            # 已持有且排在待获取键之后的锁需要先释放，再按顺序一起获取
+            first = missing[0].key
+            released: Dict[_KeyLock, int] = {
+                entry: entry.depth for entry in self._held_by(task) if entry.key > first
+            }
+            for entry in released:
+                entry.owner = None
+                entry.depth = 0
+                entry.lock.release()
+            acquired = []
+            try:
+                for entry in sorted([*missing, *released], key=lambda e: e.key):
+                    await entry.acquire(task)
+                    acquired.append(entry)
+            except BaseException:
+                for entry in acquired:
+                    if entry in released:
+                        # 恢复外层的持有深度，由外层上下文正常释放
+                        entry.depth = released[entry]
+                    else:
+                        entry.release(task)
+                raise
+            for entry, depth in released.items():
+                entry.depth = depth
+            reacquired = bool(released)
+
+        for entry in reentered:
+            entry.depth += 1
+        try:
+            yield reacquired
+        finally:
+            for entry in entries:
+                entry.release(task)